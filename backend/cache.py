@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Per-process budget for cached response bytes; size it to the container
+CACHE_MAX_BYTES = int(os.getenv("QUIZ_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Bounds how stale an entry can get when another worker writes to the database
+CACHE_TTL_SECONDS = float(os.getenv("QUIZ_CACHE_TTL", "300"))
+
+
+class ResponseCache:
+    """Size-bounded LRU cache with a TTL for serialized API responses.
+
+    Values are bytes and count against `max_bytes` by their length. Keys are
+    tuples such as ("quiz", 12), ("url", canonical_url) or
+    ("history", cursor, limit).
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+
+    def invalidate_prefix(self, *prefix):
+        # e.g. invalidate_prefix("history") drops every cached history page
+        n = len(prefix)
+        with self._lock:
+            for key in [k for k in self._entries if k[:n] == prefix]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self.size -= len(value)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,133 @@
+import os
+import re
+
+# Token budget per chunk sent to the LLM; 0 sends the article as one prompt (packed to QUIZ_PROMPT_TOKENS)
+CHUNK_TOKENS = int(os.getenv("QUIZ_CHUNK_TOKENS", "3000"))
+# Longer articles keep this many chunks, spread evenly from the lead to the end; the
+# quiz is marked truncated and a warning logged when chunks are left out
+MAX_CHUNKS = int(os.getenv("QUIZ_MAX_CHUNKS", "8"))
+
+# Llama-family tokenizers average about four characters per token on English prose;
+# the character-count estimate estimate_tokens replaced (benchmarks compare the two)
+CHARS_PER_TOKEN = 4
+
+# Text split the way Llama 3's pre-tokenizer does before BPE: letter runs, digits
+# in groups of up to three, punctuation runs and newlines; other spaces ride
+# along with the next piece. Whole common words are one token in its vocabulary.
+_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]+|_+|\n+")
+# ASCII words up to this long count as one token, longer ones one per SUBWORD_CHARS
+WORD_CHARS = 10
+SUBWORD_CHARS = 5
+
+
+def estimate_tokens(text: str) -> int:
+    """Local estimate of the prompt tokens `text` costs, without loading a tokenizer.
+
+    Counts pre-tokenizer pieces instead of characters, so digits, punctuation
+    and non-Latin scripts are not undercounted.
+    """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if not piece.isascii():
+            # About two non-ASCII characters a token (CJK, Cyrillic, accented letters)
+            tokens += 1 + sum(1 for c in piece if ord(c) > 0x7f) // 2
+        elif len(piece) <= WORD_CHARS or not piece[0].isalpha():
+            tokens += 1 if piece[0].isalnum() or piece[0] == "\n" else -(-len(piece) // 2)
+        else:
+            tokens += -(-len(piece) // SUBWORD_CHARS)
+    return tokens
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_long(text: str, limit: int):
+    # A single paragraph over the budget: cut at sentence ends, else at spaces
+    if estimate_tokens(text) <= limit:
+        return [text]
+    units = []
+    for sentence in _SENTENCE_END.split(text):
+        if estimate_tokens(sentence) <= limit:
+            units.append(sentence)
+            continue
+        for word in sentence.split(" "):
+            # No piece costs more than a token a character, so `limit` characters always fit
+            units.extend([word] if estimate_tokens(word) <= limit else
+                         [word[i:i + limit] for i in range(0, len(word), limit)])
+    pieces, current, used = [], [], 0
+    for unit in units:
+        tokens = estimate_tokens(unit)
+        if current and used + tokens > limit:
+            pieces.append(" ".join(current))
+            current, used = [], 0
+        current.append(unit)
+        used += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _section_pieces(block, limit: int):
+    """Yields (piece, tokens): the section as labelled pieces of at most `limit` estimated tokens.
+
+    Split at paragraphs; a newline is one token, so the counts add up.
+    """
+    label = f"== {block['heading']} ==\n" if block["heading"] else ""
+    label_tokens = estimate_tokens(label)
+    room = max(limit - label_tokens, limit // 2)
+    current, used = "", 0
+    for paragraph in block["text"].split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        for unit in _split_long(paragraph, room):
+            tokens = estimate_tokens(unit)
+            if current and used + 1 + tokens > room:
+                yield label + current, label_tokens + used
+                current, used = unit, tokens
+            elif current:
+                current, used = f"{current}\n{unit}", used + 1 + tokens
+            else:
+                current, used = unit, tokens
+    if current:
+        yield label + current, label_tokens + used
+
+
+def chunk_article(blocks, budget_tokens=None):
+    """Packs an article's sections into chunks of at most `budget_tokens` estimated tokens.
+
+    `blocks` are the scraper's {"heading", "text"} sections in article order.
+    Consecutive small sections share a chunk; a section is only split (at
+    paragraph boundaries) when it alone exceeds the budget. Sizes are
+    estimate_tokens counts, as for the single prompt (preprocess.pack_text).
+    Every chunk is returned; spread_chunks caps how many get a prompt.
+    """
+    budget_tokens = budget_tokens or CHUNK_TOKENS
+
+    chunks = []
+    current, used = "", 0
+    for block in blocks:
+        for piece, tokens in _section_pieces(block, budget_tokens):
+            if current and used + 1 + tokens > budget_tokens:
+                chunks.append(current)
+                current, used = piece, tokens
+            elif current:
+                current, used = f"{current}\n\n{piece}", used + 1 + tokens
+            else:
+                current, used = piece, tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def spread_chunks(chunks, max_chunks=None):
+    """At most `max_chunks` of `chunks`: the lead, the last one and evenly spaced ones in between.
+
+    The chunks left out are not quizzed on; callers compare the lengths to
+    tell that the article was cut.
+    """
+    max_chunks = max_chunks or MAX_CHUNKS
+    if len(chunks) > max_chunks > 1:
+        step = (len(chunks) - 1) / (max_chunks - 1)
+        return [chunks[round(i * step)] for i in range(max_chunks)]
+    return chunks[:max_chunks]
@@ -1,12 +1,18 @@
 
 from database import SessionLocal, engine
-from models import Base, QuizRecord, Question
+from models import Base, GenerationLease, Job, QuizRecord, QuizEntity, Question
 from sqlalchemy import text
 
 def clear_cache():
     try:
         db = SessionLocal()
-        # Delete all quizzes and questions
+        # Delete all quizzes, their questions, search index entries and entities. Jobs
+        # reference quizzes (a foreign key Postgres enforces) and leases name the articles
+        # being generated, so both go first.
+        db.query(Job).delete()
+        db.query(GenerationLease).delete()
+        db.execute(text("DELETE FROM quiz_search"))
+        db.query(QuizEntity).delete()
         db.query(Question).delete()
         db.query(QuizRecord).delete()
         db.commit()
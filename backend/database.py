@@ -1,28 +1,170 @@
 import os
-from sqlalchemy import create_engine
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+try:
+    from . import envfile  # noqa: F401
+except ImportError:
+    import envfile  # noqa: F401
+
+_BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def _default_sqlite_url():
+    # backend/data/sql_app.db, a directory so WAL mode's -wal and -shm files persist with the
+    # database (docker-compose mounts it). A database left at the old backend/sql_app.db is
+    # moved there, with its WAL files, the first time the new path doesn't exist yet.
+    path = _BACKEND_DIR / "data" / "sql_app.db"
+    path.parent.mkdir(exist_ok=True)
+    legacy = _BACKEND_DIR / "sql_app.db"
+    if legacy.is_file() and not path.exists():
+        for suffix in ("-wal", "-shm", ""):
+            old = legacy.with_name(legacy.name + suffix)
+            if old.exists():
+                old.replace(path.with_name(path.name + suffix))
+    return f"sqlite:///{path}"
 
-load_dotenv()
 
 # Default to SQLite if DATABASE_URL is not set
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or _default_sqlite_url()
+
+def _to_async_url(url: str) -> str:
+    # The API runs on async drivers; scripts and table creation keep the sync ones.
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgres://"):
+        # Render/Heroku style URLs
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = _to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# SQLite file databases run in WAL mode with the pragmas below, and the API sends all
+# its writes through one connection so they queue in-process instead of failing with
+# "database is locked"; reads keep their own pool. 0 leaves SQLite's defaults.
+SQLITE_HIGH_CONCURRENCY = os.getenv("SQLITE_HIGH_CONCURRENCY", "1") != "0"
+# How long a connection waits for another process's write lock before giving up
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Per connection: memory-mapped reads and page cache size
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+# How long a write waits for its turn on the writer connection
+SQLITE_WRITE_TIMEOUT = float(os.getenv("SQLITE_WRITE_TIMEOUT", "30"))
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    # In-memory databases are private to each connection: no WAL, and a second engine would see another database
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+SQLITE_TUNED = SQLITE_HIGH_CONCURRENCY and _is_sqlite_file(SQLALCHEMY_DATABASE_URL)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: readers never block the writer and the writer never blocks readers.
+    # It is a property of the file, so this only writes anything the first time.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    # Safe with WAL: a power loss can drop the last commits, never corrupt the file
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    cursor.close()
+
+def _tune_sqlite(engine):
+    event.listen(getattr(engine, "sync_engine", engine), "connect", _set_sqlite_pragmas)
+    return engine
+
+class _WriterRoutingSession(Session):
+    """Runs reads on the read pool and flushes and INSERT/UPDATE/DELETE on the writer connection.
+
+    Once a transaction has written, the rest of it stays on the writer, so it
+    reads its own changes; the writer is handed back at commit or rollback.
+    """
+    _writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._writing or self._flushing or getattr(clause, "is_dml", False):
+            self._writing = True
+            return _get("writer_engine").sync_engine
+        return _get("async_engine").sync_engine
+
+@event.listens_for(_WriterRoutingSession, "after_transaction_end")
+def _writer_released(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
+# Engines are built (and their DB drivers imported) on first use, not at import:
+# importing the app never connects, so a briefly unreachable database does not
+# stop it from starting, and processes that never touch the DB never pay for it.
+_engines = {}
+
+def _sync_engine():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    connect_args = {}
+    if "sqlite" in SQLALCHEMY_DATABASE_URL:
+        connect_args = {"check_same_thread": False}
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+    if SQLITE_TUNED:
+        _tune_sqlite(engine)
+    return {"engine": engine, "SessionLocal": sessionmaker(autocommit=False, autoflush=False, bind=engine)}
+
+def _async_engine():
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    # Connections are only held around queries, never across scrape/LLM calls,
+    # so a small pool serves many concurrent generations.
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        # Seconds a request waits for a pooled connection before failing
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    )
+    engines = {"async_engine": async_engine}
+    session_options = {}
+    if SQLITE_TUNED:
+        _tune_sqlite(async_engine)
+        # SQLite allows one writer at a time; a one-connection pool is the queue writes wait in
+        engines["writer_engine"] = _tune_sqlite(create_async_engine(
+            ASYNC_DATABASE_URL, pool_size=1, max_overflow=0, pool_timeout=SQLITE_WRITE_TIMEOUT,
+        ))
+        session_options["sync_session_class"] = _WriterRoutingSession
+    # expire_on_commit=False so committed objects can still be read without another round trip
+    engines["async_session"] = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False, **session_options
+    )
+    return engines
+
+def _get(name):
+    if name not in _engines:
+        _engines.update(_sync_engine() if name in ("engine", "SessionLocal") else _async_engine())
+    return _engines[name]
+
+async def dispose_async_engines():
+    """Closes the API's pooled connections; the last SQLite one to close checkpoints the WAL into the file."""
+    for name in ("writer_engine", "async_engine"):
+        if name in _engines:
+            await _engines[name].dispose()
 
-connect_args = {}
-if "sqlite" in SQLALCHEMY_DATABASE_URL:
-    connect_args = {"check_same_thread": False}
+def __getattr__(name):
+    # `from database import engine` (scripts, migrate.py) builds the sync engine then
+    if name in ("engine", "SessionLocal", "async_engine"):
+        return _get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def AsyncSessionLocal():
+    """A new AsyncSession; the async engine is created on the first call."""
+    return _get("async_session")()
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,118 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Recent raw scrapes / LLM responses kept in memory for GET /debug/recent; 0 disables.
+# Off by default: set it only while debugging, as the endpoint serves them unauthenticated
+DEBUG_RING_SIZE = int(os.getenv("DEBUG_RING_SIZE", "0"))
+DEBUG_RING_MAX_CHARS = int(os.getenv("DEBUG_RING_MAX_CHARS", "5000"))
+
+# Correlation ID of the request being handled; set by the middleware in main.py
+request_id_var = ContextVar("request_id", default="-")
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any `extra` fields."""
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in self._RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        # Runs in the calling thread, before the record crosses the queue
+        record.request_id = request_id_var.get()
+        return True
+
+
+_listener = None
+
+
+def configure_logging():
+    """Routes the app's log records through a queue to a background writer thread.
+
+    Request handlers only enqueue records; formatting and the stdout write
+    happen on the listener thread. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(_RequestIdFilter())
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    app_logger = logging.getLogger("wikiquiz")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(queue_handler)
+    app_logger.propagate = False
+
+
+def get_logger(name):
+    return logging.getLogger(f"wikiquiz.{name}")
+
+
+class DebugRing:
+    """Bounded in-memory buffer of recent raw payloads (scraped text, LLM output)."""
+
+    def __init__(self, size=DEBUG_RING_SIZE, max_chars=DEBUG_RING_MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries = deque(maxlen=size) if size > 0 else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._entries is not None
+
+    def record(self, kind, payload, **fields):
+        if self._entries is None:
+            return
+        entry = {
+            "ts": round(time.time(), 3),
+            "request_id": request_id_var.get(),
+            "kind": kind,
+            **fields,
+            "payload": payload[:self.max_chars] if isinstance(payload, str) else payload,
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+    def recent(self, kind=None):
+        if self._entries is None:
+            return []
+        with self._lock:
+            entries = list(self._entries)
+        return [e for e in reversed(entries) if kind is None or e["kind"] == kind]
+
+
+debug_ring = DebugRing()
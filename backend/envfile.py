@@ -0,0 +1,7 @@
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# backend/.env, loaded once per process by whichever module imports this first;
+# variables already in the environment win over the file
+load_dotenv(Path(__file__).parent / ".env")
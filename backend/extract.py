@@ -0,0 +1,129 @@
+import os
+
+# bs4 is imported where used: it is only the reference/fallback extractor and
+# costs more to import than lxml
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+NO_CONTENT_ERROR = "Could not find article content (tried 'mw-content-text' and 'bodyContent')."
+
+
+def extract_bs4(html: bytes):
+    """Reference extractor: BeautifulSoup with the pure-Python html.parser."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_tag = soup.find('h1', id='firstHeading')
+    title = title_tag.get_text().strip() if title_tag else "Unknown Title"
+
+    content_div = soup.find('div', id='mw-content-text')
+    if not content_div:
+        # Fallback for mobile wikipedia or different themes
+        content_div = soup.find('div', id='bodyContent')
+    if not content_div:
+        raise Exception(NO_CONTENT_ERROR)
+
+    # Paragraphs and h2 headings in document order, so paragraphs can be grouped by section
+    paragraphs = []
+    sections = []
+    outline = []
+    for tag in content_div.find_all(['p', 'h2']):
+        if tag.name == 'p':
+            paragraphs.append(tag.get_text())
+            continue
+        span = tag.find('span', class_='mw-headline')
+        if span:
+            sections.append(span.get_text().strip())
+        outline.append((span.get_text().strip() if span else tag.get_text().strip(), len(paragraphs)))
+
+    # Canonical link resolves redirects (e.g. /wiki/Einstein -> Albert_Einstein)
+    canonical_tag = soup.find('link', rel='canonical')
+    canonical_url = canonical_tag.get('href') if canonical_tag else None
+
+    return title, paragraphs, sections, canonical_url, outline
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if lxml is not None:
+    _lxml_parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+    _TITLE = etree.XPath("(//h1[@id='firstHeading'])[1]")
+    _CONTENT = etree.XPath("(//div[@id='mw-content-text'])[1]")
+    _BODY_CONTENT = etree.XPath("(//div[@id='bodyContent'])[1]")
+    _CANONICAL = etree.XPath(
+        "(//link[contains(concat(' ', normalize-space(@rel), ' '), ' canonical ')])[1]"
+    )
+    _HEADLINE = etree.XPath(f"(.//span[{_has_class('mw-headline')}])[1]")
+
+
+def _text(element):
+    # Same as BeautifulSoup's get_text(): every descendant text node, in order
+    return "".join(element.itertext())
+
+
+def extract_lxml(html: bytes):
+    """C-parser extractor (libxml2) producing the same fields as extract_bs4.
+
+    Only the content div is walked after parsing; the XPath queries are
+    compiled once at import.
+    """
+    try:
+        html.decode("utf-8")
+        root = etree.fromstring(html, _lxml_parser)
+    except UnicodeDecodeError:
+        # Not UTF-8: decode the way BeautifulSoup would (declared charset, then sniffing)
+        from bs4 import UnicodeDammit
+
+        root = etree.fromstring(UnicodeDammit(html, is_html=True).unicode_markup, lxml.html.HTMLParser(remove_comments=True))
+    if root is None:
+        raise Exception(NO_CONTENT_ERROR)
+    # get_text() in BeautifulSoup skips these; drop them but keep the text after them
+    etree.strip_elements(root, 'script', 'style', 'template', with_tail=False)
+
+    found = _TITLE(root)
+    title = _text(found[0]).strip() if found else "Unknown Title"
+
+    found = _CONTENT(root) or _BODY_CONTENT(root)
+    if not found:
+        raise Exception(NO_CONTENT_ERROR)
+    content_div = found[0]
+
+    paragraphs = []
+    sections = []
+    outline = []
+    for element in content_div.iter('p', 'h2'):
+        if element.tag == 'p':
+            paragraphs.append(_text(element))
+            continue
+        found = _HEADLINE(element)
+        if found:
+            sections.append(_text(found[0]).strip())
+        outline.append((_text(found[0] if found else element).strip(), len(paragraphs)))
+
+    found = _CANONICAL(root)
+    canonical_url = found[0].get('href') if found else None
+
+    return title, paragraphs, sections, canonical_url, outline
+
+
+EXTRACTORS = {"bs4": extract_bs4}
+if lxml is not None:
+    EXTRACTORS["lxml"] = extract_lxml
+
+# Which extractor the scraper uses; lxml when installed, else the pure-Python reference
+HTML_EXTRACTOR = os.getenv("SCRAPER_HTML_EXTRACTOR", "lxml" if lxml is not None else "bs4")
+
+
+def extract(html: bytes, extractor=None):
+    """Returns (title, paragraph texts, section headlines, canonical URL, outline) for a Wikipedia page.
+
+    `outline` lists (heading, index of the first paragraph after it) for every h2
+    in the content, which is how the paragraphs are grouped into sections.
+    """
+    return EXTRACTORS[extractor or HTML_EXTRACTOR](html)
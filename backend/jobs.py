@@ -0,0 +1,198 @@
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+
+try:
+    from . import models
+    from .database import AsyncSessionLocal
+    from .diagnostics import get_logger
+except ImportError:
+    import models
+    from database import AsyncSessionLocal
+    from diagnostics import get_logger
+
+logger = get_logger("jobs")
+
+# Worker tasks per API process; 0 leaves queued jobs to other processes
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Retry n waits about JOB_RETRY_BASE * 2**(n-1) seconds, with jitter
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "5"))
+# A running job whose worker has not finished it by then is picked up again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Idle workers re-check the table this often (new jobs in this process wake them at once)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+Job = models.Job
+
+
+def _due(now):
+    return or_(
+        and_(Job.status == "queued", Job.run_after <= now),
+        # Claimed by a worker that crashed or hung before finishing
+        and_(Job.status == "running", Job.locked_until < now),
+    )
+
+
+def retryable(error):
+    # A client error (an HTTPException 4xx: a missing page, not an article) fails the same way every time
+    status = getattr(error, "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500)
+
+
+def retry_delay(attempt, base=JOB_RETRY_BASE):
+    return base * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+class JobWorkerPool:
+    """Runs jobs from the `jobs` table on a fixed number of asyncio worker tasks.
+
+    `handler(job)` does the work and returns the resulting quiz id; an
+    exception fails the attempt, or the job at once if it is a 4xx. Jobs are
+    claimed with a conditional UPDATE, so any number of processes can share
+    the table on SQLite or Postgres. The lease is extended while the handler
+    runs, so only a worker that stopped loses its job.
+    """
+
+    def __init__(self, handler, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS,
+                 lease_seconds=JOB_LEASE_SECONDS, poll_interval=JOB_POLL_INTERVAL):
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.busy = 0
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._run()))
+        logger.info("Job workers started", extra={"workers": self.workers})
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def enqueue(self, db, url, canonical_url):
+        """Returns the unfinished job for this article, or queues a new one."""
+        result = await db.execute(
+            select(Job)
+            .where(Job.canonical_url == canonical_url, Job.status.in_(("queued", "running")))
+            .order_by(Job.id)
+            .limit(1)
+        )
+        job = result.scalars().first()
+        if job is None:
+            job = Job(url=url, canonical_url=canonical_url, status="queued")
+            db.add(job)
+            await db.commit()
+            self.notify()
+        return job
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self._claim()
+            except Exception:
+                logger.exception("Claiming a job failed")
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(*claimed)
+            except Exception:
+                # Recording the outcome failed; the job's lease lapses and another claim retries it
+                logger.exception("Running a job failed", extra={"job_id": claimed[0].id})
+
+    async def _claim(self):
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+            candidates = (await db.execute(
+                select(Job.id).where(_due(now)).order_by(Job.run_after, Job.id).limit(self.workers)
+            )).scalars().all()
+            for job_id in candidates:
+                # Another worker may take the same row first; only one UPDATE matches
+                token = uuid.uuid4().hex
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, _due(now))
+                    .values(status="running", attempts=Job.attempts + 1, locked_by=token,
+                            locked_until=now + timedelta(seconds=self.lease_seconds), updated_at=now)
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    return await db.get(Job, job_id), token
+        return None
+
+    async def _finish(self, job_id, token, **values):
+        async with AsyncSessionLocal() as db:
+            # Matching the claim token: a job taken over after its lease lapsed isn't overwritten
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.locked_by == token)
+                .values(locked_by=None, locked_until=None, updated_at=datetime.utcnow(), **values)
+            )
+            await db.commit()
+
+    async def _execute(self, job, token):
+        if job.attempts > self.max_attempts:
+            # Its last attempt was claimed by a worker that never came back
+            await self._finish(job.id, token, status="failed", attempts=self.max_attempts,
+                               error=job.error or "Worker stopped while running the job")
+            return
+
+        self.busy += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, token))
+        try:
+            quiz_id = await self.handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without counting this attempt
+            await asyncio.shield(self._finish(job.id, token, status="queued", attempts=job.attempts - 1))
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if job.attempts >= self.max_attempts or not retryable(e):
+                logger.error("Job failed", extra={"job_id": job.id, "attempts": job.attempts, "error": error})
+                await self._finish(job.id, token, status="failed", error=error)
+            else:
+                delay = retry_delay(job.attempts)
+                logger.warning("Job attempt failed; retrying", extra={
+                    "job_id": job.id, "attempts": job.attempts, "retry_in": round(delay, 1), "error": error,
+                })
+                await self._finish(job.id, token, status="queued", error=error,
+                                   run_after=datetime.utcnow() + timedelta(seconds=delay))
+        else:
+            await self._finish(job.id, token, status="succeeded", quiz_id=quiz_id, error=None)
+        finally:
+            heartbeat.cancel()
+            self.busy -= 1
+
+    async def _heartbeat(self, job_id, token):
+        # Pushes locked_until forward a few times per lease while the handler runs
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(Job)
+                        .where(Job.id == job_id, Job.locked_by == token)
+                        .values(locked_until=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await db.commit()
+            except Exception:
+                logger.exception("Extending a job lease failed", extra={"job_id": job_id})
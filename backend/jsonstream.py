@@ -0,0 +1,133 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class JsonObjectStream:
+    """Incremental scanner for one JSON object arriving in pieces (e.g. LLM tokens).
+
+    feed() returns the events completed by the new text:
+
+    - ("field", key, value) when a top-level member's value is complete
+    - ("item", key, index, value) when an element of a top-level array is complete
+
+    so callers can act on `summary` or each `quiz` question long before the
+    closing brace arrives. Text before the first "{" (such as a markdown fence)
+    is skipped. Each completed value is decoded with json.loads, so only the
+    scanning is incremental.
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._expect_key = False
+        self._value_start = None
+        self._item_start = None
+        self._item_index = 0
+        self._array_key = None
+        self.done = False
+
+    def _slice(self, start, end):
+        return "".join(self._buf[start:end])
+
+    def _field(self, end):
+        value = json.loads(self._slice(self._value_start, end).strip())
+        self._value_start = None
+        return ("field", self._key, value)
+
+    def _item(self, end):
+        value = json.loads(self._slice(self._item_start, end).strip())
+        self._item_start = None
+        self._item_index += 1
+        return ("item", self._array_key, self._item_index - 1, value)
+
+    def feed(self, text):
+        events = []
+        self._buf.extend(text)
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self.done:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = json.loads(self._slice(self._key_start, i + 1))
+                        self._key_start = None
+                    elif self._depth == 1 and self._value_start is not None:
+                        events.append(self._field(i + 1))
+                    elif self._depth == 2 and self._array_key is not None and self._item_start is not None:
+                        events.append(self._item(i + 1))
+                continue
+
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+            if c in _WHITESPACE:
+                continue
+
+            in_top_array = self._depth == 2 and self._array_key is not None
+            starts_value = self._depth == 1 and not self._expect_key and self._value_start is None
+            starts_item = in_top_array and self._item_start is None and c not in ",]"
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+                    self._expect_key = False
+                elif starts_value:
+                    self._value_start = i
+                elif starts_item:
+                    self._item_start = i
+            elif c in "{[":
+                if starts_value:
+                    self._value_start = i
+                    if c == "[":
+                        self._array_key = self._key
+                        self._item_index = 0
+                elif starts_item:
+                    self._item_start = i
+                self._depth += 1
+            elif c in "}]":
+                # A scalar still open at this level ends here
+                if in_top_array and self._item_start is not None and buf[self._item_start] not in '{["':
+                    events.append(self._item(i))
+                if self._depth == 1 and self._value_start is not None:
+                    events.append(self._field(i))
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+                elif self._depth == 1:
+                    self._array_key = None
+                    if self._value_start is not None:
+                        events.append(self._field(i + 1))
+                elif self._depth == 2 and self._array_key is not None and self._item_start is not None:
+                    events.append(self._item(i + 1))
+            elif c == ",":
+                if self._depth == 1:
+                    if self._value_start is not None:
+                        events.append(self._field(i))
+                    self._expect_key = True
+                elif in_top_array and self._item_start is not None:
+                    events.append(self._item(i))
+            elif c == ":":
+                pass
+            elif starts_value:
+                # number, true, false or null
+                self._value_start = i
+            elif starts_item:
+                self._item_start = i
+        self._pos = len(buf)
+        return events
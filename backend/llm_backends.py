@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+try:
+    from .diagnostics import get_logger
+except ImportError:
+    from diagnostics import get_logger
+
+logger = get_logger("llm_backends")
+
+# groq (default), or openai for any OpenAI-compatible /chat/completions server
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+# For LLM_BACKEND=openai, e.g. http://127.0.0.1:9000/v1 (the stand-in in benchmarks/standin_llm.py)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# record: call the backend and save every response; replay: answer only from saved responses
+LLM_RECORD_MODE = os.getenv("LLM_RECORD_MODE", "")
+LLM_RECORD_DIR = os.getenv("LLM_RECORD_DIR", str(Path(__file__).parent / "llm_recordings"))
+
+
+class LLMError(Exception):
+    """A failed LLM call. `retryable` errors (429, 5xx, network) may succeed if tried again."""
+
+    def __init__(self, message, status_code=None, retry_after=None, retryable=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+class Completion:
+    def __init__(self, text, total_tokens=None, prompt_tokens=None, completion_tokens=None):
+        self.text = text
+        # Prompt + output tokens as reported by the server, when it does
+        self.total_tokens = total_tokens
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+def _retry_after(headers):
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers.get(header)) * scale
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _status_error(status_code, headers, message):
+    return LLMError(
+        f"LLM returned HTTP {status_code}: {message[:200]}",
+        status_code=status_code,
+        retry_after=_retry_after(headers),
+        retryable=status_code == 429 or status_code >= 500,
+    )
+
+
+class LLMBackend(ABC):
+    """One chat model behind two calls.
+
+    complete() returns a Completion; stream() sends the request and returns an
+    async iterator of text deltas, so request errors surface before streaming
+    starts. Both raise LLMError.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, prompt, max_tokens, json_mode=True):
+        ...
+
+    @abstractmethod
+    async def stream(self, prompt, max_tokens):
+        ...
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, api_key, model=LLM_MODEL):
+        import groq
+
+        self._groq = groq
+        # Retries (and rate limits) are handled by llm_scheduler, not the SDK
+        self.client = groq.AsyncGroq(api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT)
+        self.model = model
+
+    async def _create(self, prompt, max_tokens, **options):
+        try:
+            return await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0,
+                max_tokens=max_tokens,
+                top_p=1,
+                **options
+            )
+        except self._groq.APIStatusError as e:
+            raise _status_error(e.status_code, e.response.headers, str(e)) from e
+        except self._groq.APIConnectionError as e:
+            raise LLMError(f"LLM connection failed: {e}", retryable=True) from e
+
+    async def complete(self, prompt, max_tokens, json_mode=True):
+        options = {"stream": False}
+        if json_mode:
+            options["response_format"] = {"type": "json_object"}
+        completion = await self._create(prompt, max_tokens, **options)
+        usage = completion.usage
+        if not usage:
+            return Completion(completion.choices[0].message.content)
+        return Completion(
+            completion.choices[0].message.content, usage.total_tokens, usage.prompt_tokens, usage.completion_tokens
+        )
+
+    async def stream(self, prompt, max_tokens):
+        # No response_format: Groq's JSON mode does not stream, the prompt alone asks for JSON
+        chunks = await self._create(prompt, max_tokens, stream=True)
+
+        async def deltas():
+            async for chunk in chunks:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+
+        return deltas()
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Plain-HTTP client for any OpenAI-style /chat/completions endpoint (vLLM, llama.cpp, stand-ins)."""
+
+    name = "openai"
+
+    def __init__(self, base_url, api_key="", model=LLM_MODEL):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.model = model
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=5.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    def _body(self, prompt, max_tokens, **options):
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0,
+            "max_tokens": max_tokens,
+            "top_p": 1,
+            **options,
+        }
+
+    async def _send(self, body, stream):
+        import httpx
+
+        client = self._get_client()
+        try:
+            response = await client.send(client.build_request("POST", self.url, json=body), stream=stream)
+        except httpx.HTTPError as e:
+            raise LLMError(f"LLM connection failed: {e}", retryable=True) from e
+        if response.status_code >= 400:
+            await response.aread()
+            await response.aclose()
+            raise _status_error(response.status_code, response.headers, response.text)
+        return response
+
+    async def complete(self, prompt, max_tokens, json_mode=True):
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = await self._send(self._body(prompt, max_tokens, **options), stream=False)
+        data = response.json()
+        usage = data.get("usage") or {}
+        return Completion(
+            data["choices"][0]["message"]["content"], usage.get("total_tokens"),
+            usage.get("prompt_tokens"), usage.get("completion_tokens"),
+        )
+
+    async def stream(self, prompt, max_tokens):
+        response = await self._send(self._body(prompt, max_tokens, stream=True), stream=True)
+
+        async def deltas():
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    choices = json.loads(payload).get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+            finally:
+                await response.aclose()
+
+        return deltas()
+
+
+class RecordReplayBackend(LLMBackend):
+    """Saves responses to `directory` (record) or answers from them alone (replay).
+
+    Recordings are keyed by a hash of the model, prompt, max_tokens and JSON
+    mode, one JSON file per call, so a replayed run is deterministic and needs
+    neither network nor API key. A replay with no recording raises LLMError.
+    """
+
+    def __init__(self, inner, directory=LLM_RECORD_DIR, mode="replay", model=LLM_MODEL):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"LLM_RECORD_MODE must be 'record' or 'replay', not {mode!r}")
+        if mode == "record" and inner is None:
+            raise ValueError("LLM_RECORD_MODE=record needs a configured LLM backend")
+        self.inner = inner
+        self.directory = Path(directory)
+        self.mode = mode
+        self.model = inner.model if inner is not None else model
+        self.name = f"{mode}:{inner.name if inner is not None else 'recordings'}"
+
+    def _path(self, prompt, max_tokens, json_mode):
+        key = json.dumps([self.model, prompt, max_tokens, json_mode])
+        return self.directory / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.json"
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise LLMError(f"No recorded LLM response for this prompt ({path.name}) in {self.directory}")
+
+    def _save(self, path, prompt, text, usage=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model,
+                "prompt_chars": len(prompt),
+                "recorded_at": time.time(),
+                "total_tokens": usage.total_tokens if usage else None,
+                "prompt_tokens": usage.prompt_tokens if usage else None,
+                "completion_tokens": usage.completion_tokens if usage else None,
+                "text": text,
+            }, f)
+        os.replace(tmp, path)
+
+    async def complete(self, prompt, max_tokens, json_mode=True):
+        path = self._path(prompt, max_tokens, json_mode)
+        if self.mode == "replay":
+            saved = self._load(path)
+            return Completion(
+                saved["text"], saved.get("total_tokens"), saved.get("prompt_tokens"), saved.get("completion_tokens")
+            )
+        completion = await self.inner.complete(prompt, max_tokens, json_mode)
+        self._save(path, prompt, completion.text, completion)
+        return completion
+
+    async def stream(self, prompt, max_tokens):
+        path = self._path(prompt, max_tokens, False)
+        if self.mode == "replay":
+            text = self._load(path)["text"]
+
+            async def replayed(piece=16):
+                for i in range(0, len(text), piece):
+                    yield text[i:i + piece]
+
+            return replayed()
+
+        deltas = await self.inner.stream(prompt, max_tokens)
+
+        async def recorded():
+            parts = []
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+            # Only complete streams are saved
+            self._save(path, prompt, "".join(parts))
+
+        return recorded()
+
+
+def create_backend(groq_api_key=None):
+    """Builds the backend named by LLM_BACKEND, wrapped for LLM_RECORD_MODE; None if unconfigured."""
+    if LLM_BACKEND == "groq":
+        inner = GroqBackend(groq_api_key) if groq_api_key else None
+    elif LLM_BACKEND == "openai":
+        if not LLM_BASE_URL:
+            raise ValueError("LLM_BACKEND=openai needs LLM_BASE_URL")
+        inner = OpenAICompatibleBackend(LLM_BASE_URL, LLM_API_KEY)
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND {LLM_BACKEND!r} (expected 'groq' or 'openai')")
+
+    if LLM_RECORD_MODE:
+        return RecordReplayBackend(inner, LLM_RECORD_DIR, LLM_RECORD_MODE)
+    return inner
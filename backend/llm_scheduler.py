@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from contextvars import ContextVar
+
+try:
+    from .diagnostics import get_logger
+    from .llm_backends import LLMError
+except ImportError:
+    from diagnostics import get_logger
+    from llm_backends import LLMError
+
+logger = get_logger("llm_scheduler")
+
+# Account limits to stay under; 0 means no client-side limit (429s are still retried)
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+# Largest burst, in seconds' worth of the limit (Groq's windows are a minute)
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "60"))
+# Calls waiting for their turn; beyond this new ones are rejected with SchedulerBusy
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+# Retry n waits about LLM_RETRY_BASE * 2**n seconds (jittered), or Retry-After when given
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "1"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "60"))
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Priority of LLM calls made from the current task; batch and job code paths set BATCH
+llm_priority = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+class SchedulerBusy(Exception):
+    """The LLM queue is full; the caller should back off and try again later."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units a minute, holding at most `burst_seconds` worth. 0 is unlimited."""
+
+    def __init__(self, per_minute, burst_seconds=LLM_BURST_SECONDS, clock=time.monotonic):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.clock = clock
+        self._stamp = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def wait_time(self, amount):
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        # More than the bucket holds waits for a full bucket rather than forever
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount):
+        # May go negative (an underestimate settled later); the debt delays later calls
+        if self.rate > 0:
+            self._refill()
+            self.level -= amount
+
+
+class LLMScheduler:
+    """Admits LLM calls under requests- and tokens-per-minute budgets, by priority.
+
+    Callers wait in one priority queue (interactive ahead of batch, FIFO
+    within a priority); a dispatcher task admits the head whenever both token
+    buckets can pay for it. Rate-limit and transient errors are retried with
+    jittered exponential backoff, honoring Retry-After, and a 429 pauses all
+    admissions until the server's wait is over.
+    """
+
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, max_queue=LLM_MAX_QUEUE, max_retries=LLM_MAX_RETRIES,
+                 burst_seconds=LLM_BURST_SECONDS, clock=time.monotonic, sleep=asyncio.sleep):
+        self.requests = TokenBucket(rpm, burst_seconds, clock)
+        self.tokens = TokenBucket(tpm, burst_seconds, clock)
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        # Tests pass a fake clock and a sleep that advances it
+        self.clock = clock
+        self.sleep = sleep
+        self.in_flight = 0
+        self.counters = {"admitted": 0, "retries": 0, "rate_limited": 0, "rejected": 0, "failed": 0}
+        self._paused_until = 0.0
+        self._heap = []
+        self._seq = itertools.count()
+        self._loop = None
+        self._dispatcher = None
+        self._wakeup = None
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher.done():
+            # First use, or a new event loop (scripts calling asyncio.run more than once)
+            self._loop = loop
+            self._heap = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            while self._heap and self._heap[0][3].done():
+                # Caller gave up (cancelled) while queued
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            tokens = self._heap[0][2]
+            wait = max(self._paused_until - self.clock(), self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                await self.sleep(wait)
+                continue
+            _, _, tokens, turn = heapq.heappop(self._heap)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.counters["admitted"] += 1
+            turn.set_result(None)
+
+    async def _turn(self, priority, tokens):
+        self._ensure_dispatcher()
+        if len(self._heap) >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise SchedulerBusy(f"LLM queue is full ({self.max_queue} waiting)")
+        turn = self._loop.create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), tokens, turn))
+        self._wakeup.set()
+        try:
+            await turn
+        except asyncio.CancelledError:
+            turn.cancel()
+            raise
+
+    async def run(self, call, estimated_tokens, priority=None):
+        """Awaits `call()` (one LLM request) once the budgets allow it, retrying transient failures.
+
+        `estimated_tokens` (prompt plus expected output) is charged to the TPM
+        bucket up front; if the result reports `total_tokens` the difference is
+        settled afterwards. Retryable LLMErrors are retried.
+        """
+        priority = llm_priority.get() if priority is None else priority
+        attempt = 0
+        while True:
+            await self._turn(priority, estimated_tokens)
+            self.in_flight += 1
+            try:
+                result = await call()
+            except Exception as e:
+                if not (isinstance(e, LLMError) and e.retryable) or attempt >= self.max_retries:
+                    self.counters["failed"] += 1
+                    raise
+                delay = self._backoff(e, attempt, priority)
+            else:
+                if getattr(result, "total_tokens", None):
+                    self.tokens.take(result.total_tokens - estimated_tokens)
+                return result
+            finally:
+                self.in_flight -= 1
+            attempt += 1
+            await self.sleep(delay)
+
+    def _backoff(self, error, attempt, priority):
+        server_wait = error.retry_after
+        if server_wait is not None:
+            delay = min(server_wait, LLM_RETRY_MAX) + random.uniform(0, LLM_RETRY_BASE)
+        else:
+            delay = min(LLM_RETRY_BASE * 2 ** attempt, LLM_RETRY_MAX) * random.uniform(0.5, 1.5)
+        if error.status_code == 429:
+            # The account is over its limit: hold everyone back, not just this call
+            self.counters["rate_limited"] += 1
+            self._paused_until = max(self._paused_until, self.clock() + delay)
+        self.counters["retries"] += 1
+        logger.warning("LLM call failed; retrying", extra={
+            "attempt": attempt + 1, "retry_in": round(delay, 2), "error": str(error)[:200],
+            "priority": PRIORITY_NAMES.get(priority, priority),
+        })
+        return delay
+
+    def stats(self):
+        self.requests.wait_time(0)
+        self.tokens.wait_time(0)
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, turn in self._heap:
+            if not turn.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                queued[name] = queued.get(name, 0) + 1
+        return {
+            "queued": queued,
+            "in_flight": self.in_flight,
+            "paused_for": round(max(0.0, self._paused_until - self.clock()), 2),
+            "rpm_available": round(self.requests.level, 1) if self.requests.rate > 0 else None,
+            "tpm_available": round(self.tokens.level, 1) if self.tokens.rate > 0 else None,
+            **self.counters,
+        }
+
+
+llm_scheduler = LLMScheduler()
@@ -1,24 +1,95 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Response, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import delete, insert, select, text, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from contextlib import asynccontextmanager
+from typing import Optional
+from datetime import datetime
+import asyncio
+import base64
 import json
+import math
+import os
+import time
 
 try:
-    from . import models, schemas
-    from .database import engine, get_db
-    from .scraper import scrape_wikipedia
-    from .quiz_generator import generate_quiz_from_text
+    from . import envfile  # noqa: F401 -- before any module reads its settings
+    from . import models, question_bank, schemas, search
+    from .database import AsyncSessionLocal, dispose_async_engines, get_db
+    from .scraper import article_hash, scrape_wikipedia, shutdown_parse_pool
+    from .preprocess import preprocess_article
+    from .quiz_generator import generate_quiz_for_article, get_llm, stream_quiz_for_article, unavailable
+    from .singleflight import SingleFlight, run_with_lease
+    from .urls import canonicalize_url
+    from .cache import response_cache
+    from .jobs import JOB_WORKERS, JobWorkerPool
+    from .llm_scheduler import BATCH, llm_priority, llm_scheduler
+    from .metrics import (METRICS_ENABLED, METRICS_TIMING_HEADER, generations_in_flight, llm_skips, quiz_lookups,
+                          registry as metrics_registry, request_timings, server_timing, timed)
+    from .diagnostics import configure_logging, debug_ring, get_logger, new_request_id, request_id_var
 except ImportError:
-    import models, schemas
-    from database import engine, get_db
-    from scraper import scrape_wikipedia
-    from quiz_generator import generate_quiz_from_text
+    import envfile  # noqa: F401
+    import models, question_bank, schemas, search
+    from database import AsyncSessionLocal, dispose_async_engines, get_db
+    from scraper import article_hash, scrape_wikipedia, shutdown_parse_pool
+    from preprocess import preprocess_article
+    from quiz_generator import generate_quiz_for_article, get_llm, stream_quiz_for_article, unavailable
+    from singleflight import SingleFlight, run_with_lease
+    from urls import canonicalize_url
+    from cache import response_cache
+    from jobs import JOB_WORKERS, JobWorkerPool
+    from llm_scheduler import BATCH, llm_priority, llm_scheduler
+    from metrics import (METRICS_ENABLED, METRICS_TIMING_HEADER, generations_in_flight, llm_skips, quiz_lookups,
+                         registry as metrics_registry, request_timings, server_timing, timed)
+    from diagnostics import configure_logging, debug_ring, get_logger, new_request_id, request_id_var
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+# Tables are created and upgraded by migrate.py, run before the server starts
+configure_logging()
+logger = get_logger("api")
 
-app = FastAPI(title="WikiQuiz API")
+# Nothing heavy happens at import: the LLM SDK, HTTP clients and DB engine are built on
+# first use. "background" builds them right after startup, off the request path (GET
+# /readyz waits for it); "off" leaves them to the first request that needs each.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")
+_warmup_task = None
+
+def _build_clients():
+    import httpx  # noqa: F401 -- the scraper's and LLM backends' HTTP client
+    get_llm()
+
+async def _warm_up():
+    started = time.perf_counter()
+    try:
+        # Imports run in a thread so requests arriving meanwhile are still served
+        await asyncio.to_thread(_build_clients)
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+    except Exception:
+        # Not fatal: whatever failed is retried by the first request that needs it
+        logger.exception("Warmup failed")
+    logger.info("Warmup finished", extra={"seconds": round(time.perf_counter() - started, 3)})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _warmup_task
+    if STARTUP_WARMUP == "background":
+        _warmup_task = asyncio.create_task(_warm_up())
+    if JOB_WORKERS > 0:
+        # Defined with the job routes below
+        job_pool.start()
+    try:
+        yield
+    finally:
+        if _warmup_task is not None:
+            _warmup_task.cancel()
+        await job_pool.stop()
+        shutdown_parse_pool()
+        await dispose_async_engines()
+
+app = FastAPI(title="WikiQuiz API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -27,53 +98,377 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
+)
+
+http_seconds = metrics_registry.histogram(
+    "wikiquiz_http_request_duration_seconds", "Time to the response headers, by route template.",
+    ["method", "route", "status"],
+)
+http_in_flight = metrics_registry.gauge("wikiquiz_http_requests_in_flight", "HTTP requests being handled.")
+# Read from their owners when /metrics is scraped, so they cost nothing per request
+metrics_registry.counter(
+    "wikiquiz_response_cache_requests_total", "In-process response cache lookups.", ["result"],
+    collect=lambda: {("hit",): response_cache.hits, ("miss",): response_cache.misses},
+)
+metrics_registry.gauge("wikiquiz_response_cache_bytes", "Bytes held by the response cache.",
+                       collect=lambda: response_cache.size)
+metrics_registry.gauge("wikiquiz_llm_calls_in_flight", "LLM calls admitted and not yet finished.",
+                       collect=lambda: llm_scheduler.in_flight)
+metrics_registry.gauge(
+    "wikiquiz_llm_calls_queued", "LLM calls waiting for rate-limit budget.", ["priority"],
+    collect=lambda: {(name,): n for name, n in llm_scheduler.stats()["queued"].items()},
 )
+metrics_registry.counter(
+    "wikiquiz_llm_scheduler_events_total", "LLM scheduler admissions, retries, 429s, rejections and failures.",
+    ["event"], collect=lambda: {(name,): n for name, n in llm_scheduler.counters.items()},
+)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Correlation ID for every log line and debug-ring entry of this request
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    timings_token = request_timings.set({}) if METRICS_TIMING_HEADER else None
+    start = time.perf_counter()
+    http_in_flight.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        http_in_flight.dec()
+        elapsed = time.perf_counter() - start
+        if METRICS_ENABLED:
+            # The route template, not the raw path, keeps label values bounded
+            route = request.scope.get("route")
+            http_seconds.observe(elapsed, request.method, route.path if route else "unmatched", str(status))
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    if timings_token is not None:
+        # Stages finished before the headers went out (for streams, not the whole stream)
+        response.headers["Server-Timing"] = server_timing(request_timings.get(), elapsed)
+        request_timings.reset(timings_token)
+    return response
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "DeepKlarity Quiz API is running!", "docs_url": "/docs"}
 
+@app.get("/healthz")
+async def liveness():
+    # The process is up and its event loop answers; never touches the database
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    """200 once this worker should get traffic: warmup done and the migrated schema readable."""
+    if _warmup_task is not None and not _warmup_task.done():
+        raise HTTPException(status_code=503, detail="Warming up")
+    try:
+        async with AsyncSessionLocal() as db:
+            # Selecting every mapped column also catches a database migrate.py has not upgraded
+            await db.execute(select(models.QuizRecord).limit(1))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database not ready: {str(e)[:200]}")
+    return {"status": "ready"}
+
+def _record_to_response(quiz_record):
+    questions = []
+    for q in quiz_record.questions:
+        questions.append(schemas.QuestionBase(
+            question=q.question_text,
+            options=json.loads(q.options) if isinstance(q.options, str) else q.options,
+            answer=q.answer,
+            difficulty=q.difficulty,
+            explanation=q.explanation
+        ))
+
+    return schemas.QuizResponse(
+        id=quiz_record.id,
+        url=quiz_record.url,
+        title=quiz_record.title,
+        summary=quiz_record.summary,
+        key_entities=json.loads(quiz_record.key_entities) if isinstance(quiz_record.key_entities, str) else quiz_record.key_entities,
+        sections=json.loads(quiz_record.sections) if isinstance(quiz_record.sections, str) else quiz_record.sections,
+        quiz=questions,
+        related_topics=json.loads(quiz_record.related_topics) if isinstance(quiz_record.related_topics, str) else quiz_record.related_topics,
+        created_at=quiz_record.created_at
+    )
+
+def _json_response(body: bytes):
+    # Already-serialized JSON: skips model rebuilding and response_model validation
+    return Response(content=body, media_type="application/json")
+
+async def _load_response_json(db: AsyncSession, quiz_id: int, body):
+    if body is None:
+        # Quiz stored before response_json existed: serialize it once and keep the bytes
+        result = await db.execute(
+            select(models.QuizRecord)
+            .options(selectinload(models.QuizRecord.questions))
+            .where(models.QuizRecord.id == quiz_id)
+        )
+        quiz_record = result.scalars().one()
+        body = _record_to_response(quiz_record).model_dump_json().encode()
+        quiz_record.response_json = body
+        await db.commit()
+    return body
+
+def _cache_quiz(quiz_id: int, canonical_url: str, body: bytes):
+    response_cache.set(("quiz", quiz_id), body)
+    response_cache.set(("url", canonical_url), body)
+
+async def _find_cached_quiz(db: AsyncSession, canonical_url: str):
+    body = response_cache.get(("url", canonical_url))
+    if body is not None:
+        return _json_response(body)
+
+    with timed("db_read"):
+        result = await db.execute(
+            select(models.QuizRecord.id, models.QuizRecord.response_json)
+            .where(models.QuizRecord.canonical_url == canonical_url)
+        )
+        row = result.first()
+    if row:
+        body = await _load_response_json(db, row.id, row.response_json)
+        _cache_quiz(row.id, canonical_url, body)
+        return _json_response(body)
+    return None
+
+async def _find_cached_quizzes(db: AsyncSession, canonical_urls):
+    """Batch form of _find_cached_quiz: {canonical_url: body} for the articles already stored."""
+    found = {}
+    missing = []
+    for canonical_url in canonical_urls:
+        body = response_cache.get(("url", canonical_url))
+        if body is not None:
+            found[canonical_url] = body
+        else:
+            missing.append(canonical_url)
+
+    # Bounded IN lists keep every query under the driver's bind-parameter limit
+    for i in range(0, len(missing), 500):
+        with timed("db_read"):
+            result = await db.execute(
+                select(models.QuizRecord.id, models.QuizRecord.canonical_url, models.QuizRecord.response_json)
+                .where(models.QuizRecord.canonical_url.in_(missing[i:i + 500]))
+            )
+            rows = result.all()
+        for row in rows:
+            body = await _load_response_json(db, row.id, row.response_json)
+            _cache_quiz(row.id, row.canonical_url, body)
+            found[row.canonical_url] = body
+    return found
+
+# Concurrent requests for the same article in this worker share one generation
+generation_flight = SingleFlight()
+
+# Upper bound on scrape + LLM pipelines running at once in this worker
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "64"))
+generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
 @app.post("/generate_quiz", response_model=schemas.QuizResponse)
-def generate_quiz(request: schemas.QuizRequest, db: Session = Depends(get_db)):
-    url = request.url
+async def generate_quiz(request: schemas.QuizRequest, db: AsyncSession = Depends(get_db)):
+    return await _get_or_generate(request.url, db, refresh=request.refresh)
+
+async def _no_quiz():
+    return None
+
+async def _get_or_generate(url: str, db: AsyncSession, refresh: bool = False):
+    # Cache by article, not by spelling of the URL
+    cache_key = canonicalize_url(url)
     
-    # 1. Check Cache
-    existing_quiz = db.query(models.QuizRecord).filter(models.QuizRecord.url == url).first()
-    if existing_quiz:
-        # Reconstruct response from DB
-        questions = []
-        for q in existing_quiz.questions:
-            questions.append(schemas.QuestionBase(
-                question=q.question_text,
-                options=json.loads(q.options) if isinstance(q.options, str) else q.options,
-                answer=q.answer,
-                difficulty=q.difficulty,
-                explanation=q.explanation
-            ))
-            
-        return schemas.QuizResponse(
-            id=existing_quiz.id,
-            url=existing_quiz.url,
-            title=existing_quiz.title,
-            summary=existing_quiz.summary,
-            key_entities=json.loads(existing_quiz.key_entities) if isinstance(existing_quiz.key_entities, str) else existing_quiz.key_entities,
-            sections=json.loads(existing_quiz.sections) if isinstance(existing_quiz.sections, str) else existing_quiz.sections,
-            quiz=questions,
-            related_topics=json.loads(existing_quiz.related_topics) if isinstance(existing_quiz.related_topics, str) else existing_quiz.related_topics,
-            created_at=existing_quiz.created_at
-        )
+    # 1. Check Cache (a refresh always re-scrapes; the pipeline decides whether the LLM runs)
+    if not refresh:
+        cached = await _find_cached_quiz(db, cache_key)
+        if cached:
+            quiz_lookups.inc("hit")
+            return cached
+        quiz_lookups.inc("miss")
+    # Hand the connection back before waiting on the flight or lease: requests for one
+    # article waiting with theirs checked out could take the whole pool from the run
+    await db.close()
+
+    async def run():
+        # Its own session: the run is shared by every waiting request and outlives any one of them
+        async with AsyncSessionLocal() as session:
+            return await run_with_lease(
+                session, cache_key,
+                lookup=_no_quiz if refresh else lambda: _find_cached_quiz(session, cache_key),
+                generate=lambda: _generate_and_store(url, cache_key, session, refresh=refresh),
+            )
+
+    # Only one request per article runs the scrape + LLM; the rest wait for its result.
+    # Within a worker this is the in-process flight, across workers the DB lease.
+    return await generation_flight.do(cache_key, run)
+
+async def _generate_and_store(url: str, cache_key: str, db: AsyncSession, emit=None, refresh: bool = False):
+    # Hand the pooled connection back while we queue and wait on the network
+    await db.close()
+    async with generation_slots:
+        generations_in_flight.inc()
+        try:
+            return await _run_pipeline(url, cache_key, db, emit, refresh)
+        finally:
+            generations_in_flight.dec()
 
+def _serialize_quiz(response: schemas.QuizResponse) -> bytes:
+    return response.model_dump_json().encode()
+
+async def _store_quiz(db: AsyncSession, url: str, cache_key: str, scraped_data: dict, final_summary: str, llm_data: dict,
+                      replace_id: Optional[int] = None):
+    """Writes the quiz and its questions in one transaction and returns the stored response.
+
+    With `replace_id` the stored quiz is overwritten in place (a refresh of a
+    changed article), keeping its id and created_at.
+    """
+    if replace_id is None:
+        quiz_record = models.QuizRecord(canonical_url=cache_key)
+        db.add(quiz_record)
+    else:
+        quiz_record = await db.get(models.QuizRecord, replace_id)
+        await db.execute(delete(models.Question).where(models.Question.quiz_id == replace_id))
+    quiz_record.url = url
+    quiz_record.title = scraped_data["title"]
+    quiz_record.summary = final_summary
+    quiz_record.key_entities = llm_data.get("key_entities", {})
+    quiz_record.sections = scraped_data["sections"]
+    quiz_record.related_topics = llm_data.get("related_topics", [])
+    quiz_record.content_hash = scraped_data.get("content_hash") or article_hash(scraped_data["text"])
+    quiz_record.revision_id = scraped_data.get("revision_id")
+    # One transaction: the flush INSERTs the record (getting its id back),
+    # questions go in as a single executemany, and the commit writes response_json.
+    await db.flush()
+
+    # Add questions. Difficulty is lowercased once, for the rows and the response alike, so the
+    # question bank's difficulty filter matches it exactly and the frontend sees one casing
+    generated_questions = [{**q, "difficulty": str(q["difficulty"]).lower()} for q in llm_data.get("quiz", [])]
+    if generated_questions:
+        await db.execute(insert(models.Question), [
+            {
+                "quiz_id": quiz_record.id,
+                "question_text": q["question"],
+                "options": q["options"],
+                "answer": q["answer"],
+                "difficulty": q["difficulty"],
+                "explanation": q["explanation"],
+            }
+            for q in generated_questions
+        ])
+    
+    # Return saved record structure, built from memory and serialized once here for every cache hit
+    response = schemas.QuizResponse(
+        id=quiz_record.id,
+        url=url,
+        title=quiz_record.title,
+        summary=quiz_record.summary,
+        key_entities=quiz_record.key_entities,
+        sections=quiz_record.sections,
+        quiz=[schemas.QuestionBase(**q) for q in generated_questions],
+        related_topics=quiz_record.related_topics,
+        created_at=quiz_record.created_at,
+        truncated=llm_data.get("truncated", False),
+    )
+    quiz_record.response_json = _serialize_quiz(response)
+    await search.index_quiz(db, quiz_record.id, quiz_record.title, quiz_record.summary, quiz_record.key_entities,
+                            [q["question"] for q in generated_questions])
+    await question_bank.index_quiz_entities(db, quiz_record.id, quiz_record.key_entities, quiz_record.related_topics)
+    await db.commit()
+
+    response_cache.invalidate_prefix("history")
+    response_cache.invalidate_prefix("search")
+    _cache_quiz(quiz_record.id, cache_key, quiz_record.response_json)
+    return _json_response(quiz_record.response_json)
+
+async def _quiz_with_content(db: AsyncSession, content_hash: str):
+    """The LLM output (summary, key_entities, quiz, related_topics, truncated) of a stored quiz made from this text, or None."""
+    with timed("db_read"):
+        row = (await db.execute(
+            select(models.QuizRecord.id, models.QuizRecord.response_json)
+            .where(models.QuizRecord.content_hash == content_hash)
+            .limit(1)
+        )).first()
+    if row is None:
+        return None
+    stored = json.loads(await _load_response_json(db, row.id, row.response_json))
+    return {**{key: stored[key] for key in ("summary", "key_entities", "quiz", "related_topics")},
+            "truncated": stored.get("truncated", False)}
+
+async def _run_pipeline(url: str, cache_key: str, db: AsyncSession, emit=None, refresh: bool = False):
+    """Scrape, LLM, store. With `emit(event, data)` the LLM output is streamed to it as it arrives.
+
+    The LLM only runs for text no stored quiz was made from. With `refresh`
+    the article's stored quiz is kept if its text is unchanged and replaced
+    otherwise.
+    """
     # 2. Scrape
     try:
-        scraped_data = scrape_wikipedia(url)
+        scraped_data = await scrape_wikipedia(url)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Scraping error: {str(e)}")
+        # 400 for a page that is missing or not an article; 502 when Wikipedia couldn't be reached
+        status_code = 502 if getattr(e, "transient", False) else 400
+        raise HTTPException(status_code=status_code, detail=f"Scraping error: {str(e)}")
 
-    # 3. Generate with LLM
-    try:
-        llm_data = generate_quiz_from_text(scraped_data["text"])
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"LLM Generation error: {str(e)}")
+    # Redirect titles only reveal their target once fetched; the page's canonical link does
+    if scraped_data.get("canonical_url"):
+        resolved_key = canonicalize_url(scraped_data["canonical_url"])
+        if resolved_key != cache_key:
+            cache_key = resolved_key
+            cached = None if refresh else await _find_cached_quiz(db, cache_key)
+            if cached:
+                return cached
+
+    content_hash = scraped_data.get("content_hash") or article_hash(scraped_data["text"])
+    replace_id = None
+    if refresh:
+        with timed("db_read"):
+            stored = (await db.execute(
+                select(models.QuizRecord.id, models.QuizRecord.content_hash, models.QuizRecord.response_json)
+                .where(models.QuizRecord.canonical_url == cache_key)
+            )).first()
+        if stored is not None:
+            if stored.content_hash == content_hash:
+                llm_skips.inc("unchanged")
+                body = await _load_response_json(db, stored.id, stored.response_json)
+                _cache_quiz(stored.id, cache_key, body)
+                return _json_response(body)
+            replace_id = stored.id
+
+    if emit is not None:
+        emit("article", {"title": scraped_data["title"], "sections": scraped_data["sections"]})
+
+    # 3. Reuse the quiz of identical text stored under another URL, else generate with LLM
+    llm_data = await _quiz_with_content(db, content_hash)
+    if llm_data is not None:
+        llm_skips.inc("same_content")
+        if emit is not None:
+            emit("summary", llm_data["summary"])
+            for q in llm_data["quiz"]:
+                emit("question", q)
+    else:
+        # Only what the prompt needs: no reference markers, pronunciation, coordinates or repeats
+        with timed("preprocess"):
+            scraped_data = {**preprocess_article(scraped_data), "content_hash": content_hash}
+        try:
+            if emit is None:
+                llm_data = await generate_quiz_for_article(scraped_data)
+            else:
+                async for kind, payload in stream_quiz_for_article(scraped_data):
+                    if kind == "result":
+                        llm_data = payload
+                    else:
+                        emit(kind, payload)
+        except Exception as e:
+            if unavailable(e):
+                # Queue full, or still rate limited after the scheduler's retries: the client
+                # comes back when the server said to (10s when it didn't), no mock quiz
+                retry_after = math.ceil(getattr(e, "retry_after", None) or 10)
+                logger.warning("LLM unavailable",
+                               extra={"url": url, "retry_after": retry_after, "error": str(e)[:200]})
+                raise HTTPException(status_code=503, detail=f"LLM is overloaded: {e}",
+                                    headers={"Retry-After": str(retry_after)})
+            logger.exception("LLM generation failed", extra={"url": url})
+            raise HTTPException(status_code=500, detail=f"LLM Generation error: {str(e)}")
 
     # 4. Save to DB
     try:
@@ -85,49 +480,12 @@ def generate_quiz(request: schemas.QuizRequest, db: Session = Depends(get_db)):
         is_mock_data = "mock summary" in final_summary.lower() or "mock question" in str(llm_data).lower()
         
         if not is_mock_data:
-            quiz_record = models.QuizRecord(
-                url=url,
-                title=scraped_data["title"],
-                summary=final_summary,
-                key_entities=llm_data.get("key_entities", {}),
-                sections=scraped_data["sections"],
-                related_topics=llm_data.get("related_topics", [])
-            )
-            db.add(quiz_record)
-            db.commit()
-            db.refresh(quiz_record)
-
-            # Add questions
-            generated_questions = llm_data.get("quiz", [])
-            for q in generated_questions:
-                question = models.Question(
-                    quiz_id=quiz_record.id,
-                    question_text=q["question"],
-                    options=q["options"],
-                    answer=q["answer"],
-                    difficulty=q["difficulty"],
-                    explanation=q["explanation"]
-                )
-                db.add(question)
-            
-            db.commit()
-            
-            # Return saved record structure
-            return schemas.QuizResponse(
-                id=quiz_record.id,
-                url=url,
-                title=quiz_record.title,
-                summary=quiz_record.summary,
-                key_entities=quiz_record.key_entities,
-                sections=quiz_record.sections,
-                quiz=[schemas.QuestionBase(**q) for q in generated_questions],
-                related_topics=quiz_record.related_topics,
-                created_at=quiz_record.created_at
-            )
+            with timed("db_write"):
+                return await _store_quiz(db, url, cache_key, scraped_data, final_summary, llm_data, replace_id)
         else:
              # If it is mock data, return it directly without saving to DB
             # We need a dummy ID for the schema
-            print("WARNING: Generated data appears to be mock/error data. Not saving to DB.")
+            logger.warning("Generated data appears to be mock/error data; not saving to DB", extra={"url": url})
             return schemas.QuizResponse(
                 id=0, # Arbitrary ID for non-persisted data
                 url=url,
@@ -140,41 +498,360 @@ def generate_quiz(request: schemas.QuizRequest, db: Session = Depends(get_db)):
                 created_at=None
             )
 
+    except IntegrityError:
+        # Another worker stored this article first (e.g. via a different redirect title)
+        await db.rollback()
+        cached = await _find_cached_quiz(db, cache_key)
+        if cached:
+            return cached
+        raise HTTPException(status_code=500, detail="Database Save Error: duplicate article")
     except Exception as e:
-        db.rollback()
-        import traceback
-        traceback.print_exc()
+        await db.rollback()
+        logger.exception("Database save failed", extra={"url": url})
         raise HTTPException(status_code=500, detail=f"Database Save Error: {str(e)}")
 
-@app.get("/history", response_model=List[schemas.HistoryItem])
-def get_history(db: Session = Depends(get_db)):
-    quizzes = db.query(models.QuizRecord).order_by(models.QuizRecord.created_at.desc()).all()
-    return quizzes
+def _sse(event: str, data) -> bytes:
+    payload = data if isinstance(data, bytes) else json.dumps(data).encode()
+    return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+
+@app.get(
+    "/generate_quiz/stream",
+    response_class=StreamingResponse,
+    responses={200: {"description": "Server-Sent Events", "content": {"text/event-stream": {}}}},
+)
+async def generate_quiz_stream(url: str, db: AsyncSession = Depends(get_db)):
+    """Generates a quiz like POST /generate_quiz, streaming it as Server-Sent Events.
+
+    Events: `article` ({title, sections}) once scraped, `summary`, one
+    `question` per question as the LLM finishes writing it, then `done` with
+    the stored QuizResponse (or `error` with {detail, status}, plus retry_after
+    when the LLM is overloaded). Stored quizzes, and
+    articles another request is already generating, only get `done`.
+    """
+    cache_key = canonicalize_url(url)
+    cached = await _find_cached_quiz(db, cache_key)
+    await db.close()
+    quiz_lookups.inc("hit" if cached else "miss")
+
+    async def stream():
+        if cached:
+            yield _sse("done", cached.body)
+            return
+
+        queue = asyncio.Queue()
+        question_count = 0
+
+        def emit(event, data):
+            nonlocal question_count
+            if event == "question":
+                data = {"index": question_count, **data}
+                question_count += 1
+            queue.put_nowait(_sse(event, data))
+
+        async def run():
+            # Its own session: the run outlives this response if the client disconnects
+            async with AsyncSessionLocal() as session:
+                return await run_with_lease(
+                    session, cache_key,
+                    lookup=lambda: _find_cached_quiz(session, cache_key),
+                    generate=lambda: _generate_and_store(url, cache_key, session, emit),
+                )
+
+        # Same coalescing as POST: a concurrent request for the article waits for this run
+        task = asyncio.create_task(generation_flight.do(cache_key, run))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        while (message := await queue.get()) is not None:
+            yield message
+
+        try:
+            yield _sse("done", _response_body(task.result()))
+        except HTTPException as e:
+            error = {"detail": e.detail, "status": e.status_code}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after"] = int(e.headers["Retry-After"])
+            yield _sse("error", error)
+        except Exception as e:
+            logger.exception("Streamed generation failed", extra={"url": url})
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Keep reverse proxies (nginx) from buffering the stream
+        "X-Accel-Buffering": "no",
+    })
+
+# Largest batch accepted, and the most generations one batch may run at once
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+def _batch_line(url: str, body: bytes = None, cached: bool = False, error: str = None) -> bytes:
+    # One schemas.BatchQuizResult per line; the quiz bytes are spliced in as already serialized
+    if error is not None:
+        return json.dumps({"url": url, "status": "error", "cached": False, "error": error}).encode() + b"\n"
+    head = json.dumps({"url": url, "status": "ok", "cached": cached})
+    return head[:-1].encode() + b', "quiz": ' + body + b"}\n"
+
+def _response_body(result) -> bytes:
+    # _get_or_generate returns stored quizzes as raw JSON responses, unsaved ones as models
+    if isinstance(result, Response):
+        return result.body
+    return result.model_dump_json().encode()
+
+@app.post(
+    "/generate_quiz/batch",
+    response_class=StreamingResponse,
+    responses={200: {"description": "One schemas.BatchQuizResult JSON object per line", "content": {"application/x-ndjson": {}}}},
+)
+async def generate_quiz_batch(request: schemas.BatchQuizRequest, db: AsyncSession = Depends(get_db)):
+    """Generates quizzes for many URLs, streaming one NDJSON line per article as it finishes.
+
+    URLs naming the same article are generated once (the line carries the first
+    spelling). Already stored quizzes are sent first, then the rest are
+    generated, `concurrency` at a time, in completion order. With `refresh`
+    every article is re-scraped and only those whose text changed regenerated.
+    """
+    if not request.urls:
+        raise HTTPException(status_code=422, detail="urls must not be empty")
+    if len(request.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+
+    articles = {}
+    for url in request.urls:
+        articles.setdefault(canonicalize_url(url), url)
+    # A refresh batch re-scrapes every article (the LLM still only runs for changed text)
+    hits = {} if request.refresh else await _find_cached_quizzes(db, list(articles))
+    await db.close()
+    # Misses are counted when _get_or_generate looks them up again
+    quiz_lookups.inc("hit", amount=len(hits))
+    misses = [url for key, url in articles.items() if key not in hits]
+    concurrency = max(1, min(request.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    logger.info("Batch generation started", extra={
+        "urls": len(request.urls), "articles": len(articles), "cached": len(hits), "concurrency": concurrency,
+    })
+
+    async def stream():
+        for key, body in hits.items():
+            yield _batch_line(articles[key], body, cached=True)
+
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(url):
+            # Warmup traffic: its LLM calls queue behind interactive requests
+            llm_priority.set(BATCH)
+            async with slots:
+                try:
+                    # Each generation gets its own session; they run concurrently
+                    async with AsyncSessionLocal() as session:
+                        result = await _get_or_generate(url, session, refresh=request.refresh)
+                        return _batch_line(url, _response_body(result))
+                except HTTPException as e:
+                    return _batch_line(url, error=str(e.detail))
+                except Exception as e:
+                    logger.exception("Batch item failed", extra={"url": url})
+                    return _batch_line(url, error=str(e))
+
+        tasks = [asyncio.create_task(one(url)) for url in misses]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away: stop waiting. A generation another request also waits on
+            # carries on for it (SingleFlight); one only this batch wanted is cancelled
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def _run_job(job: models.Job) -> int:
+    llm_priority.set(BATCH)
+    async with AsyncSessionLocal() as session:
+        result = await _get_or_generate(job.url, session)
+    if not isinstance(result, Response):
+        # Mock quiz: the LLM call failed and nothing was stored, so try again later
+        raise RuntimeError("LLM generation failed")
+    return json.loads(result.body)["id"]
+
+# Background generation for POST /jobs; workers start with the app (JOB_WORKERS)
+job_pool = JobWorkerPool(_run_job)
+
+@app.post("/jobs", response_model=schemas.JobStatus, status_code=202)
+async def create_job(request: schemas.QuizRequest, response: Response, db: AsyncSession = Depends(get_db)):
+    """Queues generation of a quiz and returns at once; poll GET /jobs/{id} for the result."""
+    if request.refresh:
+        raise HTTPException(status_code=422, detail="refresh is not supported for jobs; use POST /generate_quiz/batch")
+    cache_key = canonicalize_url(request.url)
+    cached = await _find_cached_quiz(db, cache_key)
+    if cached:
+        # Already generated: record the job as done so clients handle both cases alike
+        job = models.Job(url=request.url, canonical_url=cache_key, status="succeeded",
+                         quiz_id=json.loads(cached.body)["id"])
+        db.add(job)
+        await db.commit()
+    else:
+        job = await job_pool.enqueue(db, request.url, cache_key)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(models.Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _encode_cursor(created_at: datetime, quiz_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{quiz_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, quiz_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(quiz_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/history", response_model=schemas.HistoryPage)
+async def get_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    cache_key = ("history", cursor, limit)
+    body = response_cache.get(cache_key)
+    if body is None:
+        # Only the listed columns are selected; ordering and the cursor predicate
+        # match ix_quiz_records_history so each page is an index range scan.
+        query = (
+            select(models.QuizRecord.id, models.QuizRecord.url, models.QuizRecord.title, models.QuizRecord.created_at)
+            .order_by(models.QuizRecord.created_at.desc(), models.QuizRecord.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            query = query.where(
+                tuple_(models.QuizRecord.created_at, models.QuizRecord.id) < tuple_(*_decode_cursor(cursor))
+            )
+        with timed("db_read"):
+            rows = (await db.execute(query)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        page = schemas.HistoryPage(
+            items=[schemas.HistoryItem.model_validate(row, from_attributes=True) for row in rows],
+            next_cursor=next_cursor,
+        )
+        body = page.model_dump_json().encode()
+        response_cache.set(cache_key, body)
+    return _json_response(body)
+
+# Deepest result a search pages to; ranking cost grows with the offset
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", "1000"))
+
+@app.get("/search", response_model=schemas.SearchPage)
+async def search_stored_quizzes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stored quizzes matching every word of `q` in their title, key entities, summary or questions.
+
+    Words match in any inflection ("planet" finds "planets"); end `q` with * to
+    match its last word as a prefix ("lovel*"). Ranked by relevance, best first.
+    """
+    terms = search.query_terms(q)
+    if not terms:
+        raise HTTPException(status_code=422, detail="q has no words to search for")
+    if offset > SEARCH_MAX_OFFSET:
+        raise HTTPException(status_code=422, detail=f"offset must be at most {SEARCH_MAX_OFFSET}")
+    # Every match of a common word is ranked, so repeated searches are served from the cache
+    cache_key = ("search", tuple(terms), limit, offset)
+    body = response_cache.get(cache_key)
+    if body is None:
+        with timed("db_read"):
+            rows = await search.search_quizzes(db, q, limit + 1, offset)
+        page = schemas.SearchPage(
+            items=[schemas.SearchHit.model_validate(row, from_attributes=True) for row in rows[:limit]],
+            next_offset=offset + limit if len(rows) > limit else None,
+        )
+        body = page.model_dump_json().encode()
+        response_cache.set(cache_key, body)
+    return _json_response(body)
+
+QUESTION_BANK_MAX_SAMPLE = int(os.getenv("QUESTION_BANK_MAX_SAMPLE", "50"))
+# Longest exclude_ids list accepted; a caller that has seen more should narrow its filters
+QUESTION_BANK_MAX_EXCLUDE = int(os.getenv("QUESTION_BANK_MAX_EXCLUDE", "1000"))
+
+@app.post("/question_bank/sample", response_model=schemas.QuestionSample)
+async def sample_question_bank(request: schemas.QuestionSampleRequest, db: AsyncSession = Depends(get_db)):
+    """n random questions from all stored quizzes, optionally of one difficulty and about one entity or topic.
+
+    Questions in `exclude_ids` are skipped, so a client can keep drawing without
+    repeats. Entity and topic samples take at most one question per quiz while
+    enough quizzes match.
+    """
+    if not 1 <= request.n <= QUESTION_BANK_MAX_SAMPLE:
+        raise HTTPException(status_code=422, detail=f"n must be between 1 and {QUESTION_BANK_MAX_SAMPLE}")
+    difficulty = request.difficulty.lower() if request.difficulty else None
+    if difficulty is not None and difficulty not in question_bank.DIFFICULTIES:
+        raise HTTPException(status_code=422, detail=f"difficulty must be one of {', '.join(question_bank.DIFFICULTIES)}")
+    if request.entity and request.topic:
+        raise HTTPException(status_code=422, detail="filter by entity or by topic, not both")
+    if len(request.exclude_ids) > QUESTION_BANK_MAX_EXCLUDE:
+        raise HTTPException(status_code=422, detail=f"exclude_ids has more than {QUESTION_BANK_MAX_EXCLUDE} ids")
+    with timed("db_read"):
+        rows = await question_bank.sample_questions(
+            db, request.n, difficulty, request.entity or None, request.topic or None, request.exclude_ids
+        )
+    sample = schemas.QuestionSample(questions=[
+        schemas.BankQuestion(
+            id=row.id, quiz_id=row.quiz_id, quiz_title=row.quiz_title, url=row.url, question=row.question_text,
+            options=row.options, answer=row.answer, difficulty=row.difficulty, explanation=row.explanation,
+        )
+        for row in rows
+    ])
+    return _json_response(sample.model_dump_json().encode())
 
 @app.get("/quiz/{quiz_id}", response_model=schemas.QuizResponse)
-def get_quiz_details(quiz_id: int, db: Session = Depends(get_db)):
-    quiz_record = db.query(models.QuizRecord).filter(models.QuizRecord.id == quiz_id).first()
-    if not quiz_record:
+async def get_quiz_details(quiz_id: int, db: AsyncSession = Depends(get_db)):
+    body = response_cache.get(("quiz", quiz_id))
+    if body is not None:
+        return _json_response(body)
+
+    with timed("db_read"):
+        result = await db.execute(
+            select(models.QuizRecord.id, models.QuizRecord.response_json)
+            .where(models.QuizRecord.id == quiz_id)
+        )
+        row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Quiz not found")
         
-    questions = []
-    for q in quiz_record.questions:
-        questions.append(schemas.QuestionBase(
-            question=q.question_text,
-            options=json.loads(q.options) if isinstance(q.options, str) else q.options,
-            answer=q.answer,
-            difficulty=q.difficulty,
-            explanation=q.explanation
-        ))
+    body = await _load_response_json(db, row.id, row.response_json)
+    response_cache.set(("quiz", quiz_id), body)
+    return _json_response(body)
 
-    return schemas.QuizResponse(
-        id=quiz_record.id,
-        url=quiz_record.url,
-        title=quiz_record.title,
-        summary=quiz_record.summary,
-        key_entities=json.loads(quiz_record.key_entities) if isinstance(quiz_record.key_entities, str) else quiz_record.key_entities,
-        sections=json.loads(quiz_record.sections) if isinstance(quiz_record.sections, str) else quiz_record.sections,
-        quiz=questions,
-        related_topics=json.loads(quiz_record.related_topics) if isinstance(quiz_record.related_topics, str) else quiz_record.related_topics,
-        created_at=quiz_record.created_at
-    )
+@app.get("/debug/recent")
+async def get_recent_debug(kind: Optional[str] = Query(None, description="'scrape' or 'llm'")):
+    # Recent raw scrapes and LLM responses, newest first
+    if not debug_ring.enabled:
+        raise HTTPException(status_code=404, detail="Debug ring is disabled (DEBUG_RING_SIZE=0)")
+    return debug_ring.recent(kind)
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@app.get("/llm_stats")
+async def get_llm_stats():
+    # Queue depth per priority, calls in flight, rate-limit state and retry counters
+    return llm_scheduler.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Prometheus text format: stage latency histograms, LLM tokens, cache and fallback counters, in-flight gauges
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,217 @@
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# Prometheus metrics at GET /metrics; 0 disables recording and the endpoint
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# 1 adds a Server-Timing header with the stage durations of each request
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "0") != "0"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# {stage: seconds} for the request being handled; set by the middleware when the timing header is on
+request_timings = ContextVar("request_timings", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # collect() -> value, or {label values: value}, read at scrape time instead of recorded
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _samples(self):
+        if self.collect is None:
+            with self._lock:
+                return dict(self._values)
+        values = self.collect()
+        return values if isinstance(values, dict) else {(): values}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._samples().items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket (not cumulative) counts, then sum; cumulated when rendered
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[i] += 1
+            state[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        for key, state in sorted(values.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                running += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=(), collect=None):
+        return self._add(Counter(name, help, labels, collect))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self._add(Gauge(name, help, labels, collect))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "wikiquiz_stage_duration_seconds",
+    "Time spent in one pipeline stage: fetch, parse, preprocess, llm (one completion), generate (whole article), db_read, db_write.",
+    ["stage"],
+)
+llm_tokens = registry.histogram(
+    "wikiquiz_llm_tokens", "Tokens per LLM completion, by direction (prompt or completion).",
+    ["direction"], buckets=TOKEN_BUCKETS,
+)
+quiz_lookups = registry.counter(
+    "wikiquiz_quiz_lookups_total", "Quiz requests answered from a stored quiz (hit) or generated (miss).", ["result"],
+)
+mock_fallbacks = registry.counter(
+    "wikiquiz_mock_fallbacks_total", "Generations that returned the unsaved mock quiz, by cause.", ["reason"],
+)
+llm_skips = registry.counter(
+    "wikiquiz_llm_skips_total",
+    "Generations that reused stored output instead of calling the LLM: same_content (identical text under another "
+    "URL) or unchanged (refresh of an article whose text did not change).",
+    ["reason"],
+)
+# Known label values start at zero, so rate() sees the first increment
+for _label in ("hit", "miss"):
+    quiz_lookups.inc(_label, amount=0)
+for _label in ("no_backend", "invalid_json", "all_chunks_failed"):
+    mock_fallbacks.inc(_label, amount=0)
+for _label in ("same_content", "unchanged"):
+    llm_skips.inc(_label, amount=0)
+generations_in_flight = registry.gauge(
+    "wikiquiz_generations_in_flight", "Scrape + LLM pipelines running in this worker.",
+)
+
+
+def observe_stage(stage, seconds):
+    """Records `seconds` spent in `stage`, for /metrics and the request's Server-Timing."""
+    stage_seconds.observe(seconds, stage)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe_stage(self.stage, time.perf_counter() - self.start)
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_no_timer = _NoTimer()
+
+
+def timed(stage):
+    """Context manager timing a block as `stage` into stage_seconds and the request's Server-Timing."""
+    if not METRICS_ENABLED and request_timings.get() is None:
+        return _no_timer
+    return _StageTimer(stage)
+
+
+def server_timing(timings, total):
+    """Server-Timing header value, e.g. 'fetch;dur=51.2, llm;dur=840.3, total;dur=912.0'."""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
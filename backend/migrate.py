@@ -0,0 +1,130 @@
+from sqlalchemy import bindparam, func, inspect, text, select, update, delete
+
+from database import engine
+import models
+import question_bank
+import search
+from urls import canonicalize_url
+
+quiz_records = models.QuizRecord.__table__
+questions = models.Question.__table__
+
+
+def _add_column(conn, table, column, ddl_type):
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def add_canonical_url(conn, batch=500):
+    """Adds quiz_records.canonical_url, backfills it and drops duplicate articles.
+
+    Only quizzes without a canonical_url yet (stored before the column, or
+    bulk-loaded) are read, so a boot with nothing to backfill costs one
+    query. Of those, the oldest quiz per article is kept, unless the article
+    already has a quiz with the column set; duplicates and their questions
+    are deleted before the unique index is created.
+    """
+    _add_column(conn, "quiz_records", "canonical_url", "VARCHAR")
+
+    keep = {}
+    duplicates = []
+    for quiz_id, url in conn.execute(
+        select(quiz_records.c.id, quiz_records.c.url)
+        .where(quiz_records.c.canonical_url.is_(None))
+        .order_by(quiz_records.c.id)
+    ):
+        key = canonicalize_url(url)
+        if key in keep:
+            duplicates.append(quiz_id)
+        else:
+            keep[key] = quiz_id
+
+    keys = list(keep)
+    for i in range(0, len(keys), batch):
+        for key in conn.execute(
+            select(quiz_records.c.canonical_url).where(quiz_records.c.canonical_url.in_(keys[i:i + batch]))
+        ).scalars():
+            duplicates.append(keep.pop(key))
+
+    if duplicates:
+        conn.execute(delete(questions).where(questions.c.quiz_id.in_(duplicates)))
+        conn.execute(delete(quiz_records).where(quiz_records.c.id.in_(duplicates)))
+    if keep:
+        conn.execute(
+            update(quiz_records)
+            .where(quiz_records.c.id == bindparam("quiz_id"))
+            .values(canonical_url=bindparam("key")),
+            [{"quiz_id": quiz_id, "key": key} for key, quiz_id in keep.items()],
+        )
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_quiz_records_canonical_url ON quiz_records (canonical_url)"
+    ))
+    print(f"canonical_url: backfilled {len(keep)} articles, removed {len(duplicates)} duplicate quizzes")
+
+
+def add_response_json(conn):
+    # Left NULL for existing quizzes; the API fills it in on first read
+    blob = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+    _add_column(conn, "quiz_records", "response_json", blob)
+
+
+def add_history_index(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_quiz_records_history ON quiz_records (created_at, id, url, title)"
+    ))
+
+
+def add_content_hash(conn):
+    # NULL for existing quizzes until they are regenerated or refreshed
+    _add_column(conn, "quiz_records", "content_hash", "VARCHAR")
+    _add_column(conn, "quiz_records", "revision_id", "BIGINT")
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_quiz_records_content_hash ON quiz_records (content_hash)"
+    ))
+
+
+def add_search_index(conn):
+    search.create_index(conn)
+    print(f"search index: indexed {search.backfill(conn)} quizzes")
+
+
+def add_question_bank(conn):
+    """Adds questions.sample_key and the question bank indexes, and fills quiz_entities.
+
+    Difficulties are lowercased for the bank's exact-match filter; the quizzes
+    they belong to get their response_json rebuilt on next read.
+    """
+    _add_column(conn, "questions", "sample_key", "INTEGER")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_questions_quiz_id ON questions (quiz_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_questions_sample_key ON questions (sample_key)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_questions_difficulty_sample ON questions (difficulty, sample_key)"
+    ))
+
+    mixed_case = select(questions.c.quiz_id).where(questions.c.difficulty != func.lower(questions.c.difficulty))
+    conn.execute(update(quiz_records).where(quiz_records.c.id.in_(mixed_case)).values(response_json=None))
+    lowered = conn.execute(
+        update(questions).where(questions.c.difficulty != func.lower(questions.c.difficulty))
+        .values(difficulty=func.lower(questions.c.difficulty))
+    ).rowcount
+
+    keyed, quizzes = question_bank.backfill(conn)
+    print(f"question bank: {keyed} sample keys, entities of {quizzes} quizzes, {lowered} difficulties lowercased")
+
+
+def migrate():
+    # New tables come from the models; changes to existing ones are applied below
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        add_canonical_url(conn)
+        add_response_json(conn)
+        add_history_index(conn)
+        add_content_hash(conn)
+        add_search_index(conn)
+        add_question_bank(conn)
+
+
+if __name__ == "__main__":
+    migrate()
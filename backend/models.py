@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, JSON, ForeignKey, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import random
 try:
     from .database import Base
 except ImportError:
@@ -11,16 +12,37 @@ class QuizRecord(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, index=True)
+    # Canonical article URL (see urls.canonicalize_url); the cache key for generate_quiz
+    canonical_url = Column(String, unique=True, index=True)
     title = Column(String)
     summary = Column(Text)
     key_entities = Column(JSON)  # Stores {people: [], organizations: [], ...}
     sections = Column(JSON)      # List of section headers
     related_topics = Column(JSON) # List of related topics
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Serialized QuizResponse JSON, written with the quiz and served as-is on reads.
+    # Anything that edits a quiz must reset it to NULL; it is rebuilt on the next read.
+    response_json = Column(LargeBinary)
+    # scraper.article_hash of the text the quiz was generated from; identical text reuses the quiz
+    content_hash = Column(String, index=True)
+    # Wikipedia revision the text came from, when the page said (NULL for older quizzes)
+    revision_id = Column(BigInteger)
     
     # Relationship to questions
     questions = relationship("Question", back_populates="quiz_record", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination for /history: (created_at, id) order, with url/title
+        # included so the page is served from the index alone
+        Index("ix_quiz_records_history", "created_at", "id", "url", "title"),
+    )
+
+# Random per-row keys for sampling: rows in sample_key order are in random order
+SAMPLE_KEY_SPACE = 2 ** 31
+
+def random_sample_key():
+    return random.randrange(SAMPLE_KEY_SPACE)
+
 class Question(Base):
     __tablename__ = "questions"
 
@@ -31,5 +53,61 @@ class Question(Base):
     answer = Column(String)
     difficulty = Column(String)
     explanation = Column(Text)
+    sample_key = Column(Integer, default=random_sample_key)
 
     quiz_record = relationship("QuizRecord", back_populates="questions")
+
+    __table_args__ = (
+        Index("ix_questions_quiz_id", "quiz_id"),
+        # Question bank sampling: a random run of all questions, or of one difficulty
+        Index("ix_questions_sample_key", "sample_key"),
+        Index("ix_questions_difficulty_sample", "difficulty", "sample_key"),
+    )
+
+class QuizEntity(Base):
+    __tablename__ = "quiz_entities"
+
+    # One row per distinct key entity (kind people, organizations, ...) or related topic (kind "topic") of a quiz
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quiz_records.id"), index=True)
+    kind = Column(String)
+    # question_bank.normalize_name of the name as the LLM wrote it
+    name = Column(String)
+    sample_key = Column(Integer, default=random_sample_key)
+
+    __table_args__ = (
+        # A random run of the quizzes mentioning a name
+        Index("ix_quiz_entities_name_sample", "name", "sample_key"),
+    )
+
+class GenerationLease(Base):
+    __tablename__ = "generation_leases"
+
+    # One row per URL currently being generated; the primary key makes acquiring it atomic
+    url = Column(String, primary_key=True)
+    owner = Column(String)
+    expires_at = Column(DateTime)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String)
+    canonical_url = Column(String, index=True)
+    # queued -> running -> succeeded | failed; a failed attempt with retries left goes back to queued
+    status = Column(String, default="queued")
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    quiz_id = Column(Integer, ForeignKey("quiz_records.id"))
+    # Earliest time a queued job may be claimed (retry backoff)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    # Worker holding a running job, and when its claim lapses (crashed worker)
+    locked_by = Column(String)
+    locked_until = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Claim query: due jobs in run_after order
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+# Raw page cache for the scraper; set PAGE_CACHE_DIR="" to disable. A relative
+# directory is under backend/, wherever the process was started from.
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "page_cache")
+# Bytes of cached pages kept on disk; past it the least recently used are removed. 0 for no limit
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Eviction goes this far below the limit, so it doesn't rescan the directory on every store
+_EVICT_TO = 0.9
+
+_BACKEND_DIR = Path(__file__).resolve().parent
+
+
+class PageCache:
+    """On-disk cache of fetched pages keyed by URL.
+
+    Each entry is two files named after the SHA-256 of the URL: `<key>.html`
+    with the raw body and `<key>.json` with the ETag/Last-Modified validators
+    and, once parsed, the scraper's extracted dict so a 304 can skip parsing.
+    The directory is created by the first store. Methods do blocking file I/O;
+    call them via asyncio.to_thread.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.directory = _BACKEND_DIR / directory if directory else None
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Bytes on disk at the last scan plus what this process wrote since; None until the first store
+        self._size = None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.html"
+
+    def load_meta(self, url):
+        """Returns the stored validators/parsed data for `url`, or None."""
+        if not self.enabled:
+            return None
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            # Its mtime is the entry's last use, which eviction goes by
+            os.utime(meta_path)
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def load_body(self, url):
+        _, body_path = self._paths(url)
+        try:
+            return body_path.read_bytes()
+        except OSError:
+            return None
+
+    def store(self, url, body, etag=None, last_modified=None, parsed=None):
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        if body is not None:
+            _write_atomic(body_path, body)
+        meta = json.dumps({"url": url, "etag": etag, "last_modified": last_modified, "parsed": parsed}).encode("utf-8")
+        _write_atomic(meta_path, meta)
+        if self.max_bytes:
+            with self._lock:
+                # Overwritten entries are counted again: that only brings the next scan forward
+                if self._size is not None:
+                    self._size += len(body or b"") + len(meta)
+                if self._size is None or self._size > self.max_bytes:
+                    self._evict()
+
+    def _evict(self):
+        # Removes the least recently used entries (.json and .html together) until under the
+        # limit, and recounts: other workers share the directory
+        entries = {}
+        for path in self.directory.iterdir():
+            if path.suffix not in (".json", ".html"):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            size, used = entries.get(path.stem, (0, 0.0))
+            entries[path.stem] = (size + stat.st_size, max(used, stat.st_mtime))
+        total = sum(size for size, _ in entries.values())
+        if total > self.max_bytes:
+            for key, (size, _) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+                if total <= self.max_bytes * _EVICT_TO:
+                    break
+                for suffix in (".json", ".html"):
+                    (self.directory / f"{key}{suffix}").unlink(missing_ok=True)
+                total -= size
+        self._size = total
+
+
+def _write_atomic(path, data):
+    # Concurrent workers may write the same entry; readers only ever see whole files
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{id(data)}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+page_cache = PageCache()
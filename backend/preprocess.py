@@ -0,0 +1,135 @@
+import re
+
+try:
+    from .chunking import estimate_tokens
+except ImportError:
+    from chunking import estimate_tokens
+
+# Strips what the scraped paragraphs carry besides prose before they go into a
+# prompt: reference markers, pronunciation guides, coordinates, boilerplate and
+# repeated paragraphs. Runs between scrape and generation; the stored article
+# hash is still taken from the scraped text.
+
+# [4], [note 2], [citation needed], [when?], [dubious – discuss] ..., and letter footnotes
+# like [a] only after punctuation or another marker: after a word, as in a[i], it's text
+_CITATION = re.compile(
+    r"\[(?:\d{1,4}|(?:note|nb|n|lower-alpha|upper-alpha) ?\d+"
+    r"|[^\[\]\n]{0,40}?(?:needed|\?|verification|verify|dubious|disputed|citation|discuss)[^\[\]\n]{0,20})\]"
+    r"|(?<=[.,;:!?\"'”’)\]])\[[a-z]{1,2}\]"
+)
+# A ";"-separated part of a parenthesis that only says how to pronounce the subject:
+# IPA between slashes or brackets, the audio link (ⓘ, or "listen" on its own), a part
+# starting with a respelling cue. "(Listen to Your Heart version)" is text.
+_IPA = "ˈˌːəɛɪʊʃʒθðŋæɑɒɔʁʔʌɜɐçɣχβɲʎ"
+_PRONUNCIATION = re.compile(
+    rf"/[^/\n]*[{_IPA}][^/\n]*/|\[[^\]\n]*[{_IPA}][^\]\n]*\]|ⓘ|^\s*listen\s*$|^\s*(?:pronounced|pronunciation)\b",
+    re.IGNORECASE,
+)
+_PARENTHESIS = re.compile(r"\s*\(([^()]*)\)")
+# 35°41′23″N 139°41′32″E / 35.68972°N 139.69222°E; 35.68972; 139.69222
+_COORDINATES = re.compile(
+    r"(?:Coordinates\s*:\s*)?"
+    r"(?:\d{1,3}(?:\.\d+)?°(?:\s*\d{1,2}(?:\.\d+)?[′'])?(?:\s*\d{1,2}(?:\.\d+)?[″\"])?\s*[NSEW]\b[\s/\ufeff]*){2,}"
+    r"(?:;\s*-?\d{1,3}\.\d+;?\s*-?\d{1,3}\.\d+)?"
+)
+# Maintenance notices that end up inside <p> (message boxes, stubs)
+_BOILERPLATE = re.compile(
+    r"^(?:This (?:article|section|list) (?:is a stub|needs|has multiple issues|may|relies|does not cite|is missing)"
+    r"|You can help (?:Wikipedia )?by expanding|Please help (?:improve|update)|Learn how and when to remove)",
+    re.IGNORECASE,
+)
+# Zero-width characters are dropped; runs of any other whitespace become one space
+_INVISIBLE = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" +([,.;:!?])")
+# A paragraph left with no letters or digits is dropped
+_WORDLESS = re.compile(r"^\W*$")
+
+
+def _strip_pronunciation(match):
+    parts = [p for p in match.group(1).split(";") if p.strip() and not _PRONUNCIATION.search(p)]
+    if len(parts) == len(match.group(1).split(";")):
+        return match.group(0)
+    return f" ({';'.join(parts).strip()})" if parts else ""
+
+
+def clean_paragraph(text: str) -> str:
+    """One scraped paragraph without markers, pronunciation, coordinates and extra whitespace."""
+    text = _CITATION.sub("", text)
+    if "°" in text:
+        text = _COORDINATES.sub(" ", text)
+    text = " ".join(_INVISIBLE.sub("", text).split())
+    if "(" in text:
+        text = _PARENTHESIS.sub(_strip_pronunciation, text)
+    return _SPACE_BEFORE_PUNCTUATION.sub(r"\1", text).strip()
+
+
+def clean_paragraphs(paragraphs, seen=None):
+    """Cleaned paragraphs without empty ones, boilerplate, or repeats of one in `seen` (updated)."""
+    seen = set() if seen is None else seen
+    kept = []
+    for paragraph in paragraphs:
+        text = clean_paragraph(paragraph)
+        if _WORDLESS.match(text) or _BOILERPLATE.match(text):
+            continue
+        key = text.casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(text)
+    return kept
+
+
+def preprocess_article(scraped: dict) -> dict:
+    """The scraped article with its text, blocks and summary cleaned for the prompt.
+
+    Returns a copy; everything else (title, sections, content_hash, ...) is kept.
+    A paragraph repeated anywhere in the article is only kept the first time.
+    """
+    seen = set()
+    blocks = []
+    for block in scraped.get("blocks") or []:
+        paragraphs = clean_paragraphs(block["text"].split("\n"), seen)
+        if paragraphs:
+            blocks.append({"heading": block["heading"], "text": "\n".join(paragraphs)})
+    if blocks:
+        text = "\n".join(block["text"] for block in blocks)
+    else:
+        text = "\n".join(clean_paragraphs(scraped["text"].split("\n")))
+    return {
+        **scraped,
+        "text": text,
+        "blocks": blocks,
+        "summary": clean_paragraph(scraped.get("summary") or ""),
+    }
+
+
+def _sentences(text):
+    return re.split(r"(?<=[.!?])\s+", text)
+
+
+def pack_text(text: str, budget_tokens: int) -> str:
+    """The leading paragraphs of `text` that fit in `budget_tokens` estimated tokens.
+
+    Whole paragraphs are kept in order; the first one that does not fit is cut
+    at a sentence end (a word, for a single over-long sentence) instead.
+    """
+    kept = []
+    used = 0
+    for paragraph in text.split("\n"):
+        tokens = estimate_tokens(paragraph) + 1
+        if used + tokens <= budget_tokens:
+            kept.append(paragraph)
+            used += tokens
+            continue
+        piece = []
+        units = _sentences(paragraph)
+        for unit in units if len(units) > 1 else paragraph.split(" "):
+            tokens = estimate_tokens(unit) + 1
+            if used + tokens > budget_tokens:
+                break
+            piece.append(unit)
+            used += tokens
+        if piece:
+            kept.append(" ".join(piece))
+        break
+    return "\n".join(kept)
@@ -0,0 +1,159 @@
+import random
+
+from sqlalchemy import delete, insert, select, text
+
+try:
+    from . import models
+except ImportError:
+    import models
+
+DIFFICULTIES = ("easy", "medium", "hard")
+# quiz_entities kind of a quiz's related topics; every other kind is a key entity
+TOPIC = "topic"
+# Quizzes an entity or topic sample looks at per requested question before settling for fewer
+QUIZZES_SCANNED_PER_QUESTION = 20
+
+Question = models.Question
+QuizEntity = models.QuizEntity
+QuizRecord = models.QuizRecord
+
+
+def normalize_name(name):
+    # "Ada  Lovelace" and "ada lovelace" are one entity
+    return " ".join(str(name).split()).casefold()
+
+
+def entity_rows(quiz_id, key_entities, related_topics):
+    rows = []
+    seen = set()
+    for kind, names in [*(key_entities or {}).items(), (TOPIC, related_topics)]:
+        for name in names or []:
+            key = (kind, normalize_name(name))
+            if key[1] and key not in seen:
+                seen.add(key)
+                rows.append({"quiz_id": quiz_id, "kind": kind, "name": key[1], "sample_key": models.random_sample_key()})
+    return rows
+
+
+async def index_quiz_entities(db, quiz_id, key_entities, related_topics):
+    """(Re)writes a quiz's quiz_entities rows; part of the caller's transaction."""
+    await db.execute(delete(QuizEntity).where(QuizEntity.quiz_id == quiz_id))
+    rows = entity_rows(quiz_id, key_entities, related_topics)
+    if rows:
+        await db.execute(insert(QuizEntity), rows)
+
+
+def backfill(conn, batch=5000):
+    """Gives sample keys to questions without one and entity rows to quizzes without any; returns both counts."""
+    if conn.dialect.name == "postgresql":
+        key = f"floor(random() * {models.SAMPLE_KEY_SPACE})::integer"
+    else:
+        key = f"abs(random() % {models.SAMPLE_KEY_SPACE})"
+    keyed = conn.execute(text(f"UPDATE questions SET sample_key = {key} WHERE sample_key IS NULL")).rowcount
+
+    quiz_records = QuizRecord.__table__
+    rows = conn.execute(
+        select(quiz_records.c.id, quiz_records.c.key_entities, quiz_records.c.related_topics)
+        .where(quiz_records.c.id.not_in(select(QuizEntity.__table__.c.quiz_id)))
+    ).all()
+    for i in range(0, len(rows), batch):
+        entities = [e for row in rows[i:i + batch] for e in entity_rows(row.id, row.key_entities, row.related_topics)]
+        if entities:
+            conn.execute(insert(QuizEntity.__table__), entities)
+    return keyed, len(rows)
+
+
+async def _question_run(db, n, difficulty, exclude, rng):
+    # n independent index seeks: each takes the first question at or after a random sample_key,
+    # wrapping around, and skips the ones already picked. A question's chance is the gap below its
+    # key, which random keys make even on average; O(n (log N + excluded)).
+    def seek(low, picked):
+        statement = select(Question.id).where(Question.sample_key >= low)
+        if difficulty is not None:
+            statement = statement.where(Question.difficulty == difficulty)
+        if exclude or picked:
+            statement = statement.where(Question.id.not_in(exclude | picked))
+        return statement.order_by(Question.sample_key).limit(1)
+
+    picked = set()
+    ids = []
+    for _ in range(n):
+        question_id = (await db.execute(seek(rng.randrange(models.SAMPLE_KEY_SPACE), picked))).scalar()
+        if question_id is None:
+            question_id = (await db.execute(seek(0, picked))).scalar()
+            if question_id is None:
+                break
+        picked.add(question_id)
+        ids.append(question_id)
+    return ids
+
+
+async def _quiz_run(db, n, difficulty, exclude, start, name, topic, rng):
+    # Same idea one level up: a random run of the quizzes mentioning `name`, one random
+    # eligible question from each, then more from the same quizzes if there are too few.
+    kind = QuizEntity.kind == TOPIC if topic else QuizEntity.kind != TOPIC
+    picked, spare, seen_quizzes = [], [], set()
+    low, high, scanned = start, models.SAMPLE_KEY_SPACE, 0
+    while len(picked) < n and scanned < n * QUIZZES_SCANNED_PER_QUESTION:
+        rows = (await db.execute(
+            select(QuizEntity.quiz_id, QuizEntity.sample_key)
+            .where(QuizEntity.name == name, kind, QuizEntity.sample_key >= low, QuizEntity.sample_key < high)
+            .order_by(QuizEntity.sample_key)
+            .limit(2 * (n - len(picked)))
+        )).all()
+        if not rows:
+            if high == start:
+                break
+            low, high = 0, start
+            continue
+        low = rows[-1].sample_key + 1
+        scanned += len(rows)
+        quiz_ids = [row.quiz_id for row in rows if row.quiz_id not in seen_quizzes]
+        seen_quizzes.update(quiz_ids)
+
+        # Difficulty is checked here: in SQL the planner would rather walk the difficulty index than quiz_id's
+        by_quiz = {}
+        for question_id, quiz_id, question_difficulty in (await db.execute(
+            select(Question.id, Question.quiz_id, Question.difficulty).where(Question.quiz_id.in_(quiz_ids))
+        )).all():
+            if question_id not in exclude and difficulty in (None, question_difficulty):
+                by_quiz.setdefault(quiz_id, []).append(question_id)
+        for quiz_id in quiz_ids:
+            candidates = by_quiz.get(quiz_id)
+            if candidates:
+                rng.shuffle(candidates)
+                picked.append(candidates[0])
+                spare.extend(candidates[1:])
+    if len(picked) < n:
+        picked += rng.sample(spare, min(len(spare), n - len(picked)))
+    return picked[:n]
+
+
+async def sample_questions(db, n, difficulty=None, entity=None, topic=None, exclude=(), rng=random):
+    """Up to n random stored questions, optionally of one difficulty and from quizzes about an entity or topic.
+
+    Questions whose ids are in `exclude` are skipped. Rows have the question's
+    fields plus quiz_id, quiz_title and url; fewer than n when fewer match.
+    """
+    exclude = set(exclude)
+    if entity is None and topic is None:
+        ids = await _question_run(db, n, difficulty, exclude, rng)
+    else:
+        name = normalize_name(topic if topic is not None else entity)
+        start = rng.randrange(models.SAMPLE_KEY_SPACE)
+        ids = await _quiz_run(db, n, difficulty, exclude, start, name, topic is not None, rng)
+    if not ids:
+        return []
+
+    rows = (await db.execute(
+        select(
+            Question.id, Question.quiz_id, Question.question_text, Question.options, Question.answer,
+            Question.difficulty, Question.explanation, QuizRecord.title.label("quiz_title"), QuizRecord.url,
+        )
+        .join(QuizRecord, QuizRecord.id == Question.quiz_id)
+        .where(Question.id.in_(ids))
+    )).all()
+    # The IN query returns them in no particular order; shuffle so it isn't the table's
+    rows = list(rows)
+    rng.shuffle(rows)
+    return rows
@@ -1,117 +1,374 @@
+import asyncio
+import math
 import os
 import json
 import re
-from groq import Groq
-from dotenv import load_dotenv
-from pathlib import Path
+import time
 
-# Robustly find .env file
-env_path = Path(__file__).parent / '.env'
-load_dotenv(dotenv_path=env_path)
+try:
+    from . import envfile  # noqa: F401
+    from .chunking import CHUNK_TOKENS, chunk_article, estimate_tokens, spread_chunks
+    from .diagnostics import debug_ring, get_logger
+    from .jsonstream import JsonObjectStream
+    from .preprocess import pack_text
+    from .llm_backends import LLMError, create_backend
+    from .llm_scheduler import SchedulerBusy, llm_scheduler
+    from .metrics import llm_tokens, mock_fallbacks, observe_stage, timed
+except ImportError:
+    import envfile  # noqa: F401
+    from chunking import CHUNK_TOKENS, chunk_article, estimate_tokens, spread_chunks
+    from diagnostics import debug_ring, get_logger
+    from jsonstream import JsonObjectStream
+    from preprocess import pack_text
+    from llm_backends import LLMError, create_backend
+    from llm_scheduler import SchedulerBusy, llm_scheduler
+    from metrics import llm_tokens, mock_fallbacks, observe_stage, timed
+
+logger = get_logger("quiz_generator")
 
 API_KEY = os.getenv("GROQ_API_KEY")
 
 # Check if key is present
-if API_KEY and API_KEY.startswith("gsk_"):
-    client = Groq(api_key=API_KEY)
-else:
-    client = None
+if not (API_KEY and API_KEY.startswith("gsk_")):
     API_KEY = None # Treat invalid/placeholder as missing
 
-def generate_quiz_from_text(text: str):
-    if not client:
-        msg = "CRITICAL WARNING: GROQ_API_KEY is missing or invalid in backend/.env file."
-        print(msg)
-        with open("backend_error.log", "w", encoding="utf-8") as f:
-            f.write(msg)
-        return get_mock_quiz_data()
+_llm = None
+_llm_built = False
+
+def get_llm():
+    """The backend configured by LLM_BACKEND / LLM_RECORD_MODE (see llm_backends.py), built on first use.
+
+    Building it imports the SDK and sets up its client, so it is left out of
+    import time. None means no backend is configured: the mock quiz is served.
+    """
+    global _llm, _llm_built
+    if not _llm_built:
+        _llm = create_backend(groq_api_key=API_KEY)
+        _llm_built = True
+    return _llm
 
-    prompt = """
+PROMPT_TEMPLATE = """
     You are an AI that generates educational quizzes based STRICTLY on the provided text.
     Do not use outside knowledge. If the text does not contain enough information, generate fewer questions (minimum 2).
     
     Analyze the provided text and extract the following information in strict JSON format:
     1. "summary": A concise summary of the article (2-3 sentences).
     2. "key_entities": A dictionary with keys "people", "organizations", "locations", each containing a list of strings found in the text.
-    3. "quiz": A list of 5 to 10 question objects. Each object must have:
+    3. "quiz": A list of {min_questions} to {max_questions} question objects. Each object must have:
        - "question": The question text (must be found in the article).
        - "options": A list of 4 distinct option strings.
        - "answer": The string text of the correct option (must be an exact match to one of the options).
        - "difficulty": "easy", "medium", or "hard".
        - "explanation": A short explanation strictly based on the text.
     4. "related_topics": A list of 5 Wikipedia-style topics for further reading.
-
+{part_note}
     The output must be valid JSON only, without markdown code blocks.
     
     Article Text:
     """
+
+MAX_OUTPUT_TOKENS = 2048
+# Article tokens in a single-prompt request (estimated locally); the leading paragraphs
+# that fit are sent. llama3-70b-8192 has an 8k context shared with the output.
+PROMPT_TEXT_TOKENS = int(os.getenv("QUIZ_PROMPT_TOKENS", "3750"))
+
+# Questions kept after merging the per-chunk quizzes of a long article
+TARGET_QUESTIONS = int(os.getenv("QUIZ_TARGET_QUESTIONS", "10"))
+# Chunk prompts of one article sent to the LLM at once
+CHUNK_CONCURRENCY = int(os.getenv("QUIZ_CHUNK_CONCURRENCY", "8"))
+# Share of the merged quiz per difficulty
+DIFFICULTY_MIX = {"easy": 0.3, "medium": 0.4, "hard": 0.3}
+
+def _count_tokens(content, text, prompt_tokens=None, completion_tokens=None):
+    # Estimated from the text when the server did not report usage (or when streaming)
+    llm_tokens.observe(prompt_tokens or estimate_tokens(content), "prompt")
+    llm_tokens.observe(completion_tokens or estimate_tokens(text), "completion")
+
+async def _request_quiz(content: str):
+    """One chat completion; returns the parsed quiz dict or raises."""
+    llm = get_llm()
+
+    async def call():
+        # Timed inside the scheduler so queueing and backoff are not counted as LLM time
+        with timed("llm"):
+            return await llm.complete(content, MAX_OUTPUT_TOKENS, json_mode=True)
+
+    completion = await llm_scheduler.run(call, estimate_tokens(content) + MAX_OUTPUT_TOKENS)
+    _count_tokens(content, completion.text, completion.prompt_tokens, completion.completion_tokens)
     
-    # Truncate text if too long (Groq Llama 3 70b has ~8k context usually, dependent on exact model limits, 
-    # but let's be safe. ~20000 chars is roughly 5k tokens. 
-    # llama3-70b-8192 supports 8k context. Input+Output < 8k. 
-    # Let's limit input text to 15k chars to leave room for output.)
-    clean_text = text[:15000]
+    response_text = completion.text.strip()
     
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt + clean_text
-                }
-            ],
-            temperature=0,
-            max_tokens=2048,
-            top_p=1,
-            stream=False,
-            response_format={"type": "json_object"}
-        )
-        
-        response_text = completion.choices[0].message.content.strip()
+    debug_ring.record("llm", response_text)
+    logger.debug("LLM response received", extra={"response_chars": len(response_text)})
+
+    # Clean up potential markdown formatting (though json_object mode should help)
+    if response_text.startswith("```"):
+        response_text = re.sub(r"^```json|^```", "", response_text).strip("` \n")
         
-        print(f"DEBUG: Raw Groq Response: {response_text[:500]}...")
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        # The raw text is in the debug ring (GET /debug/recent?kind=llm)
+        logger.error("LLM returned invalid JSON", extra={"response_chars": len(response_text)})
+        raise
+    _fix_answers(data)
+    return data
 
-        # Clean up potential markdown formatting (though json_object mode should help)
-        if response_text.startswith("```"):
-            response_text = re.sub(r"^```json|^```", "", response_text).strip("` \n")
+def _fix_answers(data):
+    # Validate/Fix answers
+    if "quiz" in data:
+        for q in data["quiz"]:
+            options = q.get("options", [])
+            answer = q.get("answer", "")
             
-        data = json.loads(response_text)
-        
-        # Validate/Fix answers
-        if "quiz" in data:
-            for q in data["quiz"]:
-                options = q.get("options", [])
-                answer = q.get("answer", "")
+            # Ensure answer is in options
+            if answer not in options:
+                clean_answer = answer.replace("Option ", "").strip()
+                if len(clean_answer) == 1 and clean_answer in "ABCD":
+                    idx = ord(clean_answer) - ord('A')
+                    if 0 <= idx < len(options):
+                        q["answer"] = options[idx]
+                        continue
                 
-                # Ensure answer is in options
-                if answer not in options:
-                    clean_answer = answer.replace("Option ", "").strip()
-                    if len(clean_answer) == 1 and clean_answer in "ABCD":
-                        idx = ord(clean_answer) - ord('A')
-                        if 0 <= idx < len(options):
-                            q["answer"] = options[idx]
-                            continue
-                    
-                    if options:
-                        print(f"WARNING: Answer '{answer}' not found in options {options}. Defaulting to first option.")
-                        q["answer"] = options[0]
-
-        return data
+                if options:
+                    logger.warning("Answer not found in options; defaulting to first option",
+                                   extra={"answer": answer, "options": options})
+                    q["answer"] = options[0]
+
+def unavailable(error):
+    """Whether `error` means the LLM is overloaded or rate limited past the scheduler's retries.
+
+    The caller should answer 503 and try again later, not serve a mock quiz.
+    """
+    return isinstance(error, SchedulerBusy) or (isinstance(error, LLMError) and error.retryable)
 
+async def generate_quiz_from_text(text: str):
+    if not get_llm():
+        logger.critical("No LLM backend configured (GROQ_API_KEY missing or invalid in backend/.env); returning mock quiz")
+        mock_fallbacks.inc("no_backend")
+        return get_mock_quiz_data()
+
+    prompt = PROMPT_TEMPLATE.format(min_questions=5, max_questions=10, part_note="")
+    try:
+        return await _request_quiz(prompt + pack_text(text, PROMPT_TEXT_TOKENS))
     except json.JSONDecodeError:
-        error_msg = f"JSON Decode Error. Raw response: {response_text}"
-        print(error_msg)
-        with open("backend_error.log", "w", encoding="utf-8") as f:
-            f.write(error_msg)
+        # Logged with its length in _request_quiz; any other failure reaches the caller
+        mock_fallbacks.inc("invalid_json")
         return get_mock_quiz_data()
-    except Exception as e:
-        import traceback
-        error_msg = f"Error generating quiz: {e}\n{traceback.format_exc()}"
-        print(error_msg)
-        with open("backend_error.log", "w", encoding="utf-8") as f:
-            f.write(error_msg)
+
+async def generate_quiz_for_article(scraped: dict):
+    """Generates the quiz for a scraped article, map-reducing over its sections when it is long.
+
+    Articles that fit in one chunk (or when chunking is off) take the single
+    prompt path of generate_quiz_from_text. Longer ones are split along their
+    section headings, each chunk gets its own prompt (at most CHUNK_CONCURRENCY
+    in flight), and the per-chunk quizzes are merged into one.
+    """
+    with timed("generate"):
+        return await _generate_quiz_for_article(scraped)
+
+async def _generate_quiz_for_article(scraped: dict):
+    blocks = scraped.get("blocks")
+    if not get_llm() or not blocks or CHUNK_TOKENS <= 0:
+        return await generate_quiz_from_text(scraped["text"])
+    all_chunks = chunk_article(blocks)
+    chunks = spread_chunks(all_chunks)
+    if len(chunks) <= 1:
+        return await generate_quiz_from_text(scraped["text"])
+    if len(chunks) < len(all_chunks):
+        logger.warning("Article has more chunks than QUIZ_MAX_CHUNKS; quizzing on a spread of them", extra={
+            "title": scraped.get("title"), "chunks": len(all_chunks), "kept": len(chunks),
+        })
+
+    # Ask for a little more than an even share so dedupe and rebalancing have room
+    per_chunk = max(2, math.ceil(TARGET_QUESTIONS * 1.5 / len(chunks)))
+    slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def map_chunk(i, chunk):
+        part_note = (
+            f"\n    The text is part {i + 1} of {len(chunks)} of a longer article. "
+            "Ask only about this part; summarize the whole article only if this is part 1.\n"
+        )
+        prompt = PROMPT_TEMPLATE.format(min_questions=2, max_questions=per_chunk, part_note=part_note)
+        async with slots:
+            return await _request_quiz(prompt + chunk)
+
+    results = await asyncio.gather(*(map_chunk(i, c) for i, c in enumerate(chunks)), return_exceptions=True)
+    succeeded = []
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            logger.error("Chunk generation failed", exc_info=result, extra={"chunk": i, "chunks": len(chunks)})
+        else:
+            succeeded.append(result)
+    logger.info("Chunked generation finished", extra={
+        "chunks": len(chunks), "failed": len(chunks) - len(succeeded),
+        "chunk_tokens": [estimate_tokens(c) for c in chunks],
+    })
+    if not succeeded:
+        # Overloaded or rate limited first (the caller answers 503), then any other error;
+        # only when every chunk got invalid JSON back is the mock quiz returned
+        errors = sorted(results, key=lambda e: not unavailable(e))
+        if not isinstance(errors[0], json.JSONDecodeError):
+            raise next(e for e in errors if not isinstance(e, json.JSONDecodeError))
+        mock_fallbacks.inc("all_chunks_failed")
         return get_mock_quiz_data()
+    quiz = merge_quizzes(succeeded, TARGET_QUESTIONS)
+    # Tells the reader the quiz doesn't cover the sections between the chunks left out
+    quiz["truncated"] = len(chunks) < len(all_chunks)
+    return quiz
+
+async def _stream_quiz(content: str):
+    """Streams one completion: ("summary", text) and ("question", dict) as each is written,
+    then ("result", data) with the complete parsed quiz. Raises like _request_quiz on failure.
+    """
+    llm = get_llm()
+    started = None
+
+    async def call():
+        nonlocal started
+        # From admission, as in _request_quiz, to the last token
+        started = time.perf_counter()
+        return await llm.stream(content, MAX_OUTPUT_TOKENS)
+
+    deltas = await llm_scheduler.run(call, estimate_tokens(content) + MAX_OUTPUT_TOKENS)
+
+    parser = JsonObjectStream()
+    parts = []
+    async for delta in deltas:
+        parts.append(delta)
+        for event in parser.feed(delta):
+            if event[0] == "field" and event[1] == "summary":
+                yield "summary", event[2]
+            elif event[0] == "item" and event[1] == "quiz" and isinstance(event[3], dict):
+                # Same answer fix-up the complete quiz gets below, so both agree
+                _fix_answers({"quiz": [event[3]]})
+                yield "question", event[3]
+    observe_stage("llm", time.perf_counter() - started)
+
+    response_text = "".join(parts).strip()
+    _count_tokens(content, response_text)
+    debug_ring.record("llm", response_text)
+    logger.debug("LLM response streamed", extra={"response_chars": len(response_text)})
+    if response_text.startswith("```"):
+        response_text = re.sub(r"^```json|^```", "", response_text).strip("` \n")
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        logger.error("LLM returned invalid JSON", extra={"response_chars": len(response_text)})
+        raise
+    _fix_answers(data)
+    yield "result", data
+
+async def stream_quiz_for_article(scraped: dict):
+    """Streaming form of generate_quiz_for_article.
+
+    Yields ("summary", text) and ("question", dict) events, then ("result",
+    data) with the full quiz. Articles that fit one prompt stream token by
+    token; longer ones run the chunked map-reduce and send their events once
+    it finishes. Invalid JSON gives the mock quiz as the result, as elsewhere;
+    other failures are raised.
+    """
+    llm = get_llm()
+    chunked = llm and scraped.get("blocks") and CHUNK_TOKENS > 0 and len(spread_chunks(chunk_article(scraped["blocks"]))) > 1
+    if not llm or chunked:
+        data = await generate_quiz_for_article(scraped)
+        if data.get("summary"):
+            yield "summary", data["summary"]
+        for q in data.get("quiz", []):
+            yield "question", q
+        yield "result", data
+        return
+
+    prompt = PROMPT_TEMPLATE.format(min_questions=5, max_questions=10, part_note="")
+    try:
+        async for event in _stream_quiz(prompt + pack_text(scraped["text"], PROMPT_TEXT_TOKENS)):
+            yield event
+    except json.JSONDecodeError:
+        mock_fallbacks.inc("invalid_json")
+        yield "result", get_mock_quiz_data()
+
+def _question_words(text):
+    return frozenset(re.findall(r"[a-z0-9]+", text.lower()))
+
+def _is_duplicate(words, kept):
+    # Same question reworded: nearly all words shared (Jaccard similarity)
+    for other in kept:
+        union = len(words | other)
+        if union and len(words & other) / union >= 0.8:
+            return True
+    return False
+
+def merge_quizzes(results, target=TARGET_QUESTIONS):
+    """Reduce step: one quiz from per-chunk quizzes given in article order.
+
+    The summary comes from the first chunk (the article's lead). Entities and
+    related topics are unioned. Questions are deduplicated, then picked
+    round-robin across chunks, filling DIFFICULTY_MIX quotas first, so the quiz
+    covers the whole article with a balanced spread of difficulty.
+    """
+    summary = next((r.get("summary") for r in results if r.get("summary")), "")
+
+    key_entities = {"people": [], "organizations": [], "locations": []}
+    related_topics = []
+    seen = set()
+    for result in results:
+        for kind, names in (result.get("key_entities") or {}).items():
+            bucket = key_entities.setdefault(kind, [])
+            for name in names or []:
+                if (kind, name.lower()) not in seen:
+                    seen.add((kind, name.lower()))
+                    bucket.append(name)
+        for topic in result.get("related_topics") or []:
+            if ("topic", topic.lower()) not in seen:
+                seen.add(("topic", topic.lower()))
+                related_topics.append(topic)
+
+    # Per-chunk queues of distinct, well-formed questions; (chunk, position) keeps article order
+    queues = []
+    kept_words = []
+    for c, result in enumerate(results):
+        queue = []
+        for p, q in enumerate(result.get("quiz") or []):
+            if not q.get("question") or len(q.get("options") or []) < 2 or not q.get("answer"):
+                continue
+            words = _question_words(q["question"])
+            if _is_duplicate(words, kept_words):
+                continue
+            kept_words.append(words)
+            difficulty = str(q.get("difficulty", "")).lower()
+            q = {**q, "difficulty": difficulty if difficulty in DIFFICULTY_MIX else "medium",
+                 "explanation": q.get("explanation") or ""}
+            queue.append(((c, p), q))
+        queues.append(queue)
+
+    quotas = {d: round(target * share) for d, share in DIFFICULTY_MIX.items()}
+    picked = []
+
+    def take(fits):
+        progress = True
+        while progress and len(picked) < target:
+            progress = False
+            for queue in queues:
+                for i, (_, q) in enumerate(queue):
+                    if fits(q):
+                        picked.append(queue.pop(i))
+                        quotas[q["difficulty"]] -= 1
+                        progress = True
+                        break
+                if len(picked) >= target:
+                    break
+
+    take(lambda q: quotas[q["difficulty"]] > 0)
+    # Not enough of some difficulty: fill up with whatever is left
+    take(lambda q: True)
+    picked.sort(key=lambda item: item[0])
+
+    return {
+        "summary": summary,
+        "key_entities": key_entities,
+        "quiz": [q for _, q in picked],
+        "related_topics": related_topics[:5],
+    }
 
 def get_mock_quiz_data():
     return {
@@ -11,6 +11,8 @@ class QuestionBase(BaseModel):
 
 class QuizRequest(BaseModel):
     url: str
+    # Re-scrape a stored article and regenerate its quiz only if the text changed
+    refresh: bool = False
 
 class QuizResponse(BaseModel):
     id: int
@@ -22,6 +24,8 @@ class QuizResponse(BaseModel):
     quiz: List[QuestionBase]
     related_topics: List[str]
     created_at: Optional[datetime] = None
+    # The article had more chunks than QUIZ_MAX_CHUNKS: some sections were left out of the quiz
+    truncated: bool = False
 
     class Config:
         from_attributes = True
@@ -34,3 +38,73 @@ class HistoryItem(BaseModel):
     
     class Config:
         from_attributes = True
+
+class HistoryPage(BaseModel):
+    items: List[HistoryItem]
+    # Pass back as ?cursor= to get the next (older) page; null on the last page
+    next_cursor: Optional[str] = None
+
+class SearchHit(BaseModel):
+    id: int
+    url: str
+    title: str
+    created_at: datetime
+    # Passage of the quiz around the matched words
+    snippet: str
+
+class SearchPage(BaseModel):
+    # Best match first
+    items: List[SearchHit]
+    # Pass back as ?offset= to get the next page; null on the last page
+    next_offset: Optional[int] = None
+
+class QuestionSampleRequest(BaseModel):
+    # How many questions; fewer come back when fewer match
+    n: int = 10
+    # easy, medium or hard
+    difficulty: Optional[str] = None
+    # Only questions from quizzes with this key entity, or this related topic (not both); any case
+    entity: Optional[str] = None
+    topic: Optional[str] = None
+    # Question ids already seen, never returned again
+    exclude_ids: List[int] = []
+
+class BankQuestion(QuestionBase):
+    id: int
+    quiz_id: int
+    quiz_title: str
+    url: str
+
+class QuestionSample(BaseModel):
+    # In random order
+    questions: List[BankQuestion]
+
+class BatchQuizRequest(BaseModel):
+    urls: List[str]
+    # Generations of this batch run at once; capped by the server's BATCH_MAX_CONCURRENCY
+    concurrency: Optional[int] = None
+    # As QuizRequest.refresh, for every URL of the batch
+    refresh: bool = False
+
+class BatchQuizResult(BaseModel):
+    # One NDJSON line of POST /generate_quiz/batch: a quiz, or the error for that URL
+    url: str
+    status: str  # "ok" or "error"
+    cached: bool = False
+    quiz: Optional[QuizResponse] = None
+    error: Optional[str] = None
+
+class JobStatus(BaseModel):
+    id: int
+    url: str
+    # queued, running, succeeded or failed
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    # Set once succeeded; fetch the quiz from GET /quiz/{quiz_id}
+    quiz_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,61 +1,202 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import hashlib
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def scrape_wikipedia(url: str):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'en-US,en;q=0.9',
-    }
+try:
+    from .diagnostics import debug_ring, get_logger
+    from .extract import extract
+    from .metrics import timed
+    from .page_cache import page_cache
+except ImportError:
+    from diagnostics import debug_ring, get_logger
+    from extract import extract
+    from metrics import timed
+    from page_cache import page_cache
+
+logger = get_logger("scraper")
+
+try:
+    import brotli  # noqa: F401 -- lets httpx decode br responses
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+# httpx.Timeout / httpx.Limits arguments; httpx itself is imported with the first fetch
+TIMEOUT = dict(
+    connect=float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("SCRAPER_READ_TIMEOUT", "15")),
+    write=5.0,
+    pool=5.0,
+)
+LIMITS = dict(
+    max_connections=int(os.getenv("SCRAPER_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("SCRAPER_MAX_KEEPALIVE", "20")),
+)
+
+# Parsing is CPU-bound and holds the GIL; with workers > 0 it runs in a process pool
+# instead so other requests in this worker keep being served. The queue depth caps
+# parses submitted but not yet finished; further callers wait without blocking the loop.
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", "0"))
+PARSE_QUEUE_DEPTH = int(os.getenv("SCRAPER_PARSE_QUEUE", "16"))
+
+_parse_pool = None
+_parse_slots = None
+
+def _start_parse_pool():
+    global _parse_pool
+    # spawn, not fork: the API process has an event loop and driver threads running
+    _parse_pool = ProcessPoolExecutor(PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+async def _parse_off_loop(html: bytes):
+    global _parse_slots
+    if PARSE_WORKERS <= 0:
+        return parse_wikipedia(html)
+    if _parse_pool is None:
+        _start_parse_pool()
+        _parse_slots = asyncio.Semaphore(PARSE_WORKERS + PARSE_QUEUE_DEPTH)
+    loop = asyncio.get_running_loop()
+    async with _parse_slots:
+        pool = _parse_pool
+        try:
+            return await loop.run_in_executor(pool, parse_wikipedia, html)
+        except BrokenProcessPool:
+            # A worker died (OOM-killed, crashed), which breaks the whole pool: replace
+            # it, unless a parse failing alongside already has, and retry once
+            if _parse_pool is pool:
+                logger.warning("Parse pool broken, starting a new one")
+                pool.shutdown(wait=False, cancel_futures=True)
+                _start_parse_pool()
+            return await loop.run_in_executor(_parse_pool, parse_wikipedia, html)
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+# Shared across requests: one keep-alive connection pool, and building a client
+# (and its SSL context) per fetch is costly
+_client = None
+
+def _get_client():
+    global _client
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            headers=HEADERS, follow_redirects=True, timeout=httpx.Timeout(**TIMEOUT), limits=httpx.Limits(**LIMITS)
+        )
+    return _client
+
+class FetchError(Exception):
+    """The page could not be fetched; `transient` when trying again later may work (network, 5xx, 429)."""
+
+    def __init__(self, message, transient):
+        super().__init__(message)
+        self.transient = transient
+
+async def fetch_page(url: str, meta=None):
+    """Fetches `url`, revalidating against the cached validators in `meta`.
+
+    Returns (response, not_modified). On a 304 nothing is downloaded and the
+    caller should use the cached entry.
+    """
+    import httpx
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
     try:
-        response = requests.get(url, headers=headers)
+        with timed("fetch"):
+            response = await _get_client().get(url, headers=headers)
+        if response.status_code == 304 and meta:
+            return response, True
         response.raise_for_status()
-    except requests.RequestException as e:
-        raise Exception(f"Failed to fetch URL: {e}")
-
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Title
-    title_tag = soup.find('h1', id='firstHeading')
-    title = title_tag.get_text().strip() if title_tag else "Unknown Title"
-
-    # Content
-    content_div = soup.find('div', id='mw-content-text')
-    if not content_div:
-        # Fallback for mobile wikipedia or different themes
-        content_div = soup.find('div', id='bodyContent')
-        
-    if not content_div:
-        raise Exception("Could not find article content (tried 'mw-content-text' and 'bodyContent').")
-
-    # Get all paragraphs for full text context (limit to first ~2000 words to avoid token limits if needed)
-    paragraphs = content_div.find_all('p')
-    full_text = "\n".join([p.get_text() for p in paragraphs])
+    except httpx.HTTPError as e:
+        if isinstance(e, httpx.HTTPStatusError):
+            transient = e.response.status_code >= 500 or e.response.status_code == 429
+        else:
+            # Timeouts and refused connections, not a URL httpx can't fetch or a redirect loop
+            transient = isinstance(e, httpx.TransportError) and not isinstance(e, httpx.UnsupportedProtocol)
+        raise FetchError(f"Failed to fetch URL: {e}", transient=transient)
+    return response, False
+
+async def scrape_wikipedia(url: str):
+    meta = await asyncio.to_thread(page_cache.load_meta, url) if page_cache.enabled else None
+    response, not_modified = await fetch_page(url, meta)
+
+    html = None
+    if not_modified:
+        # Unchanged since we last fetched it: no download, and no parse if we kept the result
+        if meta.get("parsed"):
+            return meta["parsed"]
+        html = await asyncio.to_thread(page_cache.load_body, url)
+        etag, last_modified = meta.get("etag"), meta.get("last_modified")
+    if html is None:
+        if not_modified:
+            # Cache entry lost its body; fetch unconditionally
+            response, _ = await fetch_page(url)
+        html = response.content
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    # Includes any wait for a parse worker
+    with timed("parse"):
+        parsed = await _parse_off_loop(html)
+    debug_ring.record("scrape", parsed["text"], url=url, title=parsed["title"], summary=parsed["summary"])
+    if page_cache.enabled:
+        await asyncio.to_thread(page_cache.store, url, html, etag, last_modified, parsed)
+    return parsed
+
+# MediaWiki's page config script carries the revision shown, e.g. "wgRevisionId":1234567890
+_REVISION_RE = re.compile(rb'"wgRevisionId"\s*:\s*(\d+)')
+
+def article_hash(text: str) -> str:
+    """Stable hash of extracted article text; whitespace differences do not change it."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def parse_wikipedia(html: bytes):
+    title, paragraphs, sections, canonical_url, outline = extract(html)
+
+    full_text = "\n".join(paragraphs)
     
     # Summary (first meaningful paragraph)
     summary = ""
     for p in paragraphs:
-        text = p.get_text().strip()
+        text = p.strip()
         if len(text) > 50:
             summary = text
             break
 
-    # Sections (h2 headlines)
-    sections = []
-    for h2 in content_div.find_all('h2'):
-        span = h2.find('span', class_='mw-headline')
-        if span:
-            sections.append(span.get_text().strip())
+    # The article split at its h2 headings (the lead has none), for chunked generation
+    blocks = []
+    bounds = [("", 0)] + list(outline) + [(None, len(paragraphs))]
+    for (heading, start), (_, end) in zip(bounds, bounds[1:]):
+        block_text = "\n".join(paragraphs[start:end])
+        if block_text.strip():
+            blocks.append({"heading": heading, "text": block_text})
 
-    with open("scraped_debug.txt", "w", encoding="utf-8") as f:
-        f.write(f"Title: {title}\n")
-        f.write(f"Summary: {summary}\n")
-        f.write("-" * 20 + "\n")
-        f.write(full_text[:5000]) # Log first 5000 chars
+    revision = _REVISION_RE.search(html)
 
     return {
         "title": title,
         "summary": summary,
-        "text": full_text[:15000], # Limit text sent to LLM to avoid excessive usage/errors
-        "sections": sections
+        "text": full_text,
+        "blocks": blocks,
+        "sections": sections,
+        "canonical_url": canonical_url,
+        "content_hash": article_hash(full_text),
+        "revision_id": int(revision.group(1)) if revision else None,
     }
@@ -0,0 +1,164 @@
+import re
+
+from sqlalchemy import DateTime, bindparam, delete, func, insert, literal_column, select, text
+from sqlalchemy.sql import column, table
+
+try:
+    from . import models
+except ImportError:
+    import models
+
+# Full-text index over stored quizzes, in a `quiz_search` table keyed by quiz id:
+# an FTS5 virtual table on SQLite, a tsvector column with a GIN index on Postgres.
+# Columns in ranking order; a match in the title counts most, one in a question least.
+COLUMNS = ("title", "entities", "summary", "questions")
+# SQLite bm25() column weights and Postgres setweight() classes for COLUMNS
+SQLITE_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+POSTGRES_WEIGHTS = ("A", "B", "C", "D")
+POSTGRES_CONFIG = literal_column("'english'::regconfig")
+# Words of a query used; the rest are ignored
+MAX_TERMS = 8
+
+_fts = table("quiz_search", column("rowid"), *(column(name) for name in COLUMNS))
+_tsv = table("quiz_search", column("quiz_id"), column("document"))
+
+
+def document(quiz_id, title, summary, key_entities, questions):
+    """The indexed text of one quiz, as parameters for the index statements."""
+    entities = " ".join(name for names in (key_entities or {}).values() for name in names)
+    return {
+        "rowid": quiz_id,
+        "title": title or "",
+        "entities": entities,
+        "summary": summary or "",
+        "questions": "\n".join(questions),
+    }
+
+
+def _index_statements(dialect):
+    # Both take document() parameters, one row or many; an already indexed quiz is replaced
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        vector = None
+        for name, weight in zip(COLUMNS, POSTGRES_WEIGHTS):
+            part = func.setweight(func.to_tsvector(POSTGRES_CONFIG, bindparam(name)), weight)
+            vector = part if vector is None else vector.op("||")(part)
+        statement = pg_insert(_tsv).values(quiz_id=bindparam("rowid"), document=vector)
+        return [statement.on_conflict_do_update(index_elements=["quiz_id"], set_={"document": statement.excluded.document})]
+    # FTS5 has no upsert
+    return [delete(_fts).where(_fts.c.rowid == bindparam("rowid")), insert(_fts)]
+
+
+async def index_quiz(db, quiz_id, title, summary, key_entities, questions):
+    """Adds a quiz to the search index, or re-indexes it; part of the caller's transaction."""
+    params = document(quiz_id, title, summary, key_entities, questions)
+    for statement in _index_statements(db.bind.dialect.name):
+        await db.execute(statement, params)
+
+
+def create_index(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS quiz_search ("
+            "quiz_id INTEGER PRIMARY KEY REFERENCES quiz_records (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_search_document ON quiz_search USING GIN (document)"))
+        return
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS quiz_search USING fts5({', '.join(COLUMNS)}, "
+        # Prefix indexes keep short prefix queries ("ph*") from merging thousands of terms
+        "tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    ))
+    # ORDER BY rank then means bm25 with these weights
+    weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+    conn.execute(text(f"INSERT INTO quiz_search (quiz_search, rank) VALUES ('rank', 'bm25({weights})')"))
+
+
+def backfill(conn, batch=1000):
+    """Indexes the quizzes not in the index yet (stored before it existed, or bulk-loaded); returns how many."""
+    quiz_records = models.QuizRecord.__table__
+    questions = models.Question.__table__
+    indexed = select(_tsv.c.quiz_id) if conn.dialect.name == "postgresql" else select(_fts.c.rowid)
+    rows = conn.execute(
+        select(quiz_records.c.id, quiz_records.c.title, quiz_records.c.summary, quiz_records.c.key_entities)
+        .where(quiz_records.c.id.not_in(indexed))
+        .order_by(quiz_records.c.id)
+    ).all()
+    statements = _index_statements(conn.dialect.name)
+    for i in range(0, len(rows), batch):
+        chunk = rows[i:i + batch]
+        texts = {row.id: [] for row in chunk}
+        for quiz_id, question_text in conn.execute(
+            select(questions.c.quiz_id, questions.c.question_text)
+            .where(questions.c.quiz_id.in_(list(texts)))
+            .order_by(questions.c.quiz_id, questions.c.id)
+        ):
+            texts[quiz_id].append(question_text or "")
+        params = [document(row.id, row.title, row.summary, row.key_entities, texts[row.id]) for row in chunk]
+        for statement in statements:
+            conn.execute(statement, params)
+    return len(rows)
+
+
+def query_terms(query):
+    """[(word, is_prefix)] for a search query; only a trailing * (as in "lovel*") makes a prefix.
+
+    Words only: quotes and operators in user input never reach the FTS query syntax.
+    """
+    words = re.findall(r"\w+", query.lower())[:MAX_TERMS]
+    # A one-letter prefix would match most of the index
+    prefix = bool(words) and query.rstrip().endswith("*") and len(words[-1]) > 1
+    return [(word, prefix and i == len(words) - 1) for i, word in enumerate(words)]
+
+
+# Every match is ranked, so the best are found however old, but only rowid and bm25
+# are read for it: the sort keeps just LIMIT + OFFSET rows, and the snippet and the
+# quiz_records row are fetched for the returned page alone. bm25() is called directly,
+# as the configured rank costs a third more per match.
+_SQLITE_SEARCH = text(f"""
+    SELECT q.id, q.url, q.title, q.created_at,
+           (SELECT snippet(quiz_search, -1, '', '', '…', 16) FROM quiz_search
+            WHERE quiz_search MATCH :match AND rowid = hit.rowid) AS snippet
+    FROM (
+        SELECT rowid, bm25(quiz_search, {", ".join(str(w) for w in SQLITE_WEIGHTS)}) AS score
+        FROM quiz_search WHERE quiz_search MATCH :match
+        ORDER BY score LIMIT :limit OFFSET :offset
+    ) AS hit
+    JOIN quiz_records q ON q.id = hit.rowid
+    ORDER BY hit.score
+""").columns(created_at=DateTime)
+# The GIN index finds the matches but cannot order them: every match is scored, with
+# a top-N sort bounded by the capped offset; the headline is only built for the page
+_POSTGRES_SEARCH = text("""
+    SELECT q.id, q.url, q.title, q.created_at,
+           ts_headline('english', q.summary, hit.query, 'MaxWords=16, MinWords=8, StartSel="", StopSel=""') AS snippet
+    FROM (
+        SELECT s.quiz_id, ts_rank_cd(s.document, query) AS score, query
+        FROM quiz_search s, to_tsquery('english', :match) AS query
+        WHERE s.document @@ query
+        ORDER BY score DESC, s.quiz_id LIMIT :limit OFFSET :offset
+    ) AS hit
+    JOIN quiz_records q ON q.id = hit.quiz_id
+    ORDER BY hit.score DESC, q.id
+""").columns(created_at=DateTime)
+
+
+async def search_quizzes(db, query, limit, offset=0):
+    """Quizzes containing every word of `query`, best match first (see query_terms).
+
+    Rows have id, url, title, created_at and snippet (a passage around the match).
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    if db.bind.dialect.name == "postgresql":
+        statement = _POSTGRES_SEARCH
+        match = " & ".join(f"{t}:*" if prefix else t for t, prefix in terms)
+    else:
+        statement = _SQLITE_SEARCH
+        match = " ".join(f'"{t}"*' if prefix else f'"{t}"' for t, prefix in terms)
+    params = {"match": match, "limit": limit, "offset": offset}
+    result = await db.execute(statement, params)
+    return result.all()
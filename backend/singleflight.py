@@ -0,0 +1,142 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+try:
+    from . import models
+    from .database import AsyncSessionLocal
+    from .diagnostics import get_logger
+except ImportError:
+    import models
+    from database import AsyncSessionLocal
+    from diagnostics import get_logger
+
+logger = get_logger("singleflight")
+
+# How long a generation lease lasts without a heartbeat before others assume its worker crashed;
+# the holder extends it a few times per TTL while it generates.
+LEASE_TTL_SECONDS = int(os.getenv("GENERATION_LEASE_TTL", "120"))
+# How often followers in other workers re-check the database while waiting.
+LEASE_POLL_SECONDS = float(os.getenv("GENERATION_LEASE_POLL", "0.5"))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key within this process.
+
+    The first call starts the coroutine in a task of its own; every caller,
+    the first included, awaits that task and receives its result or error.
+    A caller being cancelled (a client disconnecting) only stops its own
+    wait: the work carries on for the others, and is cancelled only once
+    nobody is left waiting for it.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._waiting = {}
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        self._waiting[task] = self._waiting.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiting[task] -= 1
+            if not self._waiting[task]:
+                del self._waiting[task]
+                if not task.done():
+                    # The last caller gave up: a later call for the key starts afresh
+                    del self._calls[key]
+                    task.cancel()
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark retrieved so an error nobody is left waiting for isn't logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+
+async def _acquire_lease(db, key, owner, ttl):
+    now = datetime.utcnow()
+    try:
+        # Reclaim a lease left behind by a crashed or stuck worker
+        await db.execute(delete(models.GenerationLease).where(
+            models.GenerationLease.url == key,
+            models.GenerationLease.expires_at < now,
+        ))
+        db.add(models.GenerationLease(url=key, owner=owner, expires_at=now + timedelta(seconds=ttl)))
+        await db.commit()
+        return True
+    except IntegrityError:
+        await db.rollback()
+        return False
+
+
+async def _release_lease(db, key, owner):
+    try:
+        await db.execute(delete(models.GenerationLease).where(
+            models.GenerationLease.url == key,
+            models.GenerationLease.owner == owner,
+        ))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+
+
+async def _heartbeat_lease(key, owner, ttl):
+    # Pushes expires_at forward a few times per TTL while generate runs. Its own session:
+    # the caller's is busy with the generation.
+    while True:
+        await asyncio.sleep(ttl / 3)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(models.GenerationLease)
+                    .where(models.GenerationLease.url == key, models.GenerationLease.owner == owner)
+                    .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Extending a generation lease failed", extra={"url": key})
+
+
+async def run_with_lease(db, key, lookup, generate, ttl=LEASE_TTL_SECONDS, poll=LEASE_POLL_SECONDS):
+    """Runs `generate` while holding a database lease on `key`.
+
+    Workers sharing the database coordinate through the `generation_leases`
+    table: whoever inserts the row generates, the others poll `lookup` until
+    the result shows up or the lease is released/expires and they can take over.
+    The lease is renewed while `generate` runs, so it only expires when its
+    worker stops.
+    """
+    owner = uuid.uuid4().hex
+    while True:
+        found = await lookup()
+        if found is not None:
+            return found
+
+        if await _acquire_lease(db, key, owner, ttl):
+            try:
+                # Another worker may have finished between our lookup and acquiring the lease
+                found = await lookup()
+                if found is not None:
+                    return found
+                heartbeat = asyncio.create_task(_heartbeat_lease(key, owner, ttl))
+                try:
+                    return await generate()
+                finally:
+                    heartbeat.cancel()
+            finally:
+                await _release_lease(db, key, owner)
+
+        await asyncio.sleep(poll)
+        # End the current transaction so the next lookup sees other workers' commits
+        await db.rollback()
@@ -0,0 +1,37 @@
+from urllib.parse import urlsplit, urlunsplit, unquote, parse_qs
+
+
+def _normalize_title(title: str) -> str:
+    # MediaWiki treats spaces and underscores alike and always capitalizes the first letter
+    title = unquote(title).replace(" ", "_").strip("_/")
+    return title[:1].upper() + title[1:]
+
+
+def canonicalize_url(url: str) -> str:
+    """Maps every spelling of a Wikipedia article URL to one cache key.
+
+    Mobile hosts, http vs https, ?oldid=/other query params, #fragments,
+    percent-encoding, trailing slashes and index.php?title= links all resolve
+    to https://<lang>.wikipedia.org/wiki/<Title>. Other URLs only get their
+    scheme/host lowercased and fragment and trailing slash dropped.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    path = parts.path
+
+    if host.endswith("wikipedia.org"):
+        labels = [label for label in host.split(".") if label not in ("m", "www")]
+        host = ".".join(labels)
+
+        title = None
+        if path.startswith("/wiki/"):
+            title = path[len("/wiki/"):]
+        elif path.endswith("/index.php"):
+            title = parse_qs(parts.query).get("title", [None])[0]
+
+        if title:
+            return urlunsplit(("https", host, "/wiki/" + _normalize_title(title), "", ""))
+
+    netloc = host if parts.port is None else f"{host}:{parts.port}"
+    return urlunsplit((scheme, netloc, path.rstrip("/") or "/", parts.query, ""))
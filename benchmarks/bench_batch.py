@@ -0,0 +1,108 @@
+"""Warmup throughput: N sequential POST /generate_quiz calls vs one POST /generate_quiz/batch.
+
+Boots the API under uvicorn against fake Wikipedia and Groq servers and a
+throwaway SQLite database. The URL list mimics a curriculum: some URLs repeat
+under another spelling, and a share of the articles is generated beforehand so
+the batch has cache hits. Each mode gets its own fresh database.
+
+    python benchmarks/bench_batch.py --urls 100 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, start_api
+
+
+def curriculum(wiki_url, n):
+    urls = [f"{wiki_url}/wiki/Article_{i}" for i in range(n)]
+    # Every tenth article is listed twice, the second time with a fragment
+    urls += [f"{wiki_url}/wiki/Article_{i}#History" for i in range(0, n, 10)]
+    return urls
+
+
+async def warm(api_url, urls):
+    async with httpx.AsyncClient(timeout=600) as client:
+        for url in urls:
+            await client.post(f"{api_url}/generate_quiz", json={"url": url})
+
+
+async def sequential(api_url, urls):
+    statuses = []
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=600) as client:
+        for url in urls:
+            statuses.append((await client.post(f"{api_url}/generate_quiz", json={"url": url})).status_code)
+    return time.perf_counter() - start, None, sum(s == 200 for s in statuses), len(statuses)
+
+
+async def batch(api_url, urls, concurrency):
+    ok = lines = 0
+    first = None
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=600) as client:
+        body = {"urls": urls, "concurrency": concurrency}
+        async with client.stream("POST", f"{api_url}/generate_quiz/batch", json=body) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                first = first or time.perf_counter() - start
+                lines += 1
+                ok += json.loads(line)["status"] == "ok"
+    return time.perf_counter() - start, first, ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=100)
+    parser.add_argument("--cached", type=float, default=0.2, help="share of articles generated beforehand")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--wiki-latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=args.wiki_latency)
+    llm = start_fake_llm(latency=args.llm_latency)
+    urls = curriculum(wiki.base_url, args.urls)
+    warmup = urls[:int(args.urls * args.cached)]
+
+    print(f"{len(urls)} URLs, {args.urls} articles, {len(warmup)} generated beforehand")
+    print(f"{'mode':<12}{'wall s':>9}{'first line s':>14}{'ok':>6}{'results':>9}{'LLM calls':>11}")
+    for mode in ("sequential", "batch"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ)
+            env.update({
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+                "GROQ_API_KEY": "gsk_benchmark",
+                "GROQ_BASE_URL": llm.base_url,
+                "LOG_LEVEL": "WARNING",
+                "PAGE_CACHE_DIR": "",
+            })
+            proc = start_api(ROOT / "backend", args.port, env)
+            api_url = f"http://127.0.0.1:{args.port}"
+            try:
+                asyncio.run(warm(api_url, warmup))
+                calls_before = llm.counter.total
+                if mode == "sequential":
+                    elapsed, first, ok, results = asyncio.run(sequential(api_url, urls))
+                else:
+                    elapsed, first, ok, results = asyncio.run(batch(api_url, urls, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait()
+        first_s = f"{first:.2f}" if first is not None else "-"
+        print(f"{mode:<12}{elapsed:>9.2f}{first_s:>14}{ok:>6}{results:>9}{llm.counter.total - calls_before:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Latency and coverage of single-prompt vs section-chunked quiz generation.
+
+Runs generate_quiz_for_article on synthetic Wikipedia-like articles of growing
+length against a fake LLM whose latency grows with prompt and output tokens
+(defaults roughly match llama-3.3-70b on Groq). For each article it reports
+wall-clock time, LLM calls, prompt sizes the fake server received, the share
+of the article text that reached the LLM, and how many sections the final quiz
+asks about.
+
+    python benchmarks/bench_chunking.py
+    python benchmarks/bench_chunking.py --sections 8 24 64 --decode-tps 150
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm
+from harness import ROOT
+from wiki_pages import wikipedia_like_html
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, nargs="+", default=[4, 12, 24, 48])
+    parser.add_argument("--latency", type=float, default=0.2, help="fixed seconds per LLM call")
+    parser.add_argument("--prefill-tps", type=float, default=5000)
+    parser.add_argument("--decode-tps", type=float, default=275)
+    args = parser.parse_args()
+
+    llm = start_fake_llm(latency=args.latency, prefill_tps=args.prefill_tps, decode_tps=args.decode_tps)
+    os.environ.update({"GROQ_API_KEY": "gsk_bench", "GROQ_BASE_URL": llm.base_url, "LOG_LEVEL": "WARNING"})
+    sys.path.insert(0, str(ROOT / "backend"))
+    import quiz_generator
+    from chunking import CHUNK_TOKENS, chunk_article, spread_chunks
+    from preprocess import pack_text
+    from scraper import parse_wikipedia
+
+    async def run(scraped, chunk_tokens):
+        quiz_generator.CHUNK_TOKENS = chunk_tokens
+        before = len(llm.prompt_chars)
+        start = time.perf_counter()
+        data = await quiz_generator.generate_quiz_for_article(scraped)
+        elapsed = time.perf_counter() - start
+        return elapsed, data, llm.prompt_chars[before:]
+
+    print(f"{'article':<14}{'KB':>5}  {'mode':<8}{'wall s':>8}{'calls':>6}  {'prompt KB':<24}{'coverage':>9}{'questions':>10}{'sections':>9}")
+    for sections in args.sections:
+        scraped = parse_wikipedia(wikipedia_like_html(f"Synthetic {sections}", sections=sections, seed=sections))
+        text_len = len(scraped["text"])
+        for mode, chunk_tokens in (("single", 0), ("chunked", CHUNK_TOKENS)):
+            elapsed, data, prompts = asyncio.run(run(scraped, chunk_tokens))
+            if chunk_tokens and len(prompts) > 1:
+                sent = sum(len(c) for c in spread_chunks(chunk_article(scraped["blocks"])))
+            else:
+                sent = len(pack_text(scraped["text"], quiz_generator.PROMPT_TEXT_TOKENS))
+            asked_about = {m.group(1) for q in data["quiz"] if (m := re.search(r"about (.+)\?$", q["question"]))}
+            print(
+                f"{sections:>3} sections  {text_len // 1024:>5}  {mode:<8}{elapsed:>8.2f}{len(prompts):>6}  "
+                f"{','.join(str(p // 1024) for p in prompts)[:23]:<24}{min(1.0, sent / text_len):>9.0%}"
+                f"{len(data['quiz']):>10}{len(asked_about) or 1:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
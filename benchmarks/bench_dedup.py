@@ -0,0 +1,111 @@
+"""LLM calls per unique article text, across aliases, refreshes and edits.
+
+Imports the API in-process against a fake Wikipedia and a fake LLM (one LLM
+call per generation: chunking is off) and runs four phases:
+
+- cold: POST /generate_quiz for --articles distinct articles
+- aliases: the same articles under a second URL whose page has a different
+  canonical link but identical text (a mirror, or a move without a redirect)
+- refresh: POST /generate_quiz/batch with refresh for all articles, none edited
+- edits: --edit-share of the articles get new text and a new revision, then
+  the refresh batch runs again
+
+For each phase it prints the LLM calls made and the new unique texts seen; the
+ideal is one call per unique text.
+
+    python benchmarks/bench_dedup.py --articles 50
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, asgi_request, load_app
+from wiki_pages import wikipedia_like_html
+
+MIRROR = " (mirror)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--edit-share", type=float, default=0.2)
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    args = parser.parse_args()
+
+    # Article title -> (text seed, revision); an edit changes both
+    versions = {f"Article {i}": (i, 1000 + i) for i in range(args.articles)}
+
+    def page(title):
+        base = title[: -len(MIRROR)] if title.endswith(MIRROR) else title
+        seed, revision = versions.get(base, (0, None))
+        html = wikipedia_like_html(base, sections=4, seed=seed, revision=revision)
+        if base != title:
+            slug = base.replace(" ", "_")
+            html = html.replace(f"/wiki/{slug}\"".encode(), f"/wiki/{slug}_(mirror)\"".encode(), 1)
+        return html
+
+    wiki = start_fake_wikipedia(latency=0.005, page=page)
+    llm = start_fake_llm(latency=0.02)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = load_app(args.backend_dir, {
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "ERROR",
+            "PAGE_CACHE_DIR": "",
+            "QUIZ_CHUNK_TOKENS": "0",
+        })
+
+        def url(title):
+            return f"{wiki.base_url}/wiki/{title.replace(' ', '_')}"
+
+        async def generate(titles):
+            for title in titles:
+                status, _ = await asgi_request(app, "POST", "/generate_quiz", json.dumps({"url": url(title)}).encode())
+                assert status == 200, status
+
+        async def refresh(titles):
+            body = json.dumps({"urls": [url(t) for t in titles], "refresh": True}).encode()
+            status, payload = await asgi_request(app, "POST", "/generate_quiz/batch", body)
+            lines = [json.loads(line) for line in payload.splitlines() if line]
+            assert status == 200 and all(line["status"] == "ok" for line in lines), payload[:300]
+
+        titles = list(versions)
+        edited = titles[: int(len(titles) * args.edit_share)]
+
+        async def run():
+            phases = []
+
+            async def phase(name, new_texts, work):
+                before = llm.counter.total
+                await work
+                phases.append((name, llm.counter.total - before, new_texts))
+
+            await phase("cold", len(titles), generate(titles))
+            await phase("aliases", 0, generate([t + MIRROR for t in titles]))
+            await phase("refresh", 0, refresh(titles))
+            for title in edited:
+                seed, revision = versions[title]
+                versions[title] = (seed + 100_000, revision + 1)
+            await phase("edits", len(edited), refresh(titles))
+            return phases
+
+        phases = asyncio.run(run())
+
+    print(f"backend: {args.backend_dir}")
+    print(f"{'phase':<10}{'LLM calls':>10}{'new texts':>10}")
+    for name, calls, new_texts in phases:
+        print(f"{name:<10}{calls:>10}{new_texts:>10}")
+    calls = sum(p[1] for p in phases)
+    texts = sum(p[2] for p in phases)
+    print(f"{'total':<10}{calls:>10}{texts:>10}   {calls / texts:.2f} calls per unique text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""In-flight request capacity of POST /generate_quiz.
+
+Starts a fake Wikipedia and a fake Groq server, boots the API under uvicorn
+against a throwaway SQLite database, fires N concurrent generate requests for
+distinct articles and reports how many LLM calls were in flight at once.
+
+To compare before/after, point --backend-dir at the backend/ folder of another
+checkout (e.g. `git worktree add /tmp/before <commit>`):
+
+    python benchmarks/bench_inflight.py --requests 200
+    python benchmarks/bench_inflight.py --requests 200 --backend-dir /tmp/before/backend
+
+Set BENCH_DB to run against another database instead of a fresh SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, start_api
+
+
+async def fire(api_url, wiki_url, n):
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    async with httpx.AsyncClient(limits=limits, timeout=600) as client:
+        async def one(i):
+            r = await client.post(f"{api_url}/generate_quiz", json={"url": f"{wiki_url}/wiki/Article_{i}"})
+            return r.status_code
+
+        return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--wiki-latency", type=float, default=0.1)
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=args.wiki_latency)
+    llm = start_fake_llm(latency=args.llm_latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": os.getenv("BENCH_DB", f"sqlite:///{tmp}/bench.db"),
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+        })
+        proc = start_api(args.backend_dir, args.port, env)
+        try:
+            start = time.perf_counter()
+            statuses = asyncio.run(fire(f"http://127.0.0.1:{args.port}", wiki.base_url, args.requests))
+            elapsed = time.perf_counter() - start
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    ok = sum(1 for s in statuses if s == 200)
+    print(f"backend:             {args.backend_dir}")
+    print(f"requests:            {args.requests} ({ok} ok)")
+    print(f"wall time:           {elapsed:.2f}s")
+    print(f"throughput:          {args.requests / elapsed:.1f} req/s")
+    print(f"peak in-flight wiki: {wiki.counter.peak}")
+    print(f"peak in-flight LLM:  {llm.counter.peak}")
+
+
+if __name__ == "__main__":
+    main()
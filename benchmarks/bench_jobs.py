@@ -0,0 +1,112 @@
+"""Background job mode: submit latency, completion time, retries and crash recovery.
+
+Boots the API under uvicorn against fake Wikipedia and Groq servers, submits N
+POST /jobs requests and polls GET /jobs/{id} until every job has finished.
+With --crash the first API process is killed (SIGKILL) while jobs are running
+and a second one is started on the same database; its workers must pick the
+orphaned jobs back up once their lease lapses. --llm-error-rate makes the fake
+LLM fail a share of calls so jobs go through retries.
+
+    python benchmarks/bench_jobs.py --jobs 50 --workers 8
+    python benchmarks/bench_jobs.py --jobs 50 --workers 8 --crash --llm-error-rate 0.3
+
+Set BENCH_DB to run against another database (e.g. a local Postgres).
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, percentile, start_api
+
+
+async def submit(api_url, wiki_url, n):
+    latencies = []
+    async with httpx.AsyncClient(timeout=60) as client:
+        async def one(i):
+            start = time.perf_counter()
+            r = await client.post(f"{api_url}/jobs", json={"url": f"{wiki_url}/wiki/Job_{i}"})
+            latencies.append(time.perf_counter() - start)
+            r.raise_for_status()
+            return r.json()["id"]
+
+        ids = await asyncio.gather(*(one(i) for i in range(n)))
+    return ids, latencies
+
+
+async def poll(api_url, ids, until_done=True, timeout=600):
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient(timeout=60) as client:
+        while True:
+            jobs = [(await client.get(f"{api_url}/jobs/{i}")).json() for i in ids]
+            finished = [j for j in jobs if j["status"] in ("succeeded", "failed")]
+            if (len(finished) == len(jobs) if until_done else finished) or time.time() > deadline:
+                return jobs
+            await asyncio.sleep(0.25)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--crash", action="store_true")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=0.05)
+    llm = start_fake_llm(latency=args.llm_latency, error_rate=args.llm_error_rate)
+    api_url = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": os.getenv("BENCH_DB", f"sqlite:///{tmp}/bench.db"),
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "WARNING",
+            "PAGE_CACHE_DIR": "",
+            "JOB_WORKERS": str(args.workers),
+            "JOB_RETRY_BASE": "0.5",
+            # Short leases so the crash run recovers in seconds, not minutes
+            "JOB_LEASE_SECONDS": "5",
+            "GENERATION_LEASE_TTL": "5",
+        })
+        proc = start_api(ROOT / "backend", args.port, env)
+        try:
+            start = time.perf_counter()
+            ids, submit_latencies = asyncio.run(submit(api_url, wiki.base_url, args.jobs))
+            if args.crash:
+                asyncio.run(poll(api_url, ids, until_done=False))
+                proc.kill()
+                proc.wait()
+                print(f"killed API process after {time.perf_counter() - start:.1f}s; restarting")
+                proc = start_api(ROOT / "backend", args.port, env)
+            jobs = asyncio.run(poll(api_url, ids))
+            elapsed = time.perf_counter() - start
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    statuses = collections.Counter(j["status"] for j in jobs)
+    attempts = collections.Counter(j["attempts"] for j in jobs)
+    print(f"jobs:              {args.jobs} with {args.workers} workers")
+    print(f"submit p50 / p99:  {percentile(submit_latencies, 50) * 1000:.1f} / {percentile(submit_latencies, 99) * 1000:.1f} ms")
+    print(f"all finished in:   {elapsed:.2f}s")
+    print(f"statuses:          {dict(statuses)}")
+    print(f"attempts:          {dict(sorted(attempts.items()))}")
+    print(f"LLM calls:         {llm.counter.total} (peak in flight {llm.counter.peak})")
+    sys.exit(0 if statuses.get("succeeded") == args.jobs else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""LLM rate-limit handling: 429s, mock fallbacks and priority under a Groq-like limit.
+
+The fake LLM enforces a requests-per-minute limit with a small burst and
+answers 429 + Retry-After beyond it. Each scenario boots a fresh API under
+uvicorn:
+
+- burst: --requests concurrent POST /generate_quiz for distinct articles,
+  once per scheduler configuration. It reports how many users got the
+  unsaved mock quiz (id 0), the 429s the LLM sent, and latency.
+- priority: a POST /generate_quiz/batch warmup is queued first. Then a few
+  interactive requests arrive, and their latency is compared with the batch
+  items'.
+
+    python benchmarks/bench_llm_scheduler.py --requests 30 --rpm 120
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, percentile, start_api
+
+CONFIGS = {
+    # Roughly the old behavior: the SDK's two retries, no client-side limiting
+    "retries only": {"LLM_RPM": "0", "LLM_MAX_RETRIES": "2"},
+    "retries + pause": {"LLM_RPM": "0", "LLM_MAX_RETRIES": "6"},
+    "rpm limiter": {"LLM_MAX_RETRIES": "6"},
+}
+
+
+async def burst(api_url, wiki_url, n, tag):
+    async with httpx.AsyncClient(timeout=600) as client:
+        async def one(i):
+            start = time.perf_counter()
+            r = await client.post(f"{api_url}/generate_quiz", json={"url": f"{wiki_url}/wiki/{tag}_{i}"})
+            mock = r.status_code != 200 or r.json()["id"] == 0
+            return time.perf_counter() - start, mock
+
+        return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+async def priority(api_url, wiki_url, n_batch, n_interactive):
+    async with httpx.AsyncClient(timeout=600) as client:
+        batch_latencies = []
+
+        async def warmup():
+            start = time.perf_counter()
+            urls = [f"{wiki_url}/wiki/Warmup_{i}" for i in range(n_batch)]
+            async with client.stream("POST", f"{api_url}/generate_quiz/batch", json={"urls": urls}) as response:
+                async for line in response.aiter_lines():
+                    if line:
+                        batch_latencies.append(time.perf_counter() - start)
+                        json.loads(line)
+
+        async def interactive(i):
+            await asyncio.sleep(1.0)
+            start = time.perf_counter()
+            await client.post(f"{api_url}/generate_quiz", json={"url": f"{wiki_url}/wiki/Interactive_{i}"})
+            return time.perf_counter() - start
+
+        results = await asyncio.gather(warmup(), *(interactive(i) for i in range(n_interactive)))
+        return batch_latencies, results[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--rpm", type=float, default=120)
+    parser.add_argument("--burst-seconds", type=float, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=0.02)
+    llm = start_fake_llm(latency=args.llm_latency, rpm=args.rpm, burst_seconds=args.burst_seconds)
+
+    def boot(tmp, extra):
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "ERROR",
+            "PAGE_CACHE_DIR": "",
+            "LLM_RPM": str(args.rpm),
+            "LLM_BURST_SECONDS": str(args.burst_seconds),
+            "LLM_RETRY_BASE": "0.5",
+            **extra,
+        })
+        return start_api(ROOT / "backend", args.port, env)
+
+    api_url = f"http://127.0.0.1:{args.port}"
+    print(f"LLM limit {args.rpm:g} rpm, burst {args.rpm / 60 * args.burst_seconds:g}; {args.requests} concurrent requests")
+    print(f"{'config':<18}{'mock':>6}{'429s':>6}{'wall s':>8}{'p50 s':>8}{'p95 s':>8}")
+    for name, extra in CONFIGS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = boot(tmp, extra)
+            rejected = llm.rate_limit.rejected
+            try:
+                start = time.perf_counter()
+                results = asyncio.run(burst(api_url, wiki.base_url, args.requests, name.replace(" ", "_")))
+                elapsed = time.perf_counter() - start
+            finally:
+                proc.terminate()
+                proc.wait()
+        latencies = [r[0] for r in results]
+        print(
+            f"{name:<18}{sum(r[1] for r in results):>6}{llm.rate_limit.rejected - rejected:>6}{elapsed:>8.1f}"
+            f"{percentile(latencies, 50):>8.1f}{percentile(latencies, 95):>8.1f}"
+        )
+        time.sleep(args.burst_seconds)  # let the fake's bucket refill between configs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = boot(tmp, CONFIGS["rpm limiter"])
+        try:
+            batch_latencies, interactive_latencies = asyncio.run(priority(api_url, wiki.base_url, args.requests, 5))
+        finally:
+            proc.terminate()
+            proc.wait()
+    print(f"\npriority: batch of {args.requests} queued first, 5 interactive requests 1 s later")
+    print(f"  interactive p50 {percentile(interactive_latencies, 50):.1f}s, max {max(interactive_latencies):.1f}s")
+    print(f"  batch items  p50 {percentile(batch_latencies, 50):.1f}s, last {max(batch_latencies):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
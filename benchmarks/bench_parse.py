@@ -0,0 +1,70 @@
+"""Parse time per page for each HTML extractor, with a parity check.
+
+Every page is run through each extractor in backend/extract.py; the outputs
+must match the pure-Python reference (bs4) exactly or the script exits 1.
+Pages come from benchmarks/corpus/*.html[.gz] (see fetch_corpus.py) plus
+synthetic Wikipedia-like pages of increasing size.
+
+    python benchmarks/bench_parse.py
+"""
+import argparse
+import gzip
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from harness import ROOT
+from wiki_pages import wikipedia_like_html
+
+sys.path.insert(0, str(ROOT / "backend"))
+from extract import EXTRACTORS
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+def load_pages():
+    pages = []
+    for path in sorted(CORPUS_DIR.glob("*.html*")):
+        data = path.read_bytes()
+        if path.suffix == ".gz":
+            data = gzip.decompress(data)
+        pages.append((path.name.split(".html")[0], data))
+    for sections in (4, 16, 48):
+        pages.append((f"synthetic-{sections}s", wikipedia_like_html(f"Synthetic {sections}", sections=sections, seed=sections)))
+    return pages
+
+
+def time_extractor(fn, html, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = list(EXTRACTORS)
+    print(f"{'page':<28}{'KB':>7}" + "".join(f"{n + ' ms':>12}" for n in names) + "  parity")
+    mismatches = 0
+    for page, html in load_pages():
+        reference = EXTRACTORS["bs4"](html)
+        row = f"{page[:27]:<28}{len(html) // 1024:>7}"
+        same = True
+        for name in names:
+            if EXTRACTORS[name](html) != reference:
+                same = False
+            row += f"{time_extractor(EXTRACTORS[name], html, args.repeat) * 1000:>12.2f}"
+        mismatches += not same
+        print(row + ("  ok" if same else "  MISMATCH"))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Read latency while large articles are being generated.
+
+Boots the API under uvicorn with a fake Wikipedia serving full-size synthetic
+articles and a fast fake LLM. One set of clients keeps generating quizzes for
+new (uncached) articles while another reads /history and /quiz/{id}; the
+read-side percentiles show how much parsing stalls the rest of the worker.
+Run once per parse mode:
+
+    python benchmarks/bench_parse_pool.py --parse-workers 0
+    python benchmarks/bench_parse_pool.py --parse-workers 2
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, hammer, seed_quizzes, start_api, summarize
+from wiki_pages import wikipedia_like_html
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parse-workers", type=int, default=0)
+    parser.add_argument("--extractor", default="bs4", help="HTML extractor; bs4 makes parsing dominate")
+    parser.add_argument("--sections", type=int, default=48, help="size of each generated article")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=0.01, page=partial(wikipedia_like_html, sections=args.sections))
+    llm = start_fake_llm(latency=0.05)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = os.getenv("BENCH_DB", f"sqlite:///{tmp}/bench.db")
+        env = dict(os.environ, **{
+            "DATABASE_URL": database_url,
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "PAGE_CACHE_DIR": "",
+            "QUIZ_CACHE_MAX_BYTES": "0",
+            "SCRAPER_PARSE_WORKERS": str(args.parse_workers),
+            "SCRAPER_HTML_EXTRACTOR": args.extractor,
+        })
+        proc = start_api(args.backend_dir, args.port, env)
+        try:
+            ids = seed_quizzes(database_url, 200)
+            base = f"http://127.0.0.1:{args.port}"
+            articles = itertools.count()
+
+            async def generate(client):
+                url = f"{wiki.base_url}/wiki/Large_{next(articles)}"
+                return await client.post(f"{base}/generate_quiz", json={"url": url})
+
+            async def read(client):
+                if random.random() < 0.5:
+                    return await client.get(f"{base}/history")
+                return await client.get(f"{base}/quiz/{random.choice(ids)}")
+
+            async def run():
+                return await asyncio.gather(
+                    hammer(read, args.readers, args.duration),
+                    hammer(generate, args.writers, args.duration),
+                )
+
+            (reads, read_errors), (writes, write_errors) = asyncio.run(run())
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"parse workers: {args.parse_workers}, extractor: {args.extractor}")
+    print("reads:    ", summarize(reads, read_errors, args.duration))
+    print("generates:", summarize(writes, write_errors, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Prompt tokens saved per article by the preprocessing stage (backend/preprocess.py).
+
+Every page of the corpus (benchmarks/corpus/*.html[.gz], see fetch_corpus.py,
+plus synthetic Wikipedia-like pages) is parsed as the scraper does, then:
+
+- article tokens: the whole scraped text, and after preprocess_article
+  (reference markers, pronunciation, coordinates, boilerplate and repeated
+  paragraphs removed, whitespace collapsed)
+- prompt tokens: the single-prompt article text as it was sent before (the
+  first 15000 characters) and now (pack_text to QUIZ_PROMPT_TOKENS)
+- coverage: share of the cleaned article's tokens that reach the prompt
+
+Tokens are backend/chunking.estimate_tokens; "chars/4" is the character
+count estimate it replaced, for comparison.
+
+    python benchmarks/bench_preprocess.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bench_parse import load_pages
+from harness import ROOT
+
+sys.path.insert(0, str(ROOT / "backend"))
+from chunking import CHARS_PER_TOKEN, estimate_tokens
+from preprocess import pack_text, preprocess_article
+from quiz_generator import PROMPT_TEXT_TOKENS
+from scraper import parse_wikipedia
+
+# The single-prompt cut before the token budget
+OLD_PROMPT_CHARS = 15000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=PROMPT_TEXT_TOKENS, help="prompt article tokens")
+    args = parser.parse_args()
+
+    print(f"prompt budget {args.budget} tokens")
+    print(
+        f"{'page':<24}{'chars/4':>8}{'tokens':>8}{'cleaned':>8}{'saved':>7}"
+        f"{'prompt before':>14}{'now':>6}{'coverage before':>16}{'now':>6}{'ms':>6}"
+    )
+    totals = [0, 0]
+    for page, html in load_pages():
+        scraped = parse_wikipedia(html)
+        start = time.perf_counter()
+        cleaned = preprocess_article(scraped)
+        packed = pack_text(cleaned["text"], args.budget)
+        elapsed = time.perf_counter() - start
+
+        raw_tokens = estimate_tokens(scraped["text"])
+        clean_tokens = estimate_tokens(cleaned["text"])
+        before = scraped["text"][:OLD_PROMPT_CHARS]
+        # How much of the cleaned article the old cut carried: its cleaned paragraphs
+        before_covered = estimate_tokens(preprocess_article({"text": before})["text"])
+        totals[0] += raw_tokens
+        totals[1] += clean_tokens
+        print(
+            f"{page[:23]:<24}{-(-len(scraped['text']) // CHARS_PER_TOKEN):>8}{raw_tokens:>8}{clean_tokens:>8}"
+            f"{1 - clean_tokens / raw_tokens:>7.1%}{estimate_tokens(before):>14}{estimate_tokens(packed):>6}"
+            f"{min(1.0, before_covered / clean_tokens):>16.0%}{estimate_tokens(packed) / clean_tokens:>6.0%}"
+            f"{elapsed * 1000:>6.1f}"
+        )
+    print(f"\narticle tokens saved overall: {1 - totals[1] / totals[0]:.1%}")
+
+
+if __name__ == "__main__":
+    main()
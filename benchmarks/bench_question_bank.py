@@ -0,0 +1,172 @@
+"""POST /question_bank/sample latency against ORDER BY random(), at a million questions.
+
+Seeds --quizzes quizzes of 8 questions each (1M questions by default) whose key
+entities and related topics are drawn Zipf-style from synthetic name pools, runs
+migrate.py to key and index what was loaded, then imports the API in-process and
+times POST /question_bank/sample (n=10) for:
+
+- any: no filter
+- difficulty: one difficulty
+- entity / rare entity: a key entity from the head / the tail of the pool
+- topic + difficulty: a related topic, one difficulty
+- excluding 1000: no filter, 1000 already seen ids excluded
+
+Each is compared with the same filter as ORDER BY random() LIMIT 10, which reads
+every matching row. Excluded ids must never come back. Finally one quiz is
+generated through the API (fake Wikipedia and LLM) and must be sampled by one of
+its entities, to check that new quizzes enter the bank as they are stored.
+
+    python benchmarks/bench_question_bank.py --quizzes 125000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, asgi_request, load_app, percentile, seed_quizzes
+
+POOLS = {"people": 20_000, "organizations": 5_000, "locations": 2_000, "topic": 1_000}
+
+
+def make_entities(pools, seed):
+    rng = random.Random(seed)
+
+    def draw(kind, k):
+        names, cum_weights = pools[kind]
+        return sorted(set(rng.choices(names, cum_weights=cum_weights, k=k)))
+
+    key_entities = {kind: draw(kind, 3) for kind in ("people", "organizations", "locations")}
+    return key_entities, draw("topic", 4)
+
+
+def order_by_random(path, where, params, n=10):
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    conn.execute(f"SELECT id FROM questions WHERE {where} ORDER BY random() LIMIT {n}", params).fetchall()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=125_000, help="8 questions each")
+    parser.add_argument("--samples", type=int, default=300, help="requests per sample kind")
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    args = parser.parse_args()
+
+    pools = {}
+    for kind, size in POOLS.items():
+        names = [f"{kind.title()} {i}" for i in range(size)]
+        pools[kind] = (names, list(itertools.accumulate(1 / (rank + 1) for rank in range(size))))
+    wiki = start_fake_wikipedia(latency=0.005)
+    llm = start_fake_llm(latency=0.01)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/bank.db"
+        database_url = f"sqlite:///{path}"
+        env = {
+            "DATABASE_URL": database_url,
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "ERROR",
+            "PAGE_CACHE_DIR": "",
+            "QUIZ_CHUNK_TOKENS": "0",
+        }
+        # Schema first, then the bulk load, then migrate again to key and index what was loaded
+        subprocess.run([sys.executable, "migrate.py"], cwd=args.backend_dir, check=True, stdout=subprocess.DEVNULL,
+                       env={**os.environ, **env})
+        start = time.perf_counter()
+        seed_quizzes(database_url, args.quizzes, entities=lambda quiz_id: make_entities(pools, quiz_id))
+        print(f"seeded {args.quizzes} quizzes in {time.perf_counter() - start:.1f}s", flush=True)
+        start = time.perf_counter()
+        app = load_app(args.backend_dir, env)
+        print(f"migrate + import (keys and indexes the seeded quizzes): {time.perf_counter() - start:.1f}s", flush=True)
+        conn = sqlite3.connect(path)
+        total = conn.execute("SELECT count(*) FROM questions").fetchone()[0]
+        excluded = [row[0] for row in conn.execute("SELECT id FROM questions ORDER BY random() LIMIT 1000")]
+        conn.close()
+
+        entity = "SELECT quiz_id FROM quiz_entities WHERE name = ? AND kind != 'topic'"
+        topic = "SELECT quiz_id FROM quiz_entities WHERE name = ? AND kind = 'topic'"
+
+        # (request body, ORDER BY random() filter, its parameters) per kind
+        def by_difficulty(d):
+            return {"difficulty": d}, "difficulty = ?", (d,)
+
+        def by_entity(name):
+            return {"entity": name}, f"quiz_id IN ({entity})", (name.lower(),)
+
+        def by_hard_topic(name):
+            return {"topic": name, "difficulty": "hard"}, f"difficulty = 'hard' AND quiz_id IN ({topic})", (name.lower(),)
+
+        kinds = {
+            "any": lambda r: ({}, "1", ()),
+            "difficulty": lambda r: by_difficulty(r.choice(["easy", "medium", "hard"])),
+            "entity": lambda r: by_entity(r.choice(pools["people"][0][:20])),
+            "rare entity": lambda r: by_entity(r.choice(pools["organizations"][0][-2000:])),
+            "topic + difficulty": lambda r: by_hard_topic(r.choice(pools["topic"][0][:200])),
+            "excluding 1000": lambda r: ({"exclude_ids": excluded}, f"id NOT IN ({','.join(map(str, excluded))})", ()),
+        }
+
+        async def run():
+            results = {}
+            for kind, pick in kinds.items():
+                r = random.Random(kind)
+                cases = [pick(r) for _ in range(args.samples)]
+                latencies, returned, repeats = [], 0, 0
+                for body, _, _ in cases:
+                    t = time.perf_counter()
+                    status, response = await asgi_request(
+                        app, "POST", "/question_bank/sample", json.dumps({"n": 10, **body}).encode()
+                    )
+                    latencies.append(time.perf_counter() - t)
+                    assert status == 200, response[:200]
+                    ids = [q["id"] for q in json.loads(response)["questions"]]
+                    returned += len(ids)
+                    repeats += len(set(ids) & set(body.get("exclude_ids", ())))
+                scans = [order_by_random(path, where, params) for _, where, params in cases[:10]]
+                results[kind] = (latencies, returned / len(cases), repeats, scans)
+
+            # A quiz stored through the API is in the bank at once
+            status, response = await asgi_request(
+                app, "POST", "/generate_quiz", json.dumps({"url": f"{wiki.base_url}/wiki/Zebulon_Quixotry"}).encode()
+            )
+            assert status == 200
+            quiz = json.loads(response)
+            name = next(name for names in quiz["key_entities"].values() for name in names)
+            status, response = await asgi_request(
+                app, "POST", "/question_bank/sample", json.dumps({"n": 50, "entity": name.upper()}).encode()
+            )
+            found = quiz["id"] in {q["quiz_id"] for q in json.loads(response)["questions"]}
+            return results, name, found
+
+        results, name, found = asyncio.run(run())
+
+    print(f"\n{total} questions in {args.quizzes} quizzes, n=10")
+    print(f"{'sample':<20}{'returned':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'random() p50 ms':>17}")
+    repeats = 0
+    for kind, (latencies, returned, kind_repeats, scans) in results.items():
+        repeats += kind_repeats
+        print(
+            f"{kind:<20}{returned:>9.1f}{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 95) * 1000:>9.2f}"
+            f"{percentile(latencies, 99) * 1000:>9.2f}{percentile(scans, 50) * 1000:>17.1f}"
+        )
+    print(f"\nexcluded ids returned: {repeats}")
+    print(f"new quiz sampled by entity {name!r}: {found}")
+    if repeats or not found:
+        sys.exit("FAILED: an excluded question came back or the generated quiz is not in the bank")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Requests per second on GET /quiz/{id}.
+
+Imports the API in-process against a throwaway SQLite database seeded with
+synthetic quizzes and drives it through ASGI directly, so the numbers measure
+the app rather than an HTTP client sharing the same CPU. Every quiz is read
+once before timing starts.
+
+    python benchmarks/bench_quiz_read.py
+    python benchmarks/bench_quiz_read.py --backend-dir /tmp/before/backend
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from harness import ROOT, asgi_request, load_app, seed_quizzes, summarize
+
+
+async def run(app, ids, concurrency, duration):
+    for quiz_id in ids:
+        await asgi_request(app, "GET", f"/quiz/{quiz_id}")
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def loop():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, "GET", f"/quiz/{random.choice(ids)}")
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = os.getenv("BENCH_DB", f"sqlite:///{tmp}/bench.db")
+        app = load_app(args.backend_dir, {"DATABASE_URL": database_url})
+        ids = seed_quizzes(database_url, args.quizzes)
+        latencies, errors = asyncio.run(run(app, ids, args.concurrency, args.duration))
+
+    print(f"backend: {args.backend_dir}")
+    for key, value in summarize(latencies, errors, args.duration).items():
+        print(f"{key:>9}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""GET /search latency against the table scan it replaces, by how common the words are.
+
+Seeds --rows quizzes whose titles, summaries and questions are drawn from a
+Zipf-distributed synthetic vocabulary, runs migrate.py to build the search
+index, then imports the API in-process and times GET /search for:
+
+- rare / medium / common: one word from the tail, the middle or the head of the vocabulary
+- two words: a medium and a common word, both required
+- prefix: the first four letters of a medium word, as "abcd*"
+
+Each is compared with an unranked LIKE '%word%' scan over title, summary and
+questions, the only way to find a quiz without the index. Finally one quiz is
+generated through the API (fake Wikipedia and LLM) and searched for by a word of
+its title, to check that new quizzes are indexed as they are stored.
+
+    python benchmarks/bench_search.py --rows 100000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, asgi_request, load_app, percentile, seed_quizzes
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "van", "dor", "sil", "ra", "mon", "bel", "tis", "gar", "nu", "phe", "quo", "zan"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def make_text(words, cum_weights, seed):
+    rng = random.Random(seed)
+
+    def sentence(n):
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=n)).capitalize() + "."
+
+    title = " ".join(rng.choices(words, cum_weights=cum_weights, k=3)).title()
+    summary = " ".join(sentence(15) for _ in range(5))
+    questions = [sentence(12)[:-1] + "?" for _ in range(8)]
+    return title, summary, questions
+
+
+def like_scan(path, word, limit=20):
+    conn = sqlite3.connect(path)
+    pattern = f"%{word}%"
+    start = time.perf_counter()
+    conn.execute(
+        "SELECT id FROM quiz_records WHERE title LIKE ?1 OR summary LIKE ?1 "
+        "OR id IN (SELECT quiz_id FROM questions WHERE question_text LIKE ?1) LIMIT ?2",
+        (pattern, limit),
+    ).fetchall()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200, help="requests per query kind")
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    words = vocabulary(args.vocabulary, rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    wiki = start_fake_wikipedia(latency=0.005)
+    llm = start_fake_llm(latency=0.01)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/search.db"
+        database_url = f"sqlite:///{path}"
+        env = {
+            "DATABASE_URL": database_url,
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "ERROR",
+            "PAGE_CACHE_DIR": "",
+            "QUIZ_CHUNK_TOKENS": "0",
+        }
+        # Schema first, then the bulk load, then migrate again to index what was loaded
+        subprocess.run([sys.executable, "migrate.py"], cwd=args.backend_dir, check=True, stdout=subprocess.DEVNULL,
+                       env={**os.environ, **env})
+        start = time.perf_counter()
+        seed_quizzes(database_url, args.rows, text=lambda quiz_id: make_text(words, cum_weights, quiz_id))
+        print(f"seeded {args.rows} quizzes in {time.perf_counter() - start:.1f}s", flush=True)
+        start = time.perf_counter()
+        app = load_app(args.backend_dir, env)
+        print(f"migrate + import (indexes the seeded quizzes): {time.perf_counter() - start:.1f}s", flush=True)
+
+        head, middle, tail = words[:10], words[400:600], words[-5000:]
+        kinds = {
+            "rare": lambda r: r.choice(tail),
+            "medium": lambda r: r.choice(middle),
+            "common": lambda r: r.choice(head),
+            "two words": lambda r: f"{r.choice(middle)} {r.choice(head)}",
+            "prefix": lambda r: r.choice(middle)[:4] + "*",
+        }
+
+        async def run():
+            results = {}
+            for kind, pick in kinds.items():
+                r = random.Random(kind)
+                queries = [pick(r) for _ in range(args.queries)]
+                latencies, hits = [], 0
+                for q in queries:
+                    t = time.perf_counter()
+                    status, body = await asgi_request(app, "GET", f"/search?q={quote(q)}&limit=20")
+                    latencies.append(time.perf_counter() - t)
+                    assert status == 200, body[:200]
+                    hits += len(json.loads(body)["items"])
+                scans = [like_scan(path, q.split()[0].rstrip("*")) for q in queries[:20]]
+                results[kind] = (latencies, hits / len(queries), scans)
+
+            # A quiz stored through the API is searchable at once
+            title = "Zebulon Quixotry"
+            status, _ = await asgi_request(
+                app, "POST", "/generate_quiz", json.dumps({"url": f"{wiki.base_url}/wiki/{title.replace(' ', '_')}"}).encode()
+            )
+            assert status == 200
+            status, body = await asgi_request(app, "GET", "/search?q=quixotry")
+            found = [item["title"] for item in json.loads(body)["items"]]
+            return results, found
+
+        results, found = asyncio.run(run())
+
+    print(f"\n{args.rows} quizzes, {args.vocabulary} words")
+    print(f"{'query':<11}{'hits/page':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'LIKE p50 ms':>13}")
+    for kind, (latencies, hits, scans) in results.items():
+        print(
+            f"{kind:<11}{hits:>10.1f}{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 95) * 1000:>9.2f}"
+            f"{percentile(latencies, 99) * 1000:>9.2f}{percentile(scans, 50) * 1000:>13.1f}"
+        )
+    print(f"\nnew quiz found by search: {found}")
+    if not found:
+        sys.exit("FAILED: the generated quiz is not in the search index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Concurrent reads and writes against one SQLite file: lock errors and latency.
+
+Boots --processes API servers under uvicorn, all on the same SQLite database
+(seeded with --rows quizzes), against a fake Wikipedia and a fake LLM. For
+--duration seconds it then runs, spread over the servers:
+
+- --writers write loops: POST /generate_quiz for new articles (generation
+  lease, quiz and questions) alternating with POST /jobs (a queued job the
+  servers' job workers claim, generate and finish)
+- --readers read loops: GET /quiz/{id}, GET /history and GET /jobs/{id}
+
+The response cache is off so every read reaches the database. A lock error
+is a "database is locked" (or "busy") in a failed response or in a server's
+log. The script exits non-zero if there was any, or any other failed request.
+
+    python benchmarks/bench_sqlite_stress.py
+    python benchmarks/bench_sqlite_stress.py --processes 4 --writers 32 --readers 32 --duration 30
+    python benchmarks/bench_sqlite_stress.py --backend-dir /tmp/before/backend
+    SQLITE_HIGH_CONCURRENCY=0 python benchmarks/bench_sqlite_stress.py
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, percentile, seed_quizzes, start_api
+
+LOCKED = re.compile(rb"database is locked|database table is locked|SQLITE_BUSY", re.IGNORECASE)
+
+
+class Tally:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.locked = 0
+        self.samples = []
+
+    def record(self, elapsed, response):
+        self.latencies.append(elapsed)
+        if response.status_code >= 400:
+            self.errors += 1
+            if LOCKED.search(response.content):
+                self.locked += 1
+            if len(self.samples) < 3:
+                self.samples.append(f"{response.status_code} {response.text[:160]}")
+
+
+async def run_load(api_urls, wiki_url, ids, args):
+    writes, reads = Tally(), Tally()
+    job_ids = []
+    article = itertools.count()
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.writers + args.readers)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def call(tally, method, url, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                response = httpx.Response(599, content=str(e).encode())
+            tally.record(time.perf_counter() - start, response)
+            return response
+
+        async def writer(n):
+            api = api_urls[n % len(api_urls)]
+            while time.perf_counter() < deadline:
+                i = next(article)
+                body = {"url": f"{wiki_url}/wiki/Stress_{i}"}
+                if i % 2:
+                    response = await call(writes, "POST", f"{api}/jobs", json=body)
+                    if response.status_code == 202:
+                        job_ids.append(response.json()["id"])
+                else:
+                    await call(writes, "POST", f"{api}/generate_quiz", json=body)
+
+        async def reader(n):
+            api = api_urls[n % len(api_urls)]
+            rng = random.Random(n)
+            while time.perf_counter() < deadline:
+                kind = rng.random()
+                if kind < 0.6:
+                    await call(reads, "GET", f"{api}/quiz/{rng.choice(ids)}")
+                elif kind < 0.9 or not job_ids:
+                    await call(reads, "GET", f"{api}/history", params={"limit": 50})
+                else:
+                    await call(reads, "GET", f"{api}/jobs/{rng.choice(job_ids)}")
+
+        await asyncio.gather(*(writer(n) for n in range(args.writers)), *(reader(n) for n in range(args.readers)))
+    return writes, reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2, help="API servers sharing the database file")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--rows", type=int, default=5000, help="quizzes seeded before the run")
+    parser.add_argument("--llm-latency", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8820)
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=0.005)
+    llm = start_fake_llm(latency=args.llm_latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/stress.db",
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "WARNING",
+            "PAGE_CACHE_DIR": "",
+            "QUIZ_CACHE_MAX_BYTES": "0",
+            "QUIZ_CHUNK_TOKENS": "0",
+            "LLM_RPM": "0",
+            "LLM_TPM": "0",
+            "JOB_POLL_INTERVAL": "0.2",
+        })
+        logs = []
+        procs = []
+        try:
+            for i in range(args.processes):
+                log = open(Path(tmp) / f"api-{i}.log", "w+b")
+                logs.append(log)
+                procs.append(start_api(args.backend_dir, args.port + i, env, migrate=i == 0, stderr=log))
+                if i == 0:
+                    ids = seed_quizzes(env["DATABASE_URL"], args.rows)
+            api_urls = [f"http://127.0.0.1:{args.port + i}" for i in range(args.processes)]
+            writes, reads = asyncio.run(run_load(api_urls, wiki.base_url, ids, args))
+        finally:
+            for proc in procs:
+                proc.terminate()
+                proc.wait()
+        logged = 0
+        for log in logs:
+            log.seek(0)
+            logged += len(LOCKED.findall(log.read()))
+            log.close()
+
+    print(f"backend: {args.backend_dir}")
+    print(f"{args.processes} processes, {args.writers} writers, {args.readers} readers, {args.duration:.0f}s")
+    print(f"{'':<8}{'requests':>10}{'rps':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'locked':>8}")
+    for name, t in (("writes", writes), ("reads", reads)):
+        print(
+            f"{name:<8}{len(t.latencies):>10}{len(t.latencies) / args.duration:>8.1f}"
+            f"{percentile(t.latencies, 50) * 1000:>9.1f}{percentile(t.latencies, 99) * 1000:>9.1f}"
+            f"{t.errors:>8}{t.locked:>8}"
+        )
+        for sample in t.samples:
+            print(f"    {sample}")
+    print(f"lock errors in server logs: {logged}")
+
+    if writes.locked or reads.locked or logged or writes.errors or reads.errors:
+        sys.exit("FAILED: requests failed or the database was locked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Cold start: import time of the API and time to its first served requests.
+
+For each of --runs fresh processes it measures:
+
+- import: `import main` in a new interpreter
+- live: uvicorn launched -> first answer from GET /healthz (GET / on trees without it)
+- ready: launched -> GET /readyz returns 200 (trees without it: same as live)
+- first quiz: latency of the first GET /quiz/{id} (a seeded quiz)
+- first generate: latency of the first POST /generate_quiz (fake Wikipedia and LLM)
+
+Medians are printed. --importtime lists the slowest imports (python -X
+importtime), and --max-import-ms / --max-ready-ms make the script exit non-zero
+when the median goes over, so CI can catch regressions.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --backend-dir /tmp/before/backend
+    python benchmarks/bench_startup.py --runs 3 --max-import-ms 1200 --max-ready-ms 3000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, seed_quizzes
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def import_seconds(backend_dir, env):
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=backend_dir, env=env, check=True, capture_output=True, text=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(backend_dir, env, n=12):
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=backend_dir, env=env, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            name = parts[2].rstrip()
+            # Top-level and first-level imports only; deeper ones are counted in these
+            if len(name) - len(name.lstrip()) <= 3:
+                rows.append((int(parts[1]), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def wait_for(client, url, deadline, ok=(200,)):
+    while time.perf_counter() < deadline:
+        try:
+            response = client.get(url)
+            if response.status_code in ok:
+                return response.status_code
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} not answering")
+
+
+def one_start(backend_dir, env, port, quiz_id, wiki_url):
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir, env=env,
+    )
+    try:
+        with httpx.Client(timeout=30) as client:
+            deadline = start + 60
+            status = wait_for(client, f"{base}/healthz", deadline, ok=(200, 404))
+            if status == 404:
+                wait_for(client, f"{base}/", deadline)
+            live = time.perf_counter() - start
+            if client.get(f"{base}/readyz").status_code != 404:
+                wait_for(client, f"{base}/readyz", deadline)
+            ready = time.perf_counter() - start
+
+            t = time.perf_counter()
+            assert client.get(f"{base}/quiz/{quiz_id}").status_code == 200
+            first_quiz = time.perf_counter() - t
+            t = time.perf_counter()
+            response = client.post(f"{base}/generate_quiz", json={"url": f"{wiki_url}/wiki/Startup_{port}_{start}"})
+            assert response.status_code == 200 and response.json()["id"] != 0, response.text[:200]
+            first_generate = time.perf_counter() - t
+    finally:
+        proc.terminate()
+        proc.wait()
+    return live, ready, first_quiz, first_generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--backend-dir", default=str(ROOT / "backend"))
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports")
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-ready-ms", type=float)
+    args = parser.parse_args()
+    backend_dir = Path(args.backend_dir)
+
+    wiki = start_fake_wikipedia(latency=0.01)
+    llm = start_fake_llm(latency=0.05)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "ERROR",
+            "PAGE_CACHE_DIR": "",
+        })
+        # The schema exists before any timing, as after a deploy's migrate step
+        if (backend_dir / "migrate.py").exists():
+            subprocess.run([sys.executable, "migrate.py"], cwd=backend_dir, env=env, check=True, stdout=subprocess.DEVNULL)
+        else:
+            import_seconds(backend_dir, env)
+        quiz_id = seed_quizzes(env["DATABASE_URL"], 100)[0]
+
+        imports = [import_seconds(backend_dir, env) for _ in range(args.runs)]
+        starts = [one_start(backend_dir, env, args.port + i, quiz_id, wiki.base_url) for i in range(args.runs)]
+        if args.importtime:
+            print("slowest imports (cumulative ms):")
+            for us, name in slowest_imports(backend_dir, env):
+                print(f"  {us / 1000:>8.1f}  {name}")
+
+    def ms(values):
+        return statistics.median(values) * 1000
+
+    results = {
+        "import": ms(imports),
+        "live": ms([s[0] for s in starts]),
+        "ready": ms([s[1] for s in starts]),
+        "first quiz": ms([s[2] for s in starts]),
+        "first generate": ms([s[3] for s in starts]),
+    }
+    print(f"backend: {backend_dir}  (median of {args.runs})")
+    for name, value in results.items():
+        print(f"  {name:<15}{value:>9.1f} ms")
+
+    failed = []
+    if args.max_import_ms is not None and results["import"] > args.max_import_ms:
+        failed.append(f"import {results['import']:.0f} ms > {args.max_import_ms:.0f} ms")
+    if args.max_ready_ms is not None and results["ready"] > args.max_ready_ms:
+        failed.append(f"ready {results['ready']:.0f} ms > {args.max_ready_ms:.0f} ms")
+    if failed:
+        sys.exit("regression: " + "; ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Time to first question: POST /generate_quiz vs GET /generate_quiz/stream (SSE).
+
+Boots the API under uvicorn against a fake Wikipedia and a fake LLM that
+streams its reply token by token (defaults roughly match llama-3.3-70b on Groq),
+then generates --articles fresh articles each way, one at a time. For the
+blocking endpoint the first question arrives with the whole response; for the
+SSE endpoint each event is timed as it arrives.
+
+    python benchmarks/bench_stream.py --articles 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm, start_fake_wikipedia
+from harness import ROOT, percentile, start_api
+
+
+def sse_timings(client, url):
+    timings = {}
+    start = time.perf_counter()
+    with client.stream("GET", "/generate_quiz/stream", params={"url": url}) as response:
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                timings.setdefault(event, time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--decode-tps", type=float, default=275)
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    wiki = start_fake_wikipedia(latency=0.05)
+    llm = start_fake_llm(latency=args.latency, prefill_tps=5000, decode_tps=args.decode_tps)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": llm.base_url,
+            "LOG_LEVEL": "WARNING",
+            "PAGE_CACHE_DIR": "",
+        })
+        proc = start_api(ROOT / "backend", args.port, env)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=120) as client:
+                blocking = []
+                for i in range(args.articles):
+                    start = time.perf_counter()
+                    client.post("/generate_quiz", json={"url": f"{wiki.base_url}/wiki/Blocking_{i}"}).raise_for_status()
+                    blocking.append(time.perf_counter() - start)
+                streamed = [sse_timings(client, f"{wiki.base_url}/wiki/Streamed_{i}") for i in range(args.articles)]
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    def row(name, values):
+        values = [v for v in values if v is not None]
+        print(f"{name:<34}{percentile(values, 50) * 1000:>9.0f}{percentile(values, 95) * 1000:>9.0f}")
+
+    print(f"{'':<34}{'p50 ms':>9}{'p95 ms':>9}")
+    row("POST: first question (= all)", blocking)
+    for event in ("article", "summary", "question", "done"):
+        row(f"SSE: first '{event}' event", [t.get(event) for t in streamed])
+    missing = sum("question" not in t or "done" not in t for t in streamed)
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
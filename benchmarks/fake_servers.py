@@ -0,0 +1,249 @@
+"""Local stand-ins for Wikipedia and the Groq API used by the benchmarks.
+
+Both servers are plain stdlib HTTP servers running in background threads, so the
+benchmarks need no network access and no API key. Each server records how many
+requests it is serving at once, which is what the capacity benchmarks measure.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.total = 0
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.total += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 would itself cap concurrency
+    request_queue_size = 1024
+
+
+def fake_article_html(title, paragraphs=40, sections=8):
+    body = []
+    for s in range(sections):
+        body.append(f'<h2><span class="mw-headline" id="S{s}">Section {s}</span></h2>')
+        for p in range(paragraphs // sections):
+            body.append(
+                f"<p>{title} paragraph {s}.{p}. The subject was studied extensively "
+                f"by researchers in the year {1900 + s * 10 + p}, producing notable results.[{p + 1}]</p>"
+            )
+    return (
+        "<html><head><title>{t}</title></head><body>"
+        '<h1 id="firstHeading">{t}</h1>'
+        '<div id="bodyContent"><div id="mw-content-text">{b}</div></div>'
+        "</body></html>"
+    ).format(t=title, b="".join(body)).encode("utf-8")
+
+
+def fake_quiz_json(n_questions=5, topic=""):
+    return json.dumps({
+        "summary": "A benchmark article summary.",
+        "key_entities": {"people": ["Ada"], "organizations": ["Org"], "locations": ["Place"]},
+        "quiz": [
+            {
+                "question": f"Benchmark question {i}{topic}?",
+                "options": ["A", "B", "C", "D"],
+                "answer": "A",
+                "difficulty": ["easy", "medium", "hard"][i % 3],
+                "explanation": "Because the article says so.",
+            }
+            for i in range(n_questions)
+        ],
+        "related_topics": ["Benchmarking"],
+    })
+
+
+def start_fake_wikipedia(latency=0.05, host="127.0.0.1", port=0, page=fake_article_html):
+    """Serves a synthetic article for any /wiki/<Title> path.
+
+    `page(title)` builds the HTML; pass e.g. wiki_pages.wikipedia_like_html for
+    full-size, parse-heavy articles.
+    """
+    counter = _Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            counter.enter()
+            try:
+                time.sleep(latency)
+                title = self.path.rsplit("/", 1)[-1].replace("_", " ") or "Main Page"
+                body = page(title)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                counter.leave()
+
+        def log_message(self, *args):
+            pass
+
+    server = _Server((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.counter = counter
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    return server
+
+
+class _RateLimit:
+    """Server-side requests/tokens-per-minute buckets holding `burst_seconds` worth of each."""
+
+    def __init__(self, rpm, tpm, burst_seconds):
+        self._lock = threading.Lock()
+        self.limits = [(rpm / 60, rpm / 60 * burst_seconds) if rpm else None,
+                       (tpm / 60, tpm / 60 * burst_seconds) if tpm else None]
+        self.levels = [limit[1] if limit else 0 for limit in self.limits]
+        self.stamp = time.monotonic()
+        self.rejected = 0
+
+    def admit(self, tokens):
+        """Charges one request of `tokens`; returns 0, or the seconds to wait (a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            costs = [1, tokens]
+            wait = 0.0
+            for i, limit in enumerate(self.limits):
+                if limit:
+                    rate, capacity = limit
+                    self.levels[i] = min(capacity, self.levels[i] + (now - self.stamp) * rate)
+                    wait = max(wait, (min(costs[i], capacity) - self.levels[i]) / rate)
+            self.stamp = now
+            if wait > 0:
+                self.rejected += 1
+                return wait
+            for i, limit in enumerate(self.limits):
+                if limit:
+                    self.levels[i] -= costs[i]
+            return 0.0
+
+
+def start_fake_llm(latency=1.0, host="127.0.0.1", port=0, prefill_tps=None, decode_tps=None, error_rate=0.0,
+                   rpm=None, tpm=None, burst_seconds=60):
+    """OpenAI-compatible chat completions endpoint, mounted where the Groq SDK expects it.
+
+    With `prefill_tps`/`decode_tps` set, each call also takes prompt tokens /
+    prefill_tps + output tokens / decode_tps seconds (4 chars per token), like a
+    real model. The reply has as many questions as the prompt's "A list of N to M
+    question objects" asks for (M), about the prompt's first section heading.
+    Requests with "stream": true get the reply as OpenAI-style SSE chunks spread
+    over the decode time. Prompt sizes in characters are recorded in
+    `server.prompt_chars`. A share `error_rate` of calls fails with 503 after
+    the fixed latency. With `rpm`/`tpm` it enforces rate limits like Groq's,
+    answering 429 with a Retry-After header; rejections are counted in
+    `server.rate_limit.rejected`.
+    """
+    counter = _Counter()
+    prompt_chars = []
+    rate_limit = _RateLimit(rpm, tpm, burst_seconds)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            counter.enter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+                prompt_chars.append(len(prompt))
+                wait = rate_limit.admit(len(prompt) // 4 + request.get("max_tokens", 0))
+                if wait:
+                    body = json.dumps({"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}).encode()
+                    self.send_response(429)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Retry-After", f"{wait:.2f}")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if error_rate and random.random() < error_rate:
+                    time.sleep(latency)
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                asked = re.search(r"(\d+) to (\d+) question objects", prompt)
+                heading = re.search(r"^== (.+) ==$", prompt, re.M)
+                content = fake_quiz_json(
+                    int(asked.group(2)) if asked else 5,
+                    f" about {heading.group(1)}" if heading else "",
+                )
+                first_token = latency + (len(prompt) / 4 / prefill_tps if prefill_tps else 0)
+                decode = len(content) / 4 / decode_tps if decode_tps else 0
+                if request.get("stream"):
+                    self._stream(content, first_token, decode)
+                    return
+                time.sleep(first_token + decode)
+
+                body = json.dumps({
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "fake",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(prompt) // 4,
+                        "completion_tokens": len(content) // 4,
+                        "total_tokens": len(prompt) // 4 + len(content) // 4,
+                    },
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                counter.leave()
+
+        def _stream(self, content, first_token, decode, piece=16):
+            # OpenAI-style SSE chunks, paced so the whole reply takes `decode` seconds
+            time.sleep(first_token)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            pieces = [content[i:i + piece] for i in range(0, len(content), piece)]
+            for text in pieces:
+                chunk = {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": "fake",
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                }
+                self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+                time.sleep(decode / len(pieces))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, *args):
+            pass
+
+    server = _Server((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.counter = counter
+    server.prompt_chars = prompt_chars
+    server.rate_limit = rate_limit
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    return server
@@ -0,0 +1,43 @@
+"""Saves real Wikipedia articles into benchmarks/corpus/ for bench_parse.py.
+
+Pages are stored gzipped as <Title>.html.gz. Pass titles to fetch, or none for
+a default mix of short, long and heavily templated articles.
+
+    python benchmarks/fetch_corpus.py
+    python benchmarks/fetch_corpus.py Python_(programming_language) Kyoto
+"""
+import gzip
+import sys
+from pathlib import Path
+
+import httpx
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+DEFAULT_TITLES = [
+    "Albert_Einstein",
+    "United_States",
+    "Python_(programming_language)",
+    "Photosynthesis",
+    "World_War_II",
+    "Ada_Lovelace",
+    "Tokyo",
+    "Pi",
+]
+
+
+def main():
+    CORPUS_DIR.mkdir(exist_ok=True)
+    titles = sys.argv[1:] or DEFAULT_TITLES
+    headers = {"User-Agent": "DeepKlarityQuiz-benchmarks/1.0"}
+    with httpx.Client(headers=headers, follow_redirects=True, timeout=30) as client:
+        for title in titles:
+            response = client.get(f"https://en.wikipedia.org/wiki/{title}")
+            response.raise_for_status()
+            path = CORPUS_DIR / f"{title.replace('/', '_')}.html.gz"
+            path.write_bytes(gzip.compress(response.content))
+            print(f"{path.name}: {len(response.content) // 1024} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Shared helpers for the benchmark scripts."""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from sqlalchemy import MetaData, create_engine, insert
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def start_api(backend_dir, port, env, migrate=True, stderr=None):
+    backend_dir = Path(backend_dir)
+    if migrate and (backend_dir / "migrate.py").exists():
+        subprocess.run([sys.executable, "migrate.py"], cwd=backend_dir, env=env, check=True, stdout=subprocess.DEVNULL)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=env,
+        stderr=stderr,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("API did not start")
+
+
+def seed_quizzes(database_url, n, questions_per_quiz=8, batch=5000, text=None, entities=None):
+    """Bulk-inserts n synthetic quizzes into an already created schema.
+
+    Columns are reflected from the live database so the same seeding works
+    against older checkouts that lack newer columns. `text(quiz_id)` may return
+    (title, summary, question texts) to use instead of the fixed filler, and
+    `entities(quiz_id)` (key entities, related topics).
+    """
+    engine = create_engine(database_url)
+    meta = MetaData()
+    meta.reflect(bind=engine)
+    records = meta.tables["quiz_records"]
+    questions = meta.tables["questions"]
+    start = datetime(2024, 1, 1)
+
+    with engine.begin() as conn:
+        first_id = 1 + (conn.execute(records.select().with_only_columns(records.c.id).order_by(records.c.id.desc()).limit(1)).scalar() or 0)
+        for offset in range(0, n, batch):
+            rows, qrows = [], []
+            for i in range(offset, min(n, offset + batch)):
+                quiz_id = first_id + i
+                url = f"https://en.wikipedia.org/wiki/Seed_{quiz_id}"
+                title, summary = f"Seed article {quiz_id}", "Seeded summary sentence. " * 20
+                question_texts = [f"Seeded question {q} for article {quiz_id}?" for q in range(questions_per_quiz)]
+                if text is not None:
+                    title, summary, question_texts = text(quiz_id)
+                key_entities = {"people": ["Ada Lovelace"], "organizations": ["Org"], "locations": ["London"]}
+                related_topics = ["Topic A", "Topic B"]
+                if entities is not None:
+                    key_entities, related_topics = entities(quiz_id)
+                row = {
+                    "id": quiz_id,
+                    "url": url,
+                    "title": title,
+                    "summary": summary,
+                    "key_entities": key_entities,
+                    "sections": [f"Section {s}" for s in range(8)],
+                    "related_topics": related_topics,
+                    "created_at": start + timedelta(seconds=quiz_id),
+                }
+                if "canonical_url" in records.c:
+                    row["canonical_url"] = url
+                quiz = []
+                for q, question_text in enumerate(question_texts):
+                    quiz.append({
+                        "quiz_id": quiz_id,
+                        "question_text": question_text,
+                        "options": ["Alpha", "Beta", "Gamma", "Delta"],
+                        "answer": "Alpha",
+                        "difficulty": ["easy", "medium", "hard"][q % 3],
+                        "explanation": "Seeded explanation.",
+                    })
+                if "response_json" in records.c:
+                    # What the API stores at generation time, so reads don't have to backfill it
+                    row["response_json"] = json.dumps({
+                        **{k: row[k] for k in ("id", "url", "title", "summary", "key_entities", "sections", "related_topics")},
+                        "quiz": [
+                            {"question": q["question_text"], **{k: q[k] for k in ("options", "answer", "difficulty", "explanation")}}
+                            for q in quiz
+                        ],
+                        "created_at": row["created_at"].isoformat(),
+                    }).encode()
+                rows.append(row)
+                qrows.extend(quiz)
+            conn.execute(insert(records), rows)
+            conn.execute(insert(questions), qrows)
+    engine.dispose()
+    return list(range(first_id, first_id + n))
+
+
+async def hammer(make_request, concurrency, duration):
+    """Runs `concurrency` request loops for `duration` seconds; returns latencies in seconds."""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def loop():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await make_request(client)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies, errors, duration):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def load_app(backend_dir, env):
+    """Imports backend/main.py in this process (after running its migrations) and returns the app."""
+    backend_dir = Path(backend_dir)
+    os.environ.update(env)
+    if (backend_dir / "migrate.py").exists():
+        subprocess.run([sys.executable, "migrate.py"], cwd=backend_dir, check=True, stdout=subprocess.DEVNULL)
+    sys.path.insert(0, str(backend_dir))
+    import main
+    return main.app
+
+
+async def asgi_request(app, method, path, body=b""):
+    """Calls the ASGI app directly, without sockets or an HTTP client, and returns (status, body)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "server": ("bench", 80), "client": ("bench", 1),
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+    }
+    if "?" in path:
+        scope["path"], query = path.split("?", 1)
+        scope["raw_path"] = scope["path"].encode()
+        scope["query_string"] = query.encode()
+    sent = False
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
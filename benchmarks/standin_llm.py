@@ -0,0 +1,48 @@
+"""Runs the fake LLM as a standalone OpenAI-compatible server for local load tests and CI.
+
+Point the API at it with either backend:
+
+    python benchmarks/standin_llm.py --port 9000 --latency 0.3 --decode-tps 275 --error-rate 0.05
+    LLM_BACKEND=openai LLM_BASE_URL=http://127.0.0.1:9000/v1 uvicorn main:app
+    GROQ_API_KEY=gsk_local GROQ_BASE_URL=http://127.0.0.1:9000 uvicorn main:app
+
+It answers /chat/completions in both plain and streaming (SSE) form; see
+fake_servers.start_fake_llm for how latency, errors and rate limits behave.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_servers import start_fake_llm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--prefill-tps", type=float, default=None)
+    parser.add_argument("--decode-tps", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 503")
+    parser.add_argument("--rpm", type=float, default=None)
+    parser.add_argument("--tpm", type=float, default=None)
+    args = parser.parse_args()
+
+    server = start_fake_llm(
+        latency=args.latency, host=args.host, port=args.port, prefill_tps=args.prefill_tps,
+        decode_tps=args.decode_tps, error_rate=args.error_rate, rpm=args.rpm, tpm=args.tpm,
+    )
+    print(f"stand-in LLM on {server.base_url}/v1 (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"calls {server.counter.total}, in flight {server.counter.in_flight}, "
+                  f"429s {server.rate_limit.rejected}", flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
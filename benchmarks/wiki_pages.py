@@ -0,0 +1,144 @@
+"""Synthetic pages with the markup of real Wikipedia articles.
+
+Mirrors what the MediaWiki Vector skin serves: a head full of links and
+scripts, sidebars, an infobox, TemplateStyles <style> tags inside the content,
+reference superscripts, a pronunciation guide and coordinates in the lead,
+message boxes, both the legacy `<span class="mw-headline">` and the newer
+`<div class="mw-heading">` heading markup, navboxes, a reference list and
+HTML comments. Used when no saved pages are available in benchmarks/corpus/.
+"""
+import random
+
+_WORDS = (
+    "the of and in to was a is for on as by with he that at from his it an were are which "
+    "this also be has or had first one their its new after but who not they have her she two "
+    "been other when there all during into school time may years more most only over city "
+    "some world would where later up such used many can state about national out known "
+    "university united then made café naïve Zürich 東京 Ελλάδα"
+).split()
+
+
+def _sentence(rng, words=18):
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[:1].upper() + text[1:] + "."
+
+
+def _paragraph(rng, ref):
+    parts = []
+    for i in range(rng.randint(3, 6)):
+        s = _sentence(rng, rng.randint(10, 25))
+        if i == 0:
+            s = f"<b>{s[:12]}</b>{s[12:]}"
+        s = s.replace(" city ", ' <a href="/wiki/City" title="City">city</a> ', 1)
+        parts.append(s)
+        if rng.random() < 0.5:
+            ref[0] += 1
+            parts.append(
+                f'<sup id="cite_ref-{ref[0]}" class="reference"><a href="#cite_note-{ref[0]}">&#91;{ref[0]}&#93;</a></sup>'
+            )
+    if rng.random() < 0.2:
+        parts.append(
+            '<style data-mw-deduplicate="TemplateStyles:r1">.mw-parser-output .IPA{font-family:sans-serif}</style>'
+            '<span class="IPA">/ˈæl.bərt/</span>'
+        )
+    if rng.random() < 0.1:
+        parts.append("<!-- editor note -->&nbsp;&ndash; a &amp; b")
+    return "<p>" + " ".join(parts) + "\n</p>"
+
+
+def wikipedia_like_html(title="Synthetic Article", sections=12, paragraphs_per_section=6, seed=0, revision=None):
+    rng = random.Random(seed)
+    ref = [0]
+    slug = title.replace(" ", "_")
+    config = f'"wgPageName":"{slug}"' + (f',"wgRevisionId":{revision}' if revision is not None else "")
+    head = (
+        '<!DOCTYPE html><html class="client-nojs" lang="en" dir="ltr"><head><meta charset="UTF-8">'
+        f"<title>{title} - Wikipedia</title>"
+        + "".join(f"<script>RLCONF_{i}={{{config}}};</script>" for i in range(5))
+        + '<link rel="stylesheet" href="/w/load.php?modules=site.styles">'
+        f'<link rel="canonical" href="https://en.wikipedia.org/wiki/{slug}">'
+        '<link rel="alternate" hreflang="de" href="https://de.wikipedia.org/wiki/X">'
+        "</head>"
+    )
+    sidebar = (
+        '<div id="mw-panel"><nav><ul>'
+        + "".join(f'<li><a href="/wiki/Portal_{i}">Portal {i}</a></li>' for i in range(40))
+        + "</ul></nav></div>"
+    )
+    infobox = (
+        '<table class="infobox vcard"><tbody>'
+        + "".join(f"<tr><th>Field {i}</th><td>{_sentence(rng, 4)}</td></tr>" for i in range(15))
+        + "</tbody></table>"
+    )
+    notice = (
+        '<table class="box-More_citations_needed ambox"><tbody><tr><td class="mbox-text"><div class="mbox-text-span">'
+        '<p>This section needs additional citations for verification. Please help improve this article by adding '
+        'citations to reliable sources.</p></div></td></tr></tbody></table>'
+    )
+    body = [
+        '<div class="shortdescription nomobile noexcerpt">Synthetic test article</div>',
+        '<div role="note" class="hatnote navigation-not-searchable">For other uses, see '
+        f'<a href="/wiki/{slug}_(disambiguation)">{title} (disambiguation)</a>.</div>',
+        '<p class="mw-empty-elt">\n</p>',
+        infobox,
+        # Lead sentence with a pronunciation guide, and the coordinates line
+        f'<p><b>{title}</b> (<span class="rt-commentedText nowrap"><span class="IPA nopopups noexcerpt" lang="en-fonipa">'
+        '<a href="/wiki/Help:IPA/English">/ˈsɪn.θɛ.tɪk/</a></span></span> <i>SIN-thet-ik</i>; '
+        '<span class="ext-phonos"><a href="/wiki/File:En-synthetic.ogg">ⓘ</a></span>; '
+        'founded 1901) is ' + _sentence(rng, 20)[0].lower() + _sentence(rng, 20)[1:]
+        + '<sup class="reference"><a href="#cite_note-a">&#91;a&#93;</a></sup></p>',
+        '<p><span id="coordinates">Coordinates: <span class="geo-dms">35°41′23″N 139°41′32″E</span>'
+        '\ufeff / \ufeff<span class="geo-dec">35.68972°N 139.69222°E</span>\ufeff; 35.68972; 139.69222</span></p>',
+    ]
+    body += [_paragraph(rng, ref) for _ in range(3)]
+    body.append('<meta property="mw:PageProp/toc" />')
+    for s in range(sections):
+        name = f"Section {s} {_WORDS[s % len(_WORDS)]}"
+        if s % 2:
+            body.append(
+                f'<h2><span class="mw-headline" id="S{s}">{name}</span>'
+                '<span class="mw-editsection"><span class="mw-editsection-bracket">[</span>'
+                f'<a href="/w/index.php?title={slug}&amp;action=edit&amp;section={s}">edit</a>'
+                '<span class="mw-editsection-bracket">]</span></span></h2>'
+            )
+        else:
+            body.append(
+                f'<div class="mw-heading mw-heading2"><h2 id="S{s}">{name}</h2>'
+                f'<span class="mw-editsection"><a href="/w/index.php?action=edit&amp;section={s}">edit</a></span></div>'
+            )
+        if s % 5 == 4:
+            body.append(notice)
+        for p in range(paragraphs_per_section):
+            if p == 2:
+                body.append(f'<h3><span class="mw-headline" id="S{s}_{p}">Sub {s}.{p}</span></h3>')
+            body.append(_paragraph(rng, ref))
+        body.append("<ul>" + "".join(f"<li>{_sentence(rng, 8)}</li>" for _ in range(4)) + "</ul>")
+        if s % 4 == 3:
+            body.append(f"<blockquote><p>{_sentence(rng, 20)}</p></blockquote>")
+    body.append(
+        '<div class="reflist"><ol class="references">'
+        + "".join(
+            f'<li id="cite_note-{i}"><span class="reference-text">{_sentence(rng, 12)}</span></li>'
+            for i in range(1, ref[0] + 1)
+        )
+        + "</ol></div>"
+    )
+    body.append(
+        '<div role="navigation" class="navbox"><table class="nowraplinks"><tbody>'
+        + "".join(f'<tr><td><a href="/wiki/Nav_{i}">Nav {i}</a></td></tr>' for i in range(60))
+        + "</tbody></table></div>"
+    )
+    body.append("<!-- \nNewPP limit report\nCPU time usage: 1.234 seconds\n-->")
+    return (
+        head
+        + '<body class="skin-vector"><div class="mw-page-container">'
+        + sidebar
+        + '<main id="content" class="mw-body">'
+        + f'<h1 id="firstHeading" class="firstHeading mw-first-heading"><span class="mw-page-title-main">{title}</span></h1>'
+        + '<div id="bodyContent" class="vector-body"><div id="siteSub">From Wikipedia, the free encyclopedia</div>'
+        + '<div id="mw-content-text" class="mw-body-content"><div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">'
+        + "\n".join(body)
+        + "</div></div>"
+        + '<div id="catlinks" class="catlinks"><ul><li><a href="/wiki/Category:Tests">Tests</a></li></ul></div>'
+        + "</div></main></div></body></html>"
+    ).encode("utf-8")
@@ -1,4 +1,5 @@
 
+import asyncio
 import sys
 import os
 
@@ -15,7 +16,8 @@ Musk was born in Pretoria to Maye and Errol Musk. He attended the University of
 
 print("Attempting to generate quiz...")
 try:
-    result = generate_quiz_from_text(text)
+    # A coroutine since the pipeline went async
+    result = asyncio.run(generate_quiz_from_text(text))
     print("Result Keys:", result.keys())
     if "quiz" in result:
         print("First Question:", result["quiz"][0])
@@ -9,8 +9,10 @@ export const generateQuiz = async (url) => {
     return response.data;
 };
 
-export const getHistory = async () => {
-    const response = await axios.get(`${API_URL}/history`);
+// Returns one page: { items, next_cursor }. Pass next_cursor back to load older quizzes.
+export const getHistory = async (cursor = null) => {
+    const params = cursor ? { cursor } : {};
+    const response = await axios.get(`${API_URL}/history`, { params });
     return response.data;
 };
 
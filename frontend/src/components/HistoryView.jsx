@@ -6,7 +6,9 @@ import QuizResult from './QuizResult';
 
 const HistoryView = () => {
     const [history, setHistory] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [selectedQuiz, setSelectedQuiz] = useState(null);
     const [loadingDetails, setLoadingDetails] = useState(false);
 
@@ -17,7 +19,8 @@ const HistoryView = () => {
     const loadHistory = async () => {
         try {
             const data = await getHistory();
-            setHistory(data);
+            setHistory(data.items);
+            setNextCursor(data.next_cursor);
         } catch (e) {
             console.error(e);
         } finally {
@@ -25,6 +28,19 @@ const HistoryView = () => {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const data = await getHistory(nextCursor);
+            setHistory((prev) => [...prev, ...data.items]);
+            setNextCursor(data.next_cursor);
+        } catch (e) {
+            console.error(e);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleViewDetails = async (id) => {
         setLoadingDetails(true);
         try {
@@ -86,6 +102,18 @@ const HistoryView = () => {
                             )}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div style={{ display: 'flex', justifyContent: 'center', padding: '16px' }}>
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="btn"
+                                style={{ padding: '8px 16px', background: '#334155', color: '#e2e8f0', fontSize: '0.9rem' }}
+                            >
+                                {loadingMore ? <Loader2 className="animate-spin" size={16} /> : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
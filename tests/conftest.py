@@ -0,0 +1,63 @@
+"""The backend's modules are imported flat, as the API runs them (cwd backend/).
+
+The `api` fixture imports main.py once per session against a fresh SQLite
+database and the benchmarks' fake Wikipedia and LLM servers; tests use their
+own article titles so they don't see each other's quizzes. Requests go through
+`api.run`, one event loop for the session: pooled connections belong to the
+loop that opened them.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(ROOT / "benchmarks"))
+sys.path.insert(0, str(BACKEND))
+
+from fake_servers import start_fake_llm, start_fake_wikipedia  # noqa: E402
+from harness import asgi_request  # noqa: E402
+
+# A small pool, so tests can exceed it, that fails fast instead of hanging
+POOL_SIZE = 2
+
+# Set before any test module imports a backend module: they read their settings at import
+_wiki = start_fake_wikipedia(latency=0.2)
+_llm = start_fake_llm(latency=0.2)
+_tmp = tempfile.TemporaryDirectory()
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_tmp.name}/test.db",
+    "GROQ_API_KEY": "gsk_test",
+    "GROQ_BASE_URL": _llm.base_url,
+    "LOG_LEVEL": "ERROR",
+    "PAGE_CACHE_DIR": "",
+    "QUIZ_CHUNK_TOKENS": "0",
+    "STARTUP_WARMUP": "off",
+    "JOB_WORKERS": "0",
+    "DB_POOL_SIZE": str(POOL_SIZE),
+    "DB_MAX_OVERFLOW": "0",
+    "DB_POOL_TIMEOUT": "5",
+})
+
+
+@pytest.fixture(scope="session")
+def api():
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND, check=True, stdout=subprocess.DEVNULL)
+    import main
+
+    loop = asyncio.new_event_loop()
+    yield SimpleNamespace(app=main.app, main=main, wiki=_wiki, llm=_llm, run=loop.run_until_complete)
+    loop.close()
+
+
+async def post(app, path, body):
+    """(status, parsed JSON body) of a POST with a JSON body."""
+    status, response = await asgi_request(app, "POST", path, json.dumps(body).encode())
+    return status, json.loads(response) if response.startswith((b"{", b"[")) else response
@@ -0,0 +1,64 @@
+from cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = ResponseCache(max_bytes=30, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set((key,), b"x" * 10)
+    assert cache.get(("a",)) is not None  # a is now the most recently used
+    cache.set(("d",), b"x" * 10)
+    assert cache.get(("b",)) is None
+    assert [cache.get((key,)) is not None for key in ("a", "c", "d")] == [True, True, True]
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = ResponseCache(max_bytes=100, ttl=10, clock=clock)
+    cache.set(("quiz", 1), b"body")
+    clock.now = 9.9
+    assert cache.get(("quiz", 1)) == b"body"
+    clock.now = 10.0
+    assert cache.get(("quiz", 1)) is None
+    assert cache.size == 0
+
+
+def test_byte_budget_is_kept():
+    cache = ResponseCache(max_bytes=25, ttl=60)
+    for i in range(10):
+        cache.set(("quiz", i), b"x" * 10)
+        assert cache.size <= 25
+    assert cache.stats()["entries"] == 2
+    # A value over the whole budget is not cached, and evicts nothing
+    cache.set(("quiz", "big"), b"x" * 26)
+    assert cache.get(("quiz", "big")) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_replacing_a_value_counts_its_new_size():
+    cache = ResponseCache(max_bytes=100, ttl=60)
+    cache.set(("quiz", 1), b"x" * 40)
+    cache.set(("quiz", 1), b"x" * 10)
+    assert cache.size == 10
+
+
+def test_invalidate_prefix_drops_only_matching_keys():
+    cache = ResponseCache(max_bytes=1000, ttl=60)
+    cache.set(("history", None, 50), b"page 1")
+    cache.set(("history", "cursor", 50), b"page 2")
+    cache.set(("quiz", 1), b"quiz")
+    cache.set(("url", "https://en.wikipedia.org/wiki/History"), b"quiz")
+    cache.invalidate_prefix("history")
+    assert cache.get(("history", None, 50)) is None
+    assert cache.get(("history", "cursor", 50)) is None
+    assert cache.get(("quiz", 1)) == b"quiz"
+    assert cache.get(("url", "https://en.wikipedia.org/wiki/History")) == b"quiz"
+    assert cache.size == 8
@@ -0,0 +1,37 @@
+from chunking import chunk_article, estimate_tokens, spread_chunks
+
+BLOCKS = [
+    {"heading": "", "text": "Lead paragraph about the subject. It has two sentences."},
+    {"heading": "Figures", "text": "\n".join(
+        f"In {1900 + i}, {i * 1234567} units ({i}.{i}%) were counted at 12:{i:02d}." for i in range(60)
+    )},
+    {"heading": "Names", "text": "東京都は日本の首都である。" * 80},
+    {"heading": "One long paragraph", "text": " ".join(f"word{i} and more text." for i in range(800))},
+    {"heading": "Unbroken", "text": "x" * 3000},
+]
+
+
+def test_chunks_fit_the_token_budget():
+    for budget in (50, 200, 1000):
+        chunks = chunk_article(BLOCKS, budget_tokens=budget)
+        assert len(chunks) > 1
+        assert max(estimate_tokens(chunk) for chunk in chunks) <= budget
+
+
+def test_text_is_kept_in_order():
+    chunks = chunk_article(BLOCKS, budget_tokens=200)
+    words = " ".join(chunks).split()
+    assert [w for w in words if w.startswith("word")] == [f"word{i}" for i in range(800)]
+    assert "".join(w for w in words if set(w) == {"x"}) == "x" * 3000
+
+
+def test_small_sections_share_a_chunk():
+    blocks = [{"heading": f"S{i}", "text": "A short section."} for i in range(5)]
+    assert chunk_article(blocks, budget_tokens=1000) == ["\n\n".join(f"== S{i} ==\nA short section." for i in range(5))]
+
+
+def test_spread_keeps_the_ends_and_evenly_spaced_chunks():
+    chunks = [f"chunk {i}" for i in range(12)]
+    assert spread_chunks(chunks, max_chunks=4) == ["chunk 0", "chunk 4", "chunk 7", "chunk 11"]
+    assert spread_chunks(chunks, max_chunks=1) == ["chunk 0"]
+    assert spread_chunks(chunks[:3], max_chunks=4) == chunks[:3]
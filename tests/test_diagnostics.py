@@ -0,0 +1,8 @@
+from harness import asgi_request
+
+
+def test_debug_ring_is_off_by_default(api):
+    # conftest leaves DEBUG_RING_SIZE unset
+    assert not api.main.debug_ring.enabled
+    status, _ = api.run(asgi_request(api.app, "GET", "/debug/recent"))
+    assert status == 404
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from urllib.parse import quote
+
+from conftest import POOL_SIZE, post
+from harness import asgi_request
+
+
+def test_more_waiters_than_pooled_connections(api):
+    # Requests waiting on one article's generation must not hold connections the run needs
+    scrapes, llm_calls = api.wiki.counter.total, api.llm.counter.total
+    url = f"{api.wiki.base_url}/wiki/Pool_Exhaustion"
+    requests = POOL_SIZE * 4
+
+    async def main():
+        return await asyncio.gather(*(post(api.app, "/generate_quiz", {"url": url}) for _ in range(requests)))
+
+    results = api.run(main())
+    assert [status for status, _ in results] == [200] * requests
+    assert len({body["id"] for _, body in results}) == 1
+    assert api.wiki.counter.total - scrapes == 1
+    assert api.llm.counter.total - llm_calls == 1
+
+
+def test_disconnected_batch_leaves_a_shared_generation_running(api):
+    # The batch starts the generation, an interactive request joins it, then the batch client goes away
+    url = f"{api.wiki.base_url}/wiki/Batch_Disconnect"
+
+    async def main():
+        batch = asyncio.create_task(post(api.app, "/generate_quiz/batch", {"urls": [url]}))
+        await asyncio.sleep(0.05)
+        interactive = asyncio.create_task(post(api.app, "/generate_quiz", {"url": url}))
+        await asyncio.sleep(0.05)
+        batch.cancel()
+        return await interactive
+
+    status, body = api.run(main())
+    assert status == 200
+    assert body["url"] == url
+
+
+def test_unreachable_page_is_a_gateway_error(api):
+    # Nothing listens on port 9: a transient failure, not a bad request
+    status, body = api.run(post(api.app, "/generate_quiz", {"url": "http://127.0.0.1:9/wiki/Nowhere"}))
+    assert status == 502
+    assert body["detail"].startswith("Scraping error")
+
+
+def test_stream_sends_the_article_summary_and_questions_then_the_stored_quiz(api):
+    url = f"{api.wiki.base_url}/wiki/Streamed"
+    status, body = api.run(asgi_request(api.app, "GET", f"/generate_quiz/stream?url={quote(url, safe='')}"))
+    assert status == 200
+    events = []
+    for message in body.decode().strip().split("\n\n"):
+        event, data = message.split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    kinds = [kind for kind, _ in events]
+    assert kinds[:2] == ["article", "summary"] and kinds[-1] == "done"
+    questions = [data for kind, data in events if kind == "question"]
+    assert [q["index"] for q in questions] == list(range(len(questions)))
+    done = events[-1][1]
+    assert done["id"] > 0
+    assert [q["question"] for q in done["quiz"]] == [q["question"] for q in questions]
@@ -0,0 +1,125 @@
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import delete
+
+import database
+import models
+from jobs import JobWorkerPool
+
+
+def queue_job(api, title):
+    async def add():
+        async with database.AsyncSessionLocal() as db:
+            url = f"https://en.wikipedia.org/wiki/{title}"
+            job = models.Job(url=url, canonical_url=url, status="queued")
+            db.add(job)
+            await db.commit()
+            return job.id
+
+    return api.run(add())
+
+
+def job_row(api, job_id):
+    async def get():
+        async with database.AsyncSessionLocal() as db:
+            return await db.get(models.Job, job_id)
+
+    return api.run(get())
+
+
+def claim_and_run(api, pool, job_id):
+    claimed = api.run(pool._claim())
+    assert claimed[0].id == job_id
+    api.run(pool._execute(*claimed))
+    return job_row(api, job_id)
+
+
+def test_lease_is_extended_while_the_handler_runs(api):
+    job_id = queue_job(api, "Long_Generation")
+
+    async def handler(job):
+        await asyncio.sleep(1)
+        return None
+
+    pool = JobWorkerPool(handler, workers=1, lease_seconds=0.3)
+    other = JobWorkerPool(handler, workers=1, lease_seconds=0.3)
+
+    async def main():
+        claimed = await pool._claim()
+        assert claimed[0].id == job_id
+        running = asyncio.create_task(pool._execute(*claimed))
+        await asyncio.sleep(0.7)  # two leases past the claim
+        taken = await other._claim()
+        await running
+        return taken
+
+    assert api.run(main()) is None
+    assert job_row(api, job_id).status == "succeeded"
+
+
+def test_client_error_fails_the_job_at_once(api):
+    job_id = queue_job(api, "Missing_Page")
+
+    async def handler(job):
+        raise HTTPException(status_code=400, detail="Scraping error: 404 Not Found")
+
+    job = claim_and_run(api, JobWorkerPool(handler, workers=1, max_attempts=3), job_id)
+    assert (job.status, job.attempts) == ("failed", 1)
+
+
+def test_server_error_is_retried(api):
+    job_id = queue_job(api, "Overloaded")
+
+    async def handler(job):
+        raise HTTPException(status_code=503, detail="LLM is overloaded")
+
+    try:
+        job = claim_and_run(api, JobWorkerPool(handler, workers=1, max_attempts=3), job_id)
+        assert (job.status, job.attempts) == ("queued", 1)
+    finally:
+        async def remove():
+            async with database.AsyncSessionLocal() as db:
+                await db.execute(delete(models.Job).where(models.Job.id == job_id))
+                await db.commit()
+
+        api.run(remove())
+
+
+def test_worker_keeps_running_after_a_job_fails_to_finish(api):
+    first, second = queue_job(api, "Finish_Fails"), queue_job(api, "Finish_Works")
+
+    async def handler(job):
+        return None
+
+    pool = JobWorkerPool(handler, workers=1, poll_interval=0.05)
+    finish = pool._finish
+
+    async def flaky_finish(job_id, token, **values):
+        if job_id == first:
+            raise RuntimeError("database is locked")
+        await finish(job_id, token, **values)
+
+    pool._finish = flaky_finish
+
+    async def main():
+        pool.start()
+        try:
+            for _ in range(100):
+                async with database.AsyncSessionLocal() as db:
+                    if (await db.get(models.Job, second)).status == "succeeded":
+                        return True
+                await asyncio.sleep(0.05)
+            return False
+        finally:
+            await pool.stop()
+
+    try:
+        assert api.run(main())
+    finally:
+        async def remove():
+            async with database.AsyncSessionLocal() as db:
+                await db.execute(delete(models.Job).where(models.Job.id == first))
+                await db.commit()
+
+        api.run(remove())
@@ -0,0 +1,60 @@
+import json
+
+from jsonstream import JsonObjectStream
+
+QUIZ = {
+    "title": 'A "quoted" {brace} and [bracket], with a \\ backslash',
+    "summary": "Line one.\nLine two: {not: an object}",
+    "quiz": [
+        {"question": "What is {x}?", "options": ["a", "b\"c", "}", "]"], "answer": "a"},
+        {"question": "Second?", "options": [], "answer": "\\"},
+    ],
+    "scores": [1, 2.5, -3, True, None],
+    "count": 2,
+}
+
+
+def events_in_pieces(text, size):
+    stream = JsonObjectStream()
+    events = []
+    for i in range(0, len(text), size):
+        events += stream.feed(text[i:i + size])
+    return stream, events
+
+
+def test_events_do_not_depend_on_how_the_text_is_split():
+    text = "```json\n" + json.dumps(QUIZ, indent=2) + "\n```"
+    _, whole = events_in_pieces(text, len(text))
+    for size in (1, 2, 3, 7, 64):
+        stream, events = events_in_pieces(text, size)
+        assert events == whole
+        assert stream.done
+
+
+def test_fields_and_items_are_decoded():
+    _, events = events_in_pieces(json.dumps(QUIZ), 5)
+    fields = {event[1]: event[2] for event in events if event[0] == "field"}
+    assert fields == QUIZ
+    items = [event[1:] for event in events if event[0] == "item"]
+    assert items == [("quiz", 0, QUIZ["quiz"][0]), ("quiz", 1, QUIZ["quiz"][1]),
+                     *(("scores", i, v) for i, v in enumerate(QUIZ["scores"]))]
+
+
+def test_escaped_quotes_and_braces_in_strings_do_not_end_values():
+    text = r'{"summary": "He said \"}\" and left\\", "quiz": ["a\"]", "{b}"]}'
+    _, events = events_in_pieces(text, 1)
+    assert events == [
+        ("field", "summary", 'He said "}" and left\\'),
+        ("item", "quiz", 0, 'a"]'),
+        ("item", "quiz", 1, "{b}"),
+        ("field", "quiz", ['a"]', "{b}"]),
+    ]
+
+
+def test_truncated_object_keeps_the_completed_events():
+    text = json.dumps(QUIZ)
+    cut = text.index('"Second?"') + 4
+    stream, events = events_in_pieces(text[:cut], 3)
+    assert not stream.done
+    assert [e[:2] for e in events] == [("field", "title"), ("field", "summary"), ("item", "quiz")]
+    assert events[-1][3] == QUIZ["quiz"][0]
@@ -0,0 +1,164 @@
+import asyncio
+import heapq
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import llm_scheduler
+from llm_backends import LLMError
+from llm_scheduler import LLMScheduler, TokenBucket
+
+
+class FakeClock:
+    """Virtual time: sleep() parks the caller until run() has advanced `now` to its wake-up time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._sleepers = []
+        self._seq = itertools.count()
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        wake = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + seconds, next(self._seq), wake))
+        await wake
+
+    def run(self, coro):
+        async def main():
+            task = asyncio.ensure_future(coro)
+            while True:
+                # Let every task run until it finishes or sleeps, then jump to the next wake-up
+                for _ in range(50):
+                    await asyncio.sleep(0)
+                if task.done():
+                    return task.result()
+                while self._sleepers and self._sleepers[0][2].done():
+                    heapq.heappop(self._sleepers)
+                assert self._sleepers, "every task is blocked"
+                when, _, wake = heapq.heappop(self._sleepers)
+                self.now = max(self.now, when)
+                wake.set_result(None)
+
+        return asyncio.run(main())
+
+
+@pytest.fixture
+def jitter(monkeypatch):
+    # The midpoint of every jitter range, so delays are exact
+    monkeypatch.setattr(llm_scheduler, "random", SimpleNamespace(uniform=lambda a, b: (a + b) / 2))
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_BASE", 1.0)
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_MAX", 8.0)
+
+
+def calls_at(clock, results=None):
+    """A call that records the virtual time of each attempt and raises or returns the next of `results`."""
+    times = []
+    results = list(results or [])
+
+    async def call():
+        times.append(clock.now)
+        result = results.pop(0) if results else "ok"
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call, times
+
+
+def test_token_bucket_refills_at_its_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(60, burst_seconds=2, clock=clock)
+    assert bucket.capacity == 2 and bucket.wait_time(2) == 0
+    bucket.take(2)
+    assert bucket.wait_time(1) == 1.0
+    clock.now = 0.5
+    assert bucket.wait_time(1) == 0.5
+    # More than the bucket holds waits for a full bucket; debt delays the next take
+    assert bucket.wait_time(5) == 1.5
+    bucket.take(3)
+    assert bucket.wait_time(1) == 3.5
+
+
+def test_requests_per_minute_space_out_calls():
+    clock = FakeClock()
+    scheduler = LLMScheduler(rpm=60, tpm=0, burst_seconds=1, clock=clock, sleep=clock.sleep)
+    call, times = calls_at(clock)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.run(call, 10) for _ in range(4)))
+
+    assert clock.run(main()) == ["ok"] * 4
+    assert times == [0, 1, 2, 3]
+
+
+def test_tokens_per_minute_charge_estimates_and_settle_actual_usage():
+    clock = FakeClock()
+    # 10 tokens a second, at most 10 at once
+    scheduler = LLMScheduler(rpm=0, tpm=600, burst_seconds=1, clock=clock, sleep=clock.sleep)
+    # The first call used 30 tokens, not the 10 estimated: the next waits for the debt too
+    call, times = calls_at(clock, [SimpleNamespace(total_tokens=30), "ok", "ok"])
+
+    async def main():
+        for _ in range(3):
+            await scheduler.run(call, 10)
+
+    clock.run(main())
+    assert times == [0, 3, 4]
+
+
+def test_retry_after_pauses_every_call(jitter):
+    clock = FakeClock()
+    scheduler = LLMScheduler(rpm=0, tpm=0, clock=clock, sleep=clock.sleep)
+    limited, limited_times = calls_at(clock, [LLMError("Rate limit reached", status_code=429, retry_after=3,
+                                                      retryable=True)])
+    other, other_times = calls_at(clock)
+
+    async def main():
+        first = asyncio.create_task(scheduler.run(limited, 10))
+        await asyncio.sleep(0)
+        await clock.sleep(1)
+        await scheduler.run(other, 10)
+        return await first
+
+    assert clock.run(main()) == "ok"
+    # Retry-After 3 plus half of LLM_RETRY_BASE of jitter, for both calls
+    assert limited_times == [0, 3.5]
+    assert other_times == [3.5]
+    assert scheduler.counters["rate_limited"] == 1
+
+
+def test_backoff_doubles_up_to_the_cap(jitter):
+    clock = FakeClock()
+    scheduler = LLMScheduler(rpm=0, tpm=0, max_retries=6, clock=clock, sleep=clock.sleep)
+    overloaded = [LLMError("Service unavailable", status_code=503, retryable=True) for _ in range(6)]
+    call, times = calls_at(clock, overloaded)
+
+    assert clock.run(scheduler.run(call, 10)) == "ok"
+    assert [b - a for a, b in zip(times, times[1:])] == [1, 2, 4, 8, 8, 8]
+
+
+def test_retry_after_is_capped(jitter):
+    clock = FakeClock()
+    scheduler = LLMScheduler(rpm=0, tpm=0, clock=clock, sleep=clock.sleep)
+    call, times = calls_at(clock, [LLMError("Rate limit reached", status_code=429, retry_after=600, retryable=True)])
+
+    clock.run(scheduler.run(call, 10))
+    assert times == [0, 8.5]
+
+
+def test_errors_reach_the_caller_when_not_retryable_or_out_of_retries(jitter):
+    clock = FakeClock()
+    scheduler = LLMScheduler(rpm=0, tpm=0, max_retries=2, clock=clock, sleep=clock.sleep)
+    call, times = calls_at(clock, [LLMError("Bad request", status_code=400)])
+    with pytest.raises(LLMError, match="Bad request"):
+        clock.run(scheduler.run(call, 10))
+    assert times == [0]
+
+    call, times = calls_at(clock, [LLMError("Unavailable", status_code=503, retryable=True) for _ in range(3)])
+    with pytest.raises(LLMError, match="Unavailable"):
+        clock.run(scheduler.run(call, 10))
+    assert len(times) == 3
+    assert scheduler.counters["failed"] == 2
@@ -0,0 +1,38 @@
+from sqlalchemy import create_engine, event, insert, select
+
+import migrate
+import models
+
+
+def quiz(quiz_id, page, host="en.wikipedia.org", canonical_url=None):
+    return {"id": quiz_id, "url": f"https://{host}/wiki/{page}", "title": page, "canonical_url": canonical_url}
+
+
+def test_canonical_url_backfills_only_new_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migrate.db")
+    models.Base.metadata.create_all(engine)
+    quiz_records = models.QuizRecord.__table__
+    with engine.begin() as conn:
+        conn.execute(insert(quiz_records), [
+            quiz(1, "Ada_Lovelace", canonical_url="https://en.wikipedia.org/wiki/Ada_Lovelace"),
+            # Bulk-loaded without canonical_url: an article already stored, one twice, one new
+            quiz(2, "Ada_Lovelace", host="en.m.wikipedia.org"),
+            quiz(3, "Charles_Babbage"),
+            quiz(4, "Charles_Babbage#Life"),
+            quiz(5, "Alan_Turing"),
+        ])
+        migrate.add_canonical_url(conn)
+        rows = conn.execute(select(quiz_records.c.id, quiz_records.c.canonical_url).order_by(quiz_records.c.id)).all()
+    assert rows == [
+        (1, "https://en.wikipedia.org/wiki/Ada_Lovelace"),
+        (3, "https://en.wikipedia.org/wiki/Charles_Babbage"),
+        (5, "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ]
+
+    # A boot with nothing to backfill reads no quiz and writes none
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    with engine.begin() as conn:
+        migrate.add_canonical_url(conn)
+    assert not [s for s in statements if s.lstrip().startswith(("UPDATE", "DELETE"))]
+    engine.dispose()
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import page_cache as page_cache_module
+import pytest
+import scraper
+from fake_servers import _Server, fake_article_html
+from page_cache import PageCache
+
+ETAG = '"rev-1"'
+
+
+@pytest.fixture
+def wiki():
+    """A page server that answers If-None-Match with a 304 and counts the body bytes it sends."""
+    sent = {"requests": [], "body_bytes": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == ETAG:
+                sent["requests"].append(304)
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                return
+            body = fake_article_html("Cached Page")
+            sent["requests"].append(200)
+            sent["body_bytes"] += len(body)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.sent = sent
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+
+
+def test_revalidation_downloads_and_parses_nothing(api, wiki, tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "page_cache", PageCache(tmp_path))
+    parses = []
+    parse = scraper._parse_off_loop
+
+    async def counting_parse(html):
+        parses.append(len(html))
+        return await parse(html)
+
+    monkeypatch.setattr(scraper, "_parse_off_loop", counting_parse)
+    url = f"{wiki.base_url}/wiki/Cached_Page"
+
+    first = api.run(scraper.scrape_wikipedia(url))
+    assert wiki.sent["requests"] == [200]
+    body_bytes = wiki.sent["body_bytes"]
+    assert body_bytes > 0
+
+    second = api.run(scraper.scrape_wikipedia(url))
+    assert wiki.sent["requests"] == [200, 304]
+    assert wiki.sent["body_bytes"] == body_bytes
+    assert len(parses) == 1
+    assert second == first
+
+
+def test_directory_is_created_on_first_store(tmp_path):
+    cache = PageCache(tmp_path / "pages")
+    assert not (tmp_path / "pages").exists()
+    assert cache.load_meta("https://en.wikipedia.org/wiki/A") is None
+    assert not (tmp_path / "pages").exists()
+    cache.store("https://en.wikipedia.org/wiki/A", b"<html></html>", etag='"1"')
+    assert cache.load_meta("https://en.wikipedia.org/wiki/A")["etag"] == '"1"'
+
+
+def test_relative_directory_is_under_backend():
+    assert PageCache("page_cache").directory == page_cache_module._BACKEND_DIR / "page_cache"
+    assert page_cache_module._BACKEND_DIR.name == "backend"
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = PageCache(tmp_path, max_bytes=5000)
+    urls = [f"https://en.wikipedia.org/wiki/Page_{i}" for i in range(5)]
+    for i, url in enumerate(urls[:4]):
+        cache.store(url, b"x" * 1000)
+        # mtime resolution differs between filesystems: make the order explicit
+        for path in cache._paths(url):
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    cache.load_meta(urls[0])  # used again: now the most recent of the four
+    cache.store(urls[4], b"x" * 1000)  # five entries are over the limit
+
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 5000
+    assert [cache.load_body(url) is not None for url in urls] == [True, False, True, True, True]
+    assert cache.load_meta(urls[1]) is None
@@ -0,0 +1,24 @@
+from preprocess import clean_paragraph
+
+
+def test_citation_markers_are_removed():
+    assert clean_paragraph("Tokyo is the capital.[1][a] It grew[2][citation needed] fast.[note 3]") == \
+        "Tokyo is the capital. It grew fast."
+
+
+def test_brackets_that_are_text_are_kept():
+    assert clean_paragraph("The loop sums a[i] over every i.") == "The loop sums a[i] over every i."
+    assert clean_paragraph("The Latin word for it is [x] in some editions.") == \
+        "The Latin word for it is [x] in some editions."
+
+
+def test_pronunciation_is_removed():
+    assert clean_paragraph("Tokyo (/ˈtoʊkioʊ/ ⓘ; Japanese: 東京) is a city.") == "Tokyo (Japanese: 東京) is a city."
+    assert clean_paragraph("Quito (listen) is a city.") == "Quito is a city."
+    assert clean_paragraph("Leicester (pronounced LES-tər) is a city.") == "Leicester is a city."
+
+
+def test_parenthesis_mentioning_listen_is_kept():
+    text = 'He released "Joyride" (Listen to Your Heart version) in 1991.'
+    assert clean_paragraph(text) == text
+    assert clean_paragraph("The song (listen to the bridge) modulates.") == "The song (listen to the bridge) modulates."
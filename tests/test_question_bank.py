@@ -0,0 +1,61 @@
+import random
+
+import database
+import models
+import question_bank
+
+SIZE = 20
+
+
+def stored_questions(api, difficulty):
+    # Its own difficulty keeps other tests' questions out of the samples
+    async def add():
+        async with database.AsyncSessionLocal() as db:
+            quiz = models.QuizRecord(url="https://en.wikipedia.org/wiki/Question_Bank", title="Question Bank")
+            db.add(quiz)
+            await db.flush()
+            questions = [
+                models.Question(quiz_id=quiz.id, question_text=f"Question {i}?", options=["A", "B"], answer="A",
+                                difficulty=difficulty, explanation="", sample_key=i * models.SAMPLE_KEY_SPACE // SIZE)
+                for i in range(SIZE)
+            ]
+            db.add_all(questions)
+            await db.commit()
+            # In sample_key order
+            return [q.id for q in questions]
+
+    return api.run(add())
+
+
+def sample(api, difficulty, n, exclude=(), rng=None):
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            rows = await question_bank.sample_questions(db, n, difficulty, exclude=exclude, rng=rng or random)
+            return [row.id for row in rows]
+
+    return api.run(run())
+
+
+def test_samples_are_spread_not_runs_of_neighbours(api):
+    ids = stored_questions(api, "spread")
+    position = {question_id: i for i, question_id in enumerate(ids)}
+    rng = random.Random(7)
+    seen, runs = set(), 0
+    for _ in range(100):
+        picked = sample(api, "spread", 5, rng=rng)
+        assert len(picked) == len(set(picked)) == 5
+        seen.update(picked)
+        # Five neighbours in sample_key order, wrapping around: what a single seek returns
+        first = min(picked, key=lambda q: (position[q] - position[picked[0]]) % SIZE)
+        if {(position[q] - position[first]) % SIZE for q in picked} == set(range(5)):
+            runs += 1
+    assert seen == set(ids)
+    assert runs < 10
+
+
+def test_excluded_questions_are_never_sampled(api):
+    ids = stored_questions(api, "exclude")
+    exclude = set(ids[:SIZE - 3])
+    for seed in range(20):
+        picked = sample(api, "exclude", 5, exclude=exclude, rng=random.Random(seed))
+        assert sorted(picked) == sorted(ids[SIZE - 3:])
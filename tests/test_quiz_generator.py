@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+import database
+import models
+import quiz_generator
+from conftest import post
+from llm_backends import LLMError
+from llm_scheduler import llm_scheduler
+
+
+def stored_quizzes(api, url):
+    async def count():
+        async with database.AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(models.QuizRecord).where(models.QuizRecord.url == url))
+
+    return api.run(count())
+
+
+def test_rate_limited_llm_is_unavailable_not_a_mock_quiz(api, monkeypatch):
+    # The fake LLM allows one request a minute and has none left: every call gets a 429 with Retry-After
+    monkeypatch.setattr(llm_scheduler, "max_retries", 0)
+    rate_limit = api.llm.rate_limit
+    saved = rate_limit.limits[:], rate_limit.levels[:]
+    rate_limit.limits[0], rate_limit.levels[0] = (1 / 60, 1), 0
+    url = f"{api.wiki.base_url}/wiki/Rate_Limited"
+    try:
+        status, body = api.run(post(api.app, "/generate_quiz", {"url": url}))
+    finally:
+        rate_limit.limits[:], rate_limit.levels[:] = saved
+    assert status == 503
+    assert body["detail"].startswith("LLM is overloaded")
+    assert stored_quizzes(api, url) == 0
+
+    status, body = api.run(post(api.app, "/generate_quiz", {"url": url}))
+    assert status == 200
+    assert stored_quizzes(api, url) == 1
+
+
+def test_invalid_json_still_gives_the_mock_quiz(monkeypatch):
+    async def invalid(content):
+        raise json.JSONDecodeError("Expecting value", "not json", 0)
+
+    monkeypatch.setattr(quiz_generator, "_request_quiz", invalid)
+    assert asyncio.run(quiz_generator.generate_quiz_from_text("Some text.")) == quiz_generator.get_mock_quiz_data()
+
+
+def test_chunked_generation_raises_rate_limits_over_invalid_json(monkeypatch):
+    calls = []
+
+    async def failing(content):
+        calls.append(content)
+        if len(calls) == 1:
+            raise json.JSONDecodeError("Expecting value", "not json", 0)
+        raise LLMError("Rate limit reached", status_code=429, retry_after=7, retryable=True)
+
+    monkeypatch.setattr(quiz_generator, "_request_quiz", failing)
+    monkeypatch.setattr(quiz_generator, "get_llm", lambda: object())
+    monkeypatch.setattr(quiz_generator, "CHUNK_TOKENS", 100)
+    monkeypatch.setattr(quiz_generator, "chunk_article", lambda blocks, *args, **kwargs: ["First part.", "Second part."])
+    scraped = {"title": "Chunked", "text": "First part. Second part.", "blocks": ["First part.", "Second part."]}
+    with pytest.raises(LLMError) as raised:
+        asyncio.run(quiz_generator._generate_quiz_for_article(scraped))
+    assert quiz_generator.unavailable(raised.value)
+    assert raised.value.retry_after == 7
+    assert len(calls) == 2
+
+
+def test_quiz_is_marked_truncated_when_chunks_are_left_out(monkeypatch):
+    prompts = []
+
+    async def request(content):
+        prompts.append(content)
+        return {"summary": "S", "quiz": [], "key_entities": {}, "related_topics": []}
+
+    monkeypatch.setattr(quiz_generator, "_request_quiz", request)
+    monkeypatch.setattr(quiz_generator, "get_llm", lambda: object())
+    monkeypatch.setattr(quiz_generator, "CHUNK_TOKENS", 100)
+    monkeypatch.setattr(quiz_generator, "chunk_article", lambda blocks, *args, **kwargs: [f"Part {i}." for i in range(5)])
+    scraped = {"title": "Long", "text": "Long.", "blocks": ["Long."]}
+
+    monkeypatch.setattr(quiz_generator, "spread_chunks", lambda chunks: chunks[:3])
+    assert asyncio.run(quiz_generator._generate_quiz_for_article(scraped))["truncated"] is True
+    assert len(prompts) == 3
+
+    monkeypatch.setattr(quiz_generator, "spread_chunks", lambda chunks: chunks)
+    assert asyncio.run(quiz_generator._generate_quiz_for_article(scraped))["truncated"] is False
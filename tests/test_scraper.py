@@ -0,0 +1,22 @@
+import os
+import signal
+import time
+
+import scraper
+from fake_servers import fake_article_html
+
+
+def test_parse_pool_is_replaced_after_a_worker_dies(api, monkeypatch):
+    monkeypatch.setattr(scraper, "PARSE_WORKERS", 1)
+    html = fake_article_html("Broken Pool")
+    try:
+        assert api.run(scraper._parse_off_loop(html))["title"] == "Broken Pool"
+        broken = scraper._parse_pool
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(0.5)
+
+        assert api.run(scraper._parse_off_loop(html))["title"] == "Broken Pool"
+        assert scraper._parse_pool is not broken
+    finally:
+        scraper.shutdown_parse_pool()
@@ -0,0 +1,35 @@
+import json
+import os
+
+from sqlalchemy import create_engine
+
+from conftest import post
+from harness import asgi_request, seed_quizzes
+
+
+def search(api, q):
+    status, body = api.run(asgi_request(api.app, "GET", f"/search?q={q}&limit=5"))
+    assert status == 200
+    return [item["title"] for item in json.loads(body)["items"]]
+
+
+def test_best_match_is_found_behind_many_newer_ones(api):
+    # The title match is the oldest of 1201 matches; the newer ones only mention the word in a question
+    seed_quizzes(os.environ["DATABASE_URL"], 1, text=lambda quiz_id: ("Quokka", "About marsupials.", ["What?"]))
+    seed_quizzes(os.environ["DATABASE_URL"], 1200, text=lambda quiz_id: (
+        f"Island {quiz_id}", "Islands and their wildlife.", [f"Which island has a quokka colony, {quiz_id}?"],
+    ))
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.begin() as conn:
+        api.main.search.backfill(conn)
+    engine.dispose()
+    api.main.response_cache.clear()
+
+    assert search(api, "quokka")[0] == "Quokka"
+
+
+def test_stored_quiz_is_found_after_a_cached_search(api):
+    assert search(api, "marmalade") == []
+    status, quiz = api.run(post(api.app, "/generate_quiz", {"url": f"{api.wiki.base_url}/wiki/Searchable_Marmalade"}))
+    assert status == 200
+    assert search(api, "marmalade") == [quiz["title"]]
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+import database
+from conftest import post
+from singleflight import SingleFlight, _acquire_lease, run_with_lease
+
+
+def test_callers_share_one_run():
+    flight = SingleFlight()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return "quiz"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("a", work) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["quiz"] * 10
+    assert runs == 1
+
+
+def test_error_reaches_every_caller():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("scrape failed")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("a", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(e, ValueError) for e in asyncio.run(main()))
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "quiz"
+
+    async def main():
+        leader = asyncio.create_task(flight.do("a", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("a", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "quiz"
+
+
+
+def test_work_is_cancelled_when_nobody_waits():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+
+    async def main():
+        caller = asyncio.create_task(flight.do("a", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert finished == []
+
+def test_key_is_free_again_after_the_run():
+    flight = SingleFlight()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        return runs
+
+    async def main():
+        return [await flight.do("a", work), await flight.do("a", work)]
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_concurrent_requests_scrape_and_call_llm_once(api):
+    scrapes, llm_calls = api.wiki.counter.total, api.llm.counter.total
+    url = f"{api.wiki.base_url}/wiki/Single_Flight"
+
+    async def main():
+        return await asyncio.gather(*(post(api.app, "/generate_quiz", {"url": url}) for _ in range(10)))
+
+    results = api.run(main())
+    assert [status for status, _ in results] == [200] * 10
+    assert len({body["id"] for _, body in results}) == 1
+    assert api.wiki.counter.total - scrapes == 1
+    assert api.llm.counter.total - llm_calls == 1
+
+
+def test_lease_is_renewed_while_generating(api):
+    # Generation outlasts three lease TTLs; no other worker may take the lease meanwhile
+    key = "https://en.wikipedia.org/wiki/Slow_Generation"
+
+    async def lookup():
+        return None
+
+    async def generate():
+        await asyncio.sleep(1)
+        return "quiz"
+
+    async def main():
+        async with database.AsyncSessionLocal() as db, database.AsyncSessionLocal() as other:
+            running = asyncio.create_task(run_with_lease(db, key, lookup, generate, ttl=0.3))
+            await asyncio.sleep(0.7)
+            taken = await _acquire_lease(other, key, "other", 0.3)
+            return await running, taken
+
+    assert api.run(main()) == ("quiz", False)
@@ -0,0 +1,75 @@
+import json
+
+from sqlalchemy import event, select
+
+import database
+import models
+
+
+def quiz_data(title, n_questions):
+    scraped = {"title": title, "sections": ["History"], "text": f"{title} text.", "revision_id": None}
+    llm_data = {
+        "quiz": [
+            {"question": f"Question {i}?", "options": ["A", "B", "C", "D"], "answer": "A",
+             "difficulty": "Easy", "explanation": "Because."}
+            for i in range(n_questions)
+        ],
+        "key_entities": {"people": ["Ada Lovelace"], "organizations": [], "locations": []},
+        "related_topics": ["Computing"],
+    }
+    return scraped, llm_data
+
+
+def store(api, title, scraped, llm_data):
+    async def run():
+        async with database.AsyncSessionLocal() as session:
+            return await api.main._store_quiz(session, f"https://en.wikipedia.org/wiki/{title}",
+                                              f"https://en.wikipedia.org/wiki/{title}", scraped, "Summary.", llm_data)
+
+    return api.run(run())
+
+
+def statements_to_store(api, n_questions):
+    title = f"Statement Count {n_questions}"
+    scraped, llm_data = quiz_data(title, n_questions)
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = [database._get("async_engine").sync_engine]
+    if "writer_engine" in database._engines:
+        engines.append(database._engines["writer_engine"].sync_engine)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    try:
+        store(api, title, scraped, llm_data)
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", count)
+    return statements
+
+
+def test_statement_count_does_not_grow_with_questions(api):
+    two, twenty = statements_to_store(api, 2), statements_to_store(api, 20)
+    assert len(two) == len(twenty)
+    assert sum("INSERT INTO questions" in s for s in twenty) == 1
+
+
+def test_difficulty_is_lowercased_in_rows_and_response(api):
+    scraped, llm_data = quiz_data("Difficulty Casing", 2)
+    body = json.loads(store(api, "Difficulty Casing", scraped, llm_data).body)
+    assert [q["difficulty"] for q in body["quiz"]] == ["easy", "easy"]
+
+    async def stored():
+        async with database.AsyncSessionLocal() as session:
+            quiz = await session.get(models.QuizRecord, body["id"])
+            rows = (await session.execute(
+                select(models.Question.difficulty).where(models.Question.quiz_id == body["id"])
+            )).scalars().all()
+            return json.loads(quiz.response_json), rows
+
+    response_json, rows = api.run(stored())
+    assert rows == ["easy", "easy"]
+    assert [q["difficulty"] for q in response_json["quiz"]] == ["easy", "easy"]